@@ -1,5 +1,7 @@
 from shiny import App, ui
-from modules import page_input, page_process, page_eda, page_preprocess
+from starlette.applications import Starlette
+from starlette.routing import Mount, Route
+from modules import page_input, page_process, page_eda, page_preprocess, page_diagnostics, service_api
 from pathlib import Path
 
 www_dir = Path(__file__).parent / "www"
@@ -14,6 +16,7 @@ app_ui = ui.page_navbar(
     ui.nav_panel("⚙️ 공정 설명", page_process.page_process_ui()),
     ui.nav_panel("📊 데이터 탐색", page_eda.page_eda_ui()),
     ui.nav_panel("🧹 전처리 및 모델 설명", page_preprocess.page_preprocess_ui()),
+    ui.nav_panel("🛠️ 진단 (관리자)", page_diagnostics.page_diagnostics_ui()),
     title="🔧 주조 공정 품질 예측 대시보드",
     id="main_nav",
     bg="#2C3E50",  # 네비게이션 바 색상 (짙은 공장톤)
@@ -27,6 +30,16 @@ def server(input, output, session):
     page_process.page_process_server(input, output, session)
     page_eda.page_eda_server(input, output, session)
     page_preprocess.page_preprocess_server(input, output, session)
+    page_diagnostics.page_diagnostics_server(input, output, session)
     # page_result.page_result_server(input, output, session)
 
-app = App(app_ui, server, static_assets=www_dir)
+shiny_app = App(app_ui, server, static_assets=www_dir)
+
+# Shiny 앱 + 진단 JSON 엔드포인트(구간 시간·드리프트) + 채점 API(/api/v1/...) (shiny run app.py 그대로 사용)
+# 마운트된 앱의 lifespan 은 실행되지 않으므로 Shiny 의 시작·종료 처리(on_shutdown 등)를 바깥 앱에 연결
+app = Starlette(lifespan=shiny_app.starlette_app.router.lifespan_context, routes=[
+    Route(page_diagnostics.TIMINGS_PATH, page_diagnostics.timings_json),
+    Route(page_diagnostics.DRIFT_PATH, page_diagnostics.drift_json),
+    Mount("/api", routes=service_api.routes),
+    Mount("/", app=shiny_app),
+])
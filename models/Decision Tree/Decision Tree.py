@@ -1,18 +1,25 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split, StratifiedKFold, cross_val_score
+from sklearn.model_selection import train_test_split, StratifiedKFold
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 from sklearn.compose import ColumnTransformer
 from sklearn.tree import DecisionTreeClassifier
-from sklearn.metrics import f1_score, make_scorer
+from sklearn.metrics import f1_score
 from imblearn.over_sampling import SMOTE
 from imblearn.pipeline import Pipeline as ImbPipeline
 import optuna
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from tuning_harness import FoldCache, cv_score, load_xy, make_pruner, open_study, parse_args, plan_cpu  # noqa: E402
+
+args = parse_args()
+# 단일 스레드 모델 → 코어 수만큼 trial 병렬
+cpu = plan_cpu(args.cpu_budget, model_threads=1)
 
 # 1. 데이터 불러오기
-df = pd.read_csv("C:\\Users\\USER\\Desktop\\diecasting-project\\data\\data1.csv")
-X = df.drop(columns="passorfail")
-y = df["passorfail"]
+X, y = load_xy(args.data)
 
 # 2. 컬럼 타입 분리
 cat_cols = X.select_dtypes(include=["object"]).columns.tolist()
@@ -29,6 +36,10 @@ preprocessor = ColumnTransformer(
 # 4. Stratified K-Fold
 cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=42)
 
+# 폴드별 전처리 + SMOTE 결과는 한 번만 만들고 모든 trial이 재사용
+fold_cache = FoldCache(X, y, preprocessor, SMOTE(sampling_strategy=0.2, random_state=42), cv,
+                       cache_dir=args.cache_dir).prepare()
+
 # 5. Optuna Objective 함수 정의
 def objective(trial):
     # 하이퍼파라미터 탐색 공간 정의
@@ -44,26 +55,13 @@ def objective(trial):
     # 모델 정의
     dt_model = DecisionTreeClassifier(**params)
 
-    # 파이프라인 (전처리 + SMOTE + 모델)
-    clf = ImbPipeline(steps=[
-        ("preprocessor", preprocessor),
-        ("smote", SMOTE(sampling_strategy=0.2, random_state=42)),
-        ("model", dt_model)
-    ])
-
-    # 교차검증 (불량=1 기준 F1 점수)
-    score = cross_val_score(
-        clf, X, y,
-        scoring=make_scorer(f1_score, pos_label=1),
-        cv=cv,
-        n_jobs=-1
-    ).mean()
-
-    return score
+    # 교차검증 (불량=1 기준 F1 점수) — 캐시된 폴드에서 모델만 학습
+    return cv_score(dt_model, fold_cache, trial=trial)
 
 # 6. Optuna 실행
-study = optuna.create_study(direction="maximize")
-study.optimize(objective, n_trials=50)  # 시도 횟수 조정 가능
+# 저장소의 study를 이어서 사용 (같은 명령을 여러 프로세스에서 실행하면 병렬 탐색)
+study = open_study("decision_tree", fold_cache.key, args, pruner=make_pruner(args.pruner, fold_cache.n_splits))
+study.optimize(objective, n_trials=args.n_trials, n_jobs=cpu["trials"])  # 시도 횟수: --n-trials
 
 print("\n✅ Best Params:", study.best_params)
 print("✅ Best CV F1 Score:", study.best_value)
@@ -0,0 +1,172 @@
+# models/FinalModel/benchmark_models.py
+# 금형별 모델 계열(RF / HistGradientBoosting / LightGBM) 비교 — 예측 성능 + 서빙 비용
+#
+# 사용 예)
+#   python models/FinalModel/benchmark_models.py                         # 전체 금형 × 전체 계열
+#   python models/FinalModel/benchmark_models.py --families rf hgb --molds 8412 8917
+#   python models/FinalModel/benchmark_models.py --publish               # 금형별 우승 모델을 models/Selected 로
+#
+# 선정 규칙: F1이 금형 최고값 - f1_tolerance 이내인 후보 중 단건 지연(p50)이 가장 짧은 모델
+import argparse
+import io
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from models.FinalModel.train_per_mold import (  # noqa: E402
+    DEFAULT_DATA, FAMILIES, MOLD_COL, MOLDS, ROOT, _load_params, _metrics,
+    build_pipeline, load_training_frame, pin_threads, split_mold,
+)
+
+DEFAULT_OUT = ROOT / "models" / "Selected"
+REPORT_DIR = ROOT / "models" / "benchmarks"
+
+
+# ===== 측정 =====
+def _percentiles(samples_s: list[float]) -> dict:
+    ms = np.asarray(samples_s) * 1000.0
+    return {"p50_ms": round(float(np.percentile(ms, 50)), 4),
+            "p95_ms": round(float(np.percentile(ms, 95)), 4)}
+
+def single_row_latency(pipe, X: pd.DataFrame, n: int = 200) -> dict:
+    """화면 예측과 같은 1행 DataFrame predict_proba 지연"""
+    rows = [X.iloc[[i % len(X)]] for i in range(n)]
+    pipe.predict_proba(rows[0])  # 워밍업
+    samples = []
+    for r in rows:
+        t0 = time.perf_counter()
+        pipe.predict_proba(r)
+        samples.append(time.perf_counter() - t0)
+    return _percentiles(samples)
+
+def batch_throughput(pipe, X: pd.DataFrame, min_rows: int = 20000) -> float:
+    """rows/s (검증 데이터를 min_rows 이상으로 반복)"""
+    reps = max(1, int(np.ceil(min_rows / max(len(X), 1))))
+    big = pd.concat([X] * reps, ignore_index=True)
+    t0 = time.perf_counter()
+    pipe.predict_proba(big)
+    return round(len(big) / (time.perf_counter() - t0), 1)
+
+def model_size_bytes(pipe) -> int:
+    buf = io.BytesIO()
+    joblib.dump(pipe, buf)
+    return buf.tell()
+
+def shap_latency(pipe, X: pd.DataFrame, n: int = 20) -> dict | None:
+    """TreeExplainer 생성 시간 + 1행 설명 지연 (shap 미설치 시 None)"""
+    try:
+        import shap
+    except ImportError:
+        return None
+    t0 = time.perf_counter()
+    explainer = shap.TreeExplainer(pipe.named_steps["model"])
+    build_s = time.perf_counter() - t0
+    pre = pipe.named_steps["preprocess"]
+    names = pre.get_feature_names_out()
+    samples = []
+    for i in range(n):
+        Xt = pd.DataFrame(pre.transform(X.iloc[[i % len(X)]]), columns=names)
+        t0 = time.perf_counter()
+        explainer(Xt)
+        samples.append(time.perf_counter() - t0)
+    return {"explainer_build_s": round(build_s, 4), **_percentiles(samples)}
+
+
+def benchmark_one(mold: str, family: str, frame: pd.DataFrame, params: dict, n_threads: int) -> tuple[dict, object]:
+    X_tr, X_te, y_tr, y_te = split_mold(frame, params["test_size"])
+    pipe = build_pipeline(params, n_threads=n_threads, family=family)
+    t0 = time.perf_counter()
+    pipe.fit(X_tr, y_tr)
+    fit_s = time.perf_counter() - t0
+    proba = pipe.predict_proba(X_te)[:, 1]
+    row = {
+        "mold_code": mold,
+        "family": family,
+        **_metrics(y_te, (proba >= 0.5).astype(int), proba),
+        "fit_s": round(fit_s, 3),
+        **{f"latency_{k}": v for k, v in single_row_latency(pipe, X_te).items()},
+        "batch_rows_per_s": batch_throughput(pipe, X_te),
+        "size_bytes": model_size_bytes(pipe),
+    }
+    shap_stats = shap_latency(pipe, X_te)
+    if shap_stats:
+        row.update({f"shap_{k}": v for k, v in shap_stats.items()})
+    return row, pipe
+
+
+# ===== 선정 =====
+def select_winners(report: pd.DataFrame, f1_tolerance: float = 0.01) -> dict:
+    """금형별: F1 ≥ (최고 F1 - tolerance) 후보 중 단건 지연 p50 최소"""
+    winners = {}
+    for mold, g in report.groupby("mold_code"):
+        ok = g[g["f1"] >= g["f1"].max() - f1_tolerance]
+        best = ok.sort_values(["latency_p50_ms", "size_bytes"]).iloc[0]
+        winners[str(mold)] = best["family"]
+    return winners
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="금형별 모델 계열 벤치마크")
+    ap.add_argument("--data", default=os.environ.get("DIECAST_TRAIN_DATA", str(DEFAULT_DATA)))
+    ap.add_argument("--families", nargs="*", default=list(FAMILIES), choices=FAMILIES)
+    ap.add_argument("--molds", nargs="*", default=None)
+    ap.add_argument("--params", default=None, help="하이퍼파라미터 JSON (train_per_mold 와 같은 형식)")
+    ap.add_argument("--n-threads", type=int, default=1, help="모델 스레드 (서빙 환경과 맞춰 측정)")
+    ap.add_argument("--f1-tolerance", type=float, default=0.01)
+    ap.add_argument("--publish", action="store_true", help="우승 모델을 --out 에 <family>_mold_<code>.pkl 로 저장")
+    ap.add_argument("--out", default=str(DEFAULT_OUT))
+    args = ap.parse_args(argv)
+
+    pin_threads(args.n_threads)
+    params = _load_params(args.params)
+    df = load_training_frame(Path(args.data))
+    molds = [m for m in (args.molds or MOLDS) if (df[MOLD_COL] == m).any()]
+
+    rows, fitted = [], {}
+    for mold in molds:
+        frame = df[df[MOLD_COL] == mold]
+        for family in args.families:
+            try:
+                row, pipe = benchmark_one(mold, family, frame, params, args.n_threads)
+            except ImportError as e:   # lightgbm 미설치 등
+                print(f"[bench] skip {family}: {e}")
+                continue
+            rows.append(row)
+            fitted[(mold, family)] = pipe
+            print(f"[bench] mold {mold} {family:5s} f1={row['f1']} recall={row['recall']} "
+                  f"p50={row['latency_p50_ms']}ms size={row['size_bytes'] / 1e6:.1f}MB")
+
+    report = pd.DataFrame(rows)
+    winners = select_winners(report, args.f1_tolerance)
+    print("[bench] winners:", winners)
+
+    REPORT_DIR.mkdir(parents=True, exist_ok=True)
+    stamp = f"{datetime.now():%Y%m%d_%H%M%S}"
+    report.to_csv(REPORT_DIR / f"model_benchmark_{stamp}.csv", index=False)
+    with open(REPORT_DIR / f"model_benchmark_{stamp}.json", "w", encoding="utf-8") as f:
+        json.dump({"params": params, "n_threads": args.n_threads, "f1_tolerance": args.f1_tolerance,
+                   "winners": winners, "results": rows}, f, ensure_ascii=False, indent=2)
+
+    if args.publish:
+        out = Path(args.out)
+        out.mkdir(parents=True, exist_ok=True)
+        for mold, family in winners.items():
+            for old in out.glob(f"*_mold_{mold}.pkl"):
+                old.unlink()
+            joblib.dump(fitted[(mold, family)], out / f"{family}_mold_{mold}.pkl")
+        with open(out / "selection.json", "w", encoding="utf-8") as f:
+            json.dump({"created_at": stamp, "winners": winners}, f, ensure_ascii=False, indent=2)
+        print(f"[bench] published → {out}  (DIECAST_MODEL_DIR={out} 로 대시보드에 적용)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+# models/FinalModel/benchmark_serving.py
+# 대시보드 서빙 경로 벤치마크 — shared.df2 샘플로 오프라인 측정 (Shiny 서버 불필요)
+#  - single_row.<금형>     : 1행 DataFrame 예측 (predict_one, SHAP 제외)
+#  - single_row_dict.<금형>: do_predict 와 같은 1행 dict 입력 (입력 스키마 인코딩)
+#  - single_row_quantized.<금형>: 위와 같되 정수 코드 트리 추론 (DIECAST_QUANTIZED=1 경로)
+#  - batch.<금형>.<행수>   : predict_proba 1 / 100 / 10000행
+#  - batch_quantized.<금형>.<행수>: 스키마 인코딩 + 정수 코드 추론 (행 수별 손익분기 확인용)
+#  - shap.<금형>           : TreeExplainer 1행 설명
+#  - adjust.<금형>         : adjust_variables_to_target 전체 (불량 샘플 기준)
+#  - plot.<변수>           : plot_failrate_cutoff_dual_fast (공정 페이지 변수별)
+# 결과: p50/p95/p99(ms) JSON → models/benchmarks/serving_<시각>.json
+# 기준선(--baseline)보다 허용치 이상 느려지면 종료 코드 1
+#
+# 사용 예)
+#   python models/FinalModel/benchmark_serving.py --update-baseline      # 기준선 저장
+#   python models/FinalModel/benchmark_serving.py                        # 기준선과 비교
+#   python models/FinalModel/benchmark_serving.py --only single_row batch --molds 8412
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import matplotlib
+matplotlib.use("Agg")
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from models.FinalModel.benchmark_models import REPORT_DIR  # noqa: E402
+from models.FinalModel.train_per_mold import pin_threads  # noqa: E402
+
+DEFAULT_BASELINE = REPORT_DIR / "serving_baseline.json"
+SUITES = ("single_row", "batch", "shap", "adjust", "plot")
+BATCH_SIZES = (1, 100, 10000)
+# page_process 의 변수 선택 목록
+PLOT_VARS = [
+    "molten_temp", "molten_volume", "sleeve_temperature", "EMS_operation_time",
+    "low_section_speed", "high_section_speed", "cast_pressure", "biscuit_thickness", "physical_strength",
+    "upper_mold_temp1", "lower_mold_temp1", "upper_mold_temp2", "lower_mold_temp2", "Coolant_temperature",
+]
+VARS_TO_HIDE = ["physical_strength"]
+
+
+# ===== 측정 =====
+def summarize(samples_s: list[float], rows: int = 1) -> dict:
+    ms = np.asarray(samples_s) * 1000.0
+    out = {"n": int(ms.size), "mean_ms": round(float(ms.mean()), 4)}
+    for q in (50, 95, 99):
+        out[f"p{q}_ms"] = round(float(np.percentile(ms, q)), 4)
+    if rows > 1:
+        out["rows_per_s"] = round(rows / (float(np.median(ms)) / 1000.0), 1)
+    return out
+
+def time_calls(fn, args_list: list, warmup: int = 1) -> list[float]:
+    for a in args_list[:warmup]:
+        fn(*a)
+    samples = []
+    for a in args_list:
+        t0 = time.perf_counter()
+        fn(*a)
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+def mold_samples(df2: pd.DataFrame, mold_code: str, columns: list[str]) -> pd.DataFrame:
+    """금형별 입력 행 — UI 입력과 같게 tryshot 결측은 'A', 나머지 결측 행은 제외"""
+    g = df2[df2["mold_code"].astype(str) == str(mold_code)]
+    X = g[columns + (["passorfail"] if "passorfail" in g else [])].copy()
+    X["tryshot_signal"] = X["tryshot_signal"].fillna("A")
+    return X.dropna(subset=columns).reset_index(drop=True)
+
+
+def bench_mold(code: str, X: pd.DataFrame, models, explainers, suites, cfg, rng, schemas=None,
+               quantized=None) -> dict:
+    from modules.service_predict import FEATURE_COLUMNS, predict_one
+
+    results = {}
+    feats = X[FEATURE_COLUMNS]
+    pipe = models[code]
+    rows = [feats.iloc[[i]] for i in rng.integers(0, len(feats), cfg.n_single)]
+
+    if "single_row" in suites:
+        samples = time_calls(lambda r: predict_one(r, code, models, explainers, with_shap=False, schemas=schemas),
+                             [(r,) for r in rows])
+        results[f"single_row.{code}"] = summarize(samples)
+        if schemas and code in schemas:
+            # do_predict 와 같은 1행 dict 입력 (DataFrame 생성 없이 스키마로 바로 인코딩)
+            dicts = [(r.iloc[0].to_dict(),) for r in rows]
+            samples = time_calls(lambda d: predict_one(d, code, models, explainers, with_shap=False, schemas=schemas),
+                                 dicts)
+            results[f"single_row_dict.{code}"] = summarize(samples)
+            if quantized and code in quantized:
+                samples = time_calls(lambda d: predict_one(d, code, models, explainers, with_shap=False,
+                                                           schemas=schemas, quantized=quantized), dicts)
+                results[f"single_row_quantized.{code}"] = summarize(samples)
+
+    if "batch" in suites:
+        for size in BATCH_SIZES:
+            reps = cfg.n_batch if size < 10000 else max(3, cfg.n_batch // 20)
+            batches = [(feats.iloc[rng.integers(0, len(feats), size)],) for _ in range(reps)]
+            results[f"batch.{code}.{size}"] = summarize(time_calls(pipe.predict_proba, batches), rows=size)
+            if quantized and code in quantized and schemas and code in schemas:
+                q, schema = quantized[code], schemas[code]
+                run = lambda b: q.predict_proba(None, codes=q.encode_transformed(schema.encode(b)))
+                results[f"batch_quantized.{code}.{size}"] = summarize(time_calls(run, batches), rows=size)
+
+    if "shap" in suites:
+        pre, explainer = pipe.named_steps["preprocess"], explainers[code]
+        names = pre.get_feature_names_out()
+        Xt = [(pd.DataFrame(pre.transform(r), columns=names),) for r in rows[:cfg.n_shap]]
+        results[f"shap.{code}"] = summarize(time_calls(explainer, Xt))
+
+    if "adjust" in suites:
+        from modules.service_adjustment import adjust_variables_to_target
+        fail = X.index[X["passorfail"] == 1] if "passorfail" in X else X.index
+        pick = rng.choice(fail if len(fail) else X.index, size=cfg.n_adjust)
+        cases = []
+        for i in pick:
+            raw = feats.loc[[i]].assign(mold_code=code)
+            res = predict_one(feats.loc[[i]], code, models, explainers, schemas=schemas)
+            cases.append((raw, res["shap_values"]))
+        pre, model = pipe.named_steps["preprocess"], pipe.named_steps["model"]
+
+        def run_adjust(raw, shap_values):
+            adjust_variables_to_target(raw, shap_values, pre, model, target_prob=0.30)
+
+        results[f"adjust.{code}"] = summarize(time_calls(run_adjust, cases, warmup=0))
+    return results
+
+def bench_plots(df2: pd.DataFrame, variables: list[str], n: int) -> dict:
+    import matplotlib.pyplot as plt
+    from viz.plots import plot_failrate_cutoff_dual_fast
+
+    def draw(var):
+        plt.close(plot_failrate_cutoff_dual_fast(df2, var, vars_to_hide=VARS_TO_HIDE))
+
+    return {f"plot.{var}": summarize(time_calls(draw, [(var,)] * n)) for var in variables if var in df2}
+
+
+# ===== 기준선 비교 =====
+def compare(current: dict, baseline: dict, tolerance: float, min_delta_ms: float,
+            stats=("p50_ms", "p95_ms")) -> list[dict]:
+    """기준선 대비 (1 + tolerance)배 이상 그리고 min_delta_ms 이상 느려진 항목"""
+    regressions = []
+    for key, base in baseline.get("results", {}).items():
+        cur = current["results"].get(key)
+        if cur is None:
+            continue
+        for stat in stats:
+            b, c = base.get(stat), cur.get(stat)
+            if b is None or c is None:
+                continue
+            if c > b * (1.0 + tolerance) and c - b > min_delta_ms:
+                regressions.append({"key": key, "stat": stat, "baseline": b, "current": c,
+                                    "ratio": round(c / max(b, 1e-9), 3)})
+    return regressions
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="대시보드 서빙 경로 지연 벤치마크")
+    ap.add_argument("--only", nargs="*", choices=SUITES, default=list(SUITES))
+    ap.add_argument("--molds", nargs="*", default=None)
+    ap.add_argument("--vars", nargs="*", default=PLOT_VARS, help="plot 대상 변수")
+    ap.add_argument("--n-single", type=int, default=200)
+    ap.add_argument("--n-batch", type=int, default=50)
+    ap.add_argument("--n-shap", type=int, default=30)
+    ap.add_argument("--n-adjust", type=int, default=5)
+    ap.add_argument("--n-plot", type=int, default=3)
+    ap.add_argument("--n-threads", type=int, default=1, help="서빙 환경과 같은 스레드 수")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    ap.add_argument("--tolerance", type=float, default=0.25, help="허용 지연 증가 비율")
+    ap.add_argument("--min-delta-ms", type=float, default=0.5, help="이보다 작은 증가는 잡음으로 무시")
+    ap.add_argument("--update-baseline", action="store_true", help="이번 결과를 기준선으로 저장")
+    args = ap.parse_args(argv)
+
+    pin_threads(args.n_threads)
+    from shared import df2, rf_explainers, rf_models, rf_quantized, rf_schemas
+    from utils.quantized_forest import quantize_models
+    quantized = rf_quantized or quantize_models(rf_models)   # 플래그와 무관하게 비교 측정
+    from modules.service_predict import FEATURE_COLUMNS
+
+    rng = np.random.default_rng(args.seed)
+    suites = set(args.only)
+    results = {}
+    for code in args.molds or list(rf_models):
+        if code not in rf_models:
+            print(f"[serve-bench] skip mold {code}: 모델 없음")
+            continue
+        X = mold_samples(df2, code, FEATURE_COLUMNS)
+        if X.empty:
+            print(f"[serve-bench] skip mold {code}: df2 샘플 없음")
+            continue
+        results.update(bench_mold(code, X, rf_models, rf_explainers, suites, args, rng, schemas=rf_schemas,
+                                  quantized=quantized))
+    if "plot" in suites:
+        results.update(bench_plots(df2, args.vars, args.n_plot))
+
+    for key, r in results.items():
+        print(f"[serve-bench] {key:<32} p50={r['p50_ms']:>9.3f}ms p95={r['p95_ms']:>9.3f}ms "
+              f"p99={r['p99_ms']:>9.3f}ms (n={r['n']})")
+
+    stamp = f"{datetime.now():%Y%m%d_%H%M%S}"
+    report = {
+        "created_at": stamp,
+        "env": {"python": platform.python_version(), "machine": platform.machine(),
+                "cpu_count": os.cpu_count(), "n_threads": args.n_threads,
+                "numpy": np.__version__, "pandas": pd.__version__},
+        "config": {k: v for k, v in vars(args).items() if k.startswith("n_") or k in ("only", "seed")},
+        "results": results,
+    }
+    REPORT_DIR.mkdir(parents=True, exist_ok=True)
+    with open(REPORT_DIR / f"serving_{stamp}.json", "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[serve-bench] baseline updated → {baseline_path}")
+        return 0
+    if not baseline_path.exists():
+        print(f"[serve-bench] baseline 없음 ({baseline_path}) — --update-baseline 으로 먼저 저장")
+        return 0
+
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(report, baseline, args.tolerance, args.min_delta_ms)
+    if regressions:
+        print("=" * 72)
+        print(f"[serve-bench] REGRESSION: {len(regressions)}개 항목이 기준선({baseline.get('created_at')}) "
+              f"대비 {args.tolerance:.0%} 이상 느려짐")
+        for r in regressions:
+            print(f"  ✗ {r['key']:<32} {r['stat']}: {r['baseline']:.3f} → {r['current']:.3f}ms (×{r['ratio']})")
+        print("=" * 72)
+        return 1
+    print(f"[serve-bench] OK — 기준선({baseline.get('created_at')}) 대비 회귀 없음")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
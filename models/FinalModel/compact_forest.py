@@ -0,0 +1,275 @@
+# models/FinalModel/compact_forest.py
+# 학습된 금형별 RandomForest 압축 — 트리 부분집합 선택(탐욕적 앙상블 선택) + 깊이 제한
+#
+# 사용 예)
+#   python models/FinalModel/compact_forest.py                            # 후보 조합 보고서만
+#   python models/FinalModel/compact_forest.py --write                    # F1 손실 허용치 내 최소 모델 저장
+#   python models/FinalModel/compact_forest.py --trees 40 --max-depth 12 --write
+#
+#   python models/FinalModel/compact_forest.py --validation data/valid.csv # 학습에 쓰지 않은 검증 CSV 지정
+#
+# 압축 모델은 models/RandomForestCompact/rf_mold_<code>.pkl 로 저장
+#   → DIECAST_MODEL_DIR=models/RandomForestCompact 로 대시보드에서 선택
+# 검증 데이터(반씩 나눠 트리 선택용/평가용):
+#   - --validation 지정 시 그 CSV
+#   - 아니면 --src 의 train_per_mold manifest.json 이 필수 — 데이터 sha1 이 --data 와 같을 때만
+#     manifest 의 분할(test_size·시드)로 holdout 재현 (manifest 없는 임의 pkl 은 학습 행을 평가하게 되므로 거부)
+import argparse
+import copy
+import json
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.metrics import f1_score, roc_auc_score
+from sklearn.model_selection import train_test_split
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from models.FinalModel.benchmark_models import (  # noqa: E402
+    REPORT_DIR, model_size_bytes, shap_latency, single_row_latency,
+)
+from models.FinalModel.train_per_mold import (  # noqa: E402
+    CAT_COLS, DEFAULT_DATA, MOLD_COL, MOLDS, NUM_COLS, ROOT, SPLIT_SEED, TARGET,
+    file_sha1, load_training_frame, pin_threads, split_mold,
+)
+
+DEFAULT_SRC = ROOT / "models" / "RandomForest"
+DEFAULT_OUT = ROOT / "models" / "RandomForestCompact"
+TREE_LEAF = -1
+TREE_UNDEFINED = -2
+
+
+# ===== 트리 단위 연산 =====
+def tree_probas(forest, Xt: np.ndarray) -> np.ndarray:
+    """트리별 양성 확률 (T × n)"""
+    pos = list(forest.classes_).index(1)
+    return np.stack([est.predict_proba(Xt)[:, pos] for est in forest.estimators_])
+
+def _f1_batch(P: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """후보별 평균확률(행) ≥ 0.5 의 F1 — (R × n) → (R,)"""
+    pred = P >= 0.5
+    tp = (pred & (y == 1)).sum(axis=1)
+    fp = (pred & (y == 0)).sum(axis=1)
+    fn = ((~pred) & (y == 1)).sum(axis=1)
+    denom = 2 * tp + fp + fn
+    return np.where(denom > 0, 2 * tp / np.maximum(denom, 1), 0.0)
+
+def greedy_select(P: np.ndarray, y: np.ndarray, n_trees: int) -> list[int]:
+    """
+    탐욕적 앙상블 선택 (중복 없음): 매 단계 F1을 가장 높이는 트리를 추가
+    - 동점이면 AUC 대용으로 확률 제곱오차가 작은 트리 우선
+    """
+    T = P.shape[0]
+    chosen, total = [], np.zeros(P.shape[1])
+    remaining = np.arange(T)
+    for k in range(min(n_trees, T)):
+        cand = (total[None, :] + P[remaining]) / (k + 1)
+        f1 = _f1_batch(cand, y)
+        brier = ((cand - y[None, :]) ** 2).mean(axis=1)
+        best = np.lexsort((brier, -f1))[0]
+        chosen.append(int(remaining[best]))
+        total += P[remaining[best]]
+        remaining = np.delete(remaining, best)
+    return chosen
+
+def cap_depth(tree_est, max_depth: int):
+    """
+    DecisionTree의 tree_ 노드 배열을 max_depth에서 잘라 재구성
+    - 잘린 지점 노드는 잎으로 전환 (sklearn은 내부 노드에도 클래스 분포 value를 저장)
+    - 도달 불가 노드는 제거 후 번호 재부여 → __setstate__ 로 교체
+    """
+    est = copy.deepcopy(tree_est)
+    state = est.tree_.__getstate__()
+    nodes, values = state["nodes"], state["values"]
+    if state["max_depth"] <= max_depth:
+        return est
+
+    keep, depth_of, order = {}, {0: 0}, [0]
+    for node in order:                      # BFS
+        keep[node] = len(keep)
+        left, right = nodes["left_child"][node], nodes["right_child"][node]
+        if left != TREE_LEAF and depth_of[node] < max_depth:
+            for child in (left, right):
+                depth_of[child] = depth_of[node] + 1
+                order.append(child)
+
+    old_ids = np.fromiter(keep.keys(), dtype=np.intp)
+    new_nodes = nodes[old_ids].copy()
+    for new_id, old in enumerate(old_ids):
+        left, right = nodes["left_child"][old], nodes["right_child"][old]
+        if left != TREE_LEAF and left in keep:
+            new_nodes["left_child"][new_id] = keep[left]
+            new_nodes["right_child"][new_id] = keep[right]
+        else:
+            new_nodes["left_child"][new_id] = TREE_LEAF
+            new_nodes["right_child"][new_id] = TREE_LEAF
+            new_nodes["feature"][new_id] = TREE_UNDEFINED
+            new_nodes["threshold"][new_id] = TREE_UNDEFINED
+    state = dict(state, nodes=new_nodes, values=values[old_ids].copy(),
+                 node_count=len(old_ids), max_depth=min(state["max_depth"], max_depth))
+    est.tree_.__setstate__(state)
+    return est
+
+def compact(forest, tree_ids: list[int], max_depth: int | None = None):
+    """선택 트리(+깊이 제한)만 가진 새 forest"""
+    new = copy.copy(forest)
+    estimators = [forest.estimators_[i] for i in tree_ids]
+    if max_depth is not None:
+        estimators = [cap_depth(e, max_depth) for e in estimators]
+    else:
+        estimators = [copy.deepcopy(e) for e in estimators]
+    new.estimators_ = estimators
+    new.n_estimators = len(estimators)
+    if max_depth is not None:
+        new.max_depth = max_depth if forest.max_depth is None else min(forest.max_depth, max_depth)
+    return new
+
+def with_model(pipe, model):
+    new = copy.copy(pipe)
+    new.steps = [(name, model if name == "model" else step) for name, step in pipe.steps]
+    return new
+
+
+# ===== 금형별 평가 =====
+def _evaluate(pipe, X_eval, y_eval, with_shap: bool) -> dict:
+    proba = pipe.predict_proba(X_eval)[:, 1]
+    out = {
+        "f1": round(float(f1_score(y_eval, proba >= 0.5, zero_division=0)), 6),
+        "roc_auc": round(float(roc_auc_score(y_eval, proba)), 6) if len(np.unique(y_eval)) > 1 else None,
+        **{f"latency_{k}": v for k, v in single_row_latency(pipe, X_eval, n=100).items()},
+        "size_bytes": model_size_bytes(pipe),
+    }
+    if with_shap:
+        stats = shap_latency(pipe, X_eval, n=10)
+        if stats:
+            out.update({f"shap_{k}": v for k, v in stats.items()})
+    return out
+
+def manifest_split(src: Path, data_path: Path) -> tuple[dict, dict]:
+    """
+    --src 의 학습 manifest → (분할 설정 {"test_size", "random_state"}, 금형별 manifest 항목)
+    - manifest 가 없거나 학습 데이터 sha1 이 --data 와 다르면 ValueError (holdout 을 재현할 수 없음)
+    - 분할 기록이 없는 이전 manifest 는 당시 고정 시드(SPLIT_SEED)와 params.test_size 사용
+    """
+    path = src / "manifest.json"
+    if not path.exists():
+        raise ValueError(f"{path} 가 없습니다 — train_per_mold 로 학습한 모델이 아니면 --validation 으로 "
+                         f"학습에 쓰지 않은 검증 CSV 를 지정하세요")
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    sha1 = file_sha1(data_path)
+    if manifest.get("data", {}).get("sha1") != sha1:
+        raise ValueError(f"학습 데이터가 다릅니다 (manifest {manifest.get('data', {}).get('sha1', '?')[:8]} "
+                         f"≠ --data {sha1[:8]}) — 같은 CSV 를 지정하거나 --validation 사용")
+    split = manifest.get("split") or {"test_size": manifest["params"]["test_size"], "random_state": SPLIT_SEED}
+    entries = {m["mold_code"]: m for m in manifest.get("molds", [])}
+    return split, entries
+
+def compact_mold(pipe, X_hold: pd.DataFrame, y_hold: pd.Series, tree_grid, depth_grid, with_shap: bool = True):
+    """검증 데이터(학습에 쓰지 않은 행) → (보고서 행 목록, {(n_trees, depth): 압축 파이프라인})"""
+    strat = y_hold if y_hold.value_counts().min() >= 2 else None
+    X_sel, X_eval, y_sel, y_eval = train_test_split(X_hold, y_hold, test_size=0.5,
+                                                    stratify=strat, random_state=0)
+    forest = pipe.named_steps["model"]
+    Xt_sel = np.asarray(pipe.named_steps["preprocess"].transform(X_sel), dtype=np.float32)
+    P = tree_probas(forest, Xt_sel)
+    order = greedy_select(P, y_sel.to_numpy(), max(tree_grid))
+
+    base = {"n_trees": len(forest.estimators_), "max_depth": None, **_evaluate(pipe, X_eval, y_eval, with_shap)}
+    rows, variants = [base], {}
+    for n in sorted(tree_grid):
+        for d in depth_grid:
+            cand = with_model(pipe, compact(forest, order[:n], d))
+            row = {"n_trees": n, "max_depth": d, **_evaluate(cand, X_eval, y_eval, with_shap)}
+            row["f1_delta"] = round(row["f1"] - base["f1"], 6)
+            row["latency_speedup"] = round(base["latency_p50_ms"] / max(row["latency_p50_ms"], 1e-9), 2)
+            row["size_ratio"] = round(row["size_bytes"] / base["size_bytes"], 4)
+            rows.append(row)
+            variants[(n, d)] = cand
+    base["f1_delta"], base["latency_speedup"], base["size_ratio"] = 0.0, 1.0, 1.0
+    return rows, variants
+
+def pick_variant(rows: list[dict], f1_tolerance: float):
+    """F1 손실이 허용치 이내인 후보 중 가장 작은(파일 크기) 모델"""
+    ok = [r for r in rows[1:] if r["f1_delta"] >= -f1_tolerance]
+    if not ok:
+        return None
+    best = min(ok, key=lambda r: (r["size_bytes"], r["latency_p50_ms"]))
+    return best["n_trees"], best["max_depth"]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="금형별 RandomForest 압축 (트리 선택 + 깊이 제한)")
+    ap.add_argument("--data", default=os.environ.get("DIECAST_TRAIN_DATA", str(DEFAULT_DATA)))
+    ap.add_argument("--src", default=str(DEFAULT_SRC), help="원본 rf_mold_*.pkl 폴더 (manifest.json 포함)")
+    ap.add_argument("--validation", default=None,
+                    help="학습에 쓰지 않은 검증 CSV (지정 시 manifest 분할 대신 사용)")
+    ap.add_argument("--out", default=str(DEFAULT_OUT))
+    ap.add_argument("--molds", nargs="*", default=None)
+    ap.add_argument("--tree-grid", type=int, nargs="*", default=[25, 50, 100])
+    ap.add_argument("--depth-grid", nargs="*", default=["none", "16", "12", "8"])
+    ap.add_argument("--trees", type=int, default=None, help="고정 트리 수 (지정 시 grid 대신 사용)")
+    ap.add_argument("--max-depth", type=int, default=None, help="고정 깊이 제한")
+    ap.add_argument("--f1-tolerance", type=float, default=0.005)
+    ap.add_argument("--no-shap", action="store_true", help="SHAP 시간 측정 생략")
+    ap.add_argument("--write", action="store_true", help="선택된 압축 모델을 --out 에 저장")
+    args = ap.parse_args(argv)
+
+    pin_threads(1)
+    fixed = args.trees is not None
+    tree_grid = [args.trees] if fixed else args.tree_grid
+    depth_grid = [args.max_depth] if fixed else [None if d == "none" else int(d) for d in args.depth_grid]
+
+    src, out = Path(args.src), Path(args.out)
+    if args.validation:
+        df, split, entries = load_training_frame(Path(args.validation)), None, None
+    else:
+        try:
+            split, entries = manifest_split(src, Path(args.data))
+        except ValueError as e:
+            print(f"[compact] {e}")
+            return 2
+        df = load_training_frame(Path(args.data))
+    molds = [m for m in (args.molds or MOLDS) if (df[MOLD_COL] == m).any()]
+    report, chosen = [], {}
+    for mold in molds:
+        frame = df[df[MOLD_COL] == mold]
+        if split is None:
+            X_hold, y_hold = frame[NUM_COLS + CAT_COLS], frame[TARGET]
+        else:
+            entry = entries.get(mold, {})
+            if entry.get("status") != "ok" or entry.get("artifact") != f"rf_mold_{mold}.pkl":
+                print(f"[compact] skip mold {mold}: manifest 에 rf_mold_{mold}.pkl 학습 기록이 없습니다")
+                continue
+            _, X_hold, _, y_hold = split_mold(frame, split["test_size"], split["random_state"])
+        pipe = joblib.load(src / f"rf_mold_{mold}.pkl")
+        rows, variants = compact_mold(pipe, X_hold, y_hold, tree_grid, depth_grid, with_shap=not args.no_shap)
+        for r in rows:
+            report.append({"mold_code": mold, **r})
+            print(f"[compact] mold {mold} trees={r['n_trees']:>4} depth={str(r['max_depth']):>4} "
+                  f"f1={r['f1']:.4f} (Δ{r['f1_delta']:+.4f}) p50={r['latency_p50_ms']:.2f}ms "
+                  f"size×{r['size_ratio']:.2f}")
+        key = (args.trees, args.max_depth) if fixed else pick_variant(rows, args.f1_tolerance)
+        if key is not None and args.write:
+            out.mkdir(parents=True, exist_ok=True)
+            joblib.dump(variants[key], out / f"rf_mold_{mold}.pkl")
+            chosen[mold] = {"n_trees": key[0], "max_depth": key[1]}
+
+    REPORT_DIR.mkdir(parents=True, exist_ok=True)
+    stamp = f"{datetime.now():%Y%m%d_%H%M%S}"
+    pd.DataFrame(report).to_csv(REPORT_DIR / f"forest_compaction_{stamp}.csv", index=False)
+    if chosen:
+        with open(out / "compaction.json", "w", encoding="utf-8") as f:
+            json.dump({"created_at": stamp, "source": str(src), "f1_tolerance": args.f1_tolerance,
+                       "validation": args.validation or {"manifest_split": split},
+                       "molds": chosen}, f, ensure_ascii=False, indent=2)
+        print(f"[compact] written → {out}: {chosen}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
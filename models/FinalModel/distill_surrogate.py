@@ -0,0 +1,174 @@
+# models/FinalModel/distill_surrogate.py
+# 금형별 RandomForest(교사) → 경량 대리 모델(학생) 증류
+#  - 학생은 교사의 불량 확률을 회귀 (얕은 결정트리 또는 얕은 HistGB)
+#  - 전처리는 교사의 fitted preprocess 를 그대로 공유 → 입력 형식 동일
+#  - escalate_above: 이 값 이상인 샷만 전체 RF + SHAP 로 넘김 (교사 불량 판정 재현율 target_recall 보장)
+#
+# 사용 예)
+#   python models/FinalModel/distill_surrogate.py                    # models/RandomForest → models/Surrogate
+#   python models/FinalModel/distill_surrogate.py --student hgb --target-recall 0.999
+#   python models/FinalModel/distill_surrogate.py --validation data/valid.csv   # 학습에 쓰지 않은 검증 CSV 지정
+#
+# escalate_above 보정용 검증 데이터 (교사가 학습한 행은 과신 → 재현율 과대 추정이므로 사용 금지):
+#   - --validation 지정 시 그 CSV (학생은 --data 전체로 학습)
+#   - 아니면 --src 의 train_per_mold manifest.json 이 필수 — manifest 분할로 holdout 재현,
+#     학생은 교사와 같은 학습 분할로 학습 (compact_forest 와 같은 규칙)
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from models.FinalModel.compact_forest import manifest_split  # noqa: E402
+from models.FinalModel.train_per_mold import (  # noqa: E402
+    CAT_COLS, DEFAULT_DATA, MOLD_COL, MOLDS, NUM_COLS, ROOT, load_training_frame, pin_threads, split_mold,
+)
+
+DEFAULT_SRC = ROOT / "models" / "RandomForest"
+DEFAULT_OUT = ROOT / "models" / "Surrogate"
+META_FILE = "surrogates.json"
+
+
+def make_student(kind: str, max_depth: int):
+    if kind == "tree":
+        from sklearn.tree import DecisionTreeRegressor
+        return DecisionTreeRegressor(max_depth=max_depth, min_samples_leaf=20, random_state=42)
+    if kind == "hgb":
+        from sklearn.ensemble import HistGradientBoostingRegressor
+        return HistGradientBoostingRegressor(max_depth=max_depth, max_iter=100, learning_rate=0.1,
+                                             early_stopping=False, random_state=42)
+    raise ValueError(f"unknown student: {kind!r} (tree | hgb)")
+
+def jitter_rows(X: pd.DataFrame, n_copies: int, scale: float = 0.05, seed: int = 0) -> pd.DataFrame:
+    """수치형에 표준편차×scale 잡음을 준 복제본 — 교사 결정경계 주변 샘플 보강"""
+    if n_copies <= 0:
+        return X
+    rs = np.random.RandomState(seed)
+    std = X[NUM_COLS].std().fillna(0.0).to_numpy()
+    parts = [X]
+    for _ in range(n_copies):
+        Xc = X.copy()
+        Xc[NUM_COLS] = X[NUM_COLS].to_numpy() + rs.normal(size=(len(X), len(NUM_COLS))) * std * scale
+        parts.append(Xc)
+    return pd.concat(parts, ignore_index=True)
+
+def escalation_threshold(score: np.ndarray, teacher_pos: np.ndarray, target_recall: float) -> float:
+    """교사 불량 판정(teacher_pos) 중 target_recall 이상이 score ≥ 임계값이 되도록 하는 최대 임계값"""
+    pos = np.sort(score[teacher_pos])
+    if pos.size == 0:
+        return 0.5
+    k = int(np.floor((1.0 - target_recall) * pos.size))
+    return float(pos[k])
+
+def distill_mold(teacher, X_fit: pd.DataFrame, X_val: pd.DataFrame, student: str, max_depth: int,
+                 target_recall: float, n_copies: int) -> tuple[Pipeline, dict]:
+    """X_fit: 학생 학습용(교사 학습 행 가능), X_val: 교사 학습에 쓰지 않은 행 — 임계값·재현율은 여기서만 계산"""
+    pre = teacher.named_steps["preprocess"]
+
+    X_aug = jitter_rows(X_fit, n_copies)
+    t_fit = teacher.predict_proba(X_aug)[:, 1]
+    surrogate = Pipeline([("preprocess", pre), ("model", make_student(student, max_depth))])
+    surrogate.named_steps["model"].fit(pre.transform(X_aug), t_fit)   # preprocess 는 교사 것 그대로
+
+    t_val = teacher.predict_proba(X_val)[:, 1]
+    s_val = np.clip(surrogate.predict(X_val), 0.0, 1.0)
+    teacher_pos = t_val >= 0.5
+    thr = escalation_threshold(s_val, teacher_pos, target_recall)
+    escalate = s_val >= thr
+
+    t0 = time.perf_counter()
+    for i in range(min(200, len(X_val))):
+        surrogate.predict(X_val.iloc[[i]])
+    s_lat = (time.perf_counter() - t0) / max(1, min(200, len(X_val)))
+    t0 = time.perf_counter()
+    for i in range(min(200, len(X_val))):
+        teacher.predict_proba(X_val.iloc[[i]])
+    t_lat = (time.perf_counter() - t0) / max(1, min(200, len(X_val)))
+
+    meta = {
+        "student": student,
+        "max_depth": max_depth,
+        "escalate_above": round(thr, 6),
+        "escalation_rate": round(float(escalate.mean()), 6),
+        "teacher_recall": round(float(escalate[teacher_pos].mean()), 6) if teacher_pos.any() else None,
+        "mae": round(float(np.abs(s_val - t_val).mean()), 6),
+        "n_fit": int(len(X_aug)),
+        "n_val": int(len(X_val)),
+        "surrogate_ms": round(s_lat * 1000, 4),
+        "teacher_ms": round(t_lat * 1000, 4),
+    }
+    return surrogate, meta
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="금형별 RF → 경량 대리 모델 증류")
+    ap.add_argument("--data", default=os.environ.get("DIECAST_TRAIN_DATA", str(DEFAULT_DATA)))
+    ap.add_argument("--src", default=str(DEFAULT_SRC), help="교사 rf_mold_*.pkl 폴더 (manifest.json 포함)")
+    ap.add_argument("--validation", default=None,
+                    help="임계값 보정용 검증 CSV (교사 학습에 쓰지 않은 행, 없으면 manifest 의 holdout)")
+    ap.add_argument("--out", default=str(DEFAULT_OUT))
+    ap.add_argument("--molds", nargs="*", default=None)
+    ap.add_argument("--student", choices=["tree", "hgb"], default="tree")
+    ap.add_argument("--max-depth", type=int, default=6)
+    ap.add_argument("--target-recall", type=float, default=0.995,
+                    help="교사 불량 판정 중 전체 모델로 넘겨야 하는 최소 비율")
+    ap.add_argument("--jitter-copies", type=int, default=2)
+    args = ap.parse_args(argv)
+
+    pin_threads(1)
+    src, out = Path(args.src), Path(args.out)
+    if args.validation:
+        df_val, split, entries = load_training_frame(Path(args.validation)), None, None
+    else:
+        try:
+            split, entries = manifest_split(src, Path(args.data))
+        except ValueError as e:
+            print(f"[distill] {e}")
+            return 2
+        df_val = None
+    df = load_training_frame(Path(args.data))
+    molds = [m for m in (args.molds or MOLDS) if (df[MOLD_COL] == m).any()]
+    out.mkdir(parents=True, exist_ok=True)
+
+    meta_all = {}
+    for mold in molds:
+        frame = df[df[MOLD_COL] == mold]
+        if split is None:
+            X_fit = frame[NUM_COLS + CAT_COLS]
+            X_val = df_val.loc[df_val[MOLD_COL] == mold, NUM_COLS + CAT_COLS]
+            if X_val.empty:
+                print(f"[distill] skip mold {mold}: --validation 에 이 금형 행이 없습니다")
+                continue
+        else:
+            entry = entries.get(mold, {})
+            if entry.get("status") != "ok" or entry.get("artifact") != f"rf_mold_{mold}.pkl":
+                print(f"[distill] skip mold {mold}: manifest 에 rf_mold_{mold}.pkl 학습 기록이 없습니다")
+                continue
+            X_fit, X_val, _, _ = split_mold(frame, split["test_size"], split["random_state"])
+        teacher = joblib.load(src / f"rf_mold_{mold}.pkl")
+        surrogate, meta = distill_mold(teacher, X_fit, X_val, args.student,
+                                       args.max_depth, args.target_recall, args.jitter_copies)
+        joblib.dump(surrogate, out / f"surrogate_mold_{mold}.pkl")
+        meta_all[mold] = meta
+        print(f"[distill] mold {mold}: escalate≥{meta['escalate_above']:.3f} "
+              f"rate={meta['escalation_rate']:.1%} recall={meta['teacher_recall']} "
+              f"{meta['surrogate_ms']:.2f}ms vs {meta['teacher_ms']:.2f}ms")
+
+    with open(out / META_FILE, "w", encoding="utf-8") as f:
+        json.dump({"created_at": f"{datetime.now():%Y%m%d_%H%M%S}", "source": str(src),
+                   "target_recall": args.target_recall,
+                   "validation": args.validation or {"manifest_split": split},
+                   "molds": meta_all}, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
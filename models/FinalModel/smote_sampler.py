@@ -5,11 +5,152 @@ from imblearn.base import BaseSampler
 from sklearn.utils import check_random_state
 from sklearn.neighbors import NearestNeighbors
 from sklearn.preprocessing import OneHotEncoder
+from joblib import Parallel, delayed
+
+# =========================================================
+# 이웃 탐색 백엔드
+#    - exact    : sklearn NearestNeighbors + 청크 단위 질의 (기존 결과와 동일)
+#    - rp_forest: 랜덤 투영 트리 숲 근사 탐색 (NumPy, 대규모 소수 클래스용)
+#    - 두 백엔드 모두 학습 데이터 자신을 질의 → (n, n_neighbors) 인덱스만 반환(거리 미보관)
+# =========================================================
+class ExactNeighbors:
+    """정확한 k-NN (질의를 chunk_size 행씩 나눠 거리 행렬 메모리를 제한)"""
+
+    def __init__(self, n_neighbors: int, n_jobs=None, chunk_size: int = 10000):
+        self.n_neighbors = n_neighbors
+        self.n_jobs = n_jobs
+        self.chunk_size = chunk_size
+
+    def kneighbors_self(self, X: np.ndarray) -> np.ndarray:
+        nn = NearestNeighbors(n_neighbors=self.n_neighbors, metric="euclidean", n_jobs=self.n_jobs)
+        nn.fit(X)
+        step = max(1, int(self.chunk_size))
+        out = np.empty((X.shape[0], self.n_neighbors), dtype=np.intp)
+        for s in range(0, X.shape[0], step):
+            out[s:s + step] = nn.kneighbors(X[s:s + step], return_distance=False)
+        return out
+
+
+class RandomProjectionForest:
+    """
+    랜덤 투영 트리 숲 근사 k-NN
+    - 트리: 무작위 방향 투영값의 중앙값으로 분할, leaf_size 이하가 되면 잎
+    - 같은 잎에 속한 점끼리만 거리 계산 → 트리별 후보를 합쳐 상위 k 유지 (O(n·leaf_size·n_trees))
+    - 자기 자신은 항상 0번째 이웃 (exact 백엔드와 같은 형식)
+    - 재현율(정확한 5-NN 중 찾은 비율)은 트리 수·잎 크기에 비례, 시간도 거의 비례해서 늘어남
+      (17차원 가우시안 측정, 구조 없는 데이터라 최악에 가까움 / exact 50k 11초 · 200k 175초):
+        n_trees × leaf_size     50k 행          200k 행
+        8 × 64                  0.42 · 1.5초    0.33 · 7초
+        16 × 128                0.76 · 4초      0.65 · 18초
+        32 × 128 (기본)         0.93 · 8초      0.87 · 33초
+      재현율이 낮으면 SMOTE 보간 상대가 먼 이웃으로 바뀌므로 속도를 위해 낮출 때는 감안할 것
+    """
+
+    def __init__(self, n_neighbors: int, n_trees: int = 32, leaf_size: int = 128,
+                 n_jobs=None, chunk_size: int = 10000, random_state=None):
+        self.n_neighbors = n_neighbors
+        self.n_trees = n_trees
+        self.leaf_size = leaf_size
+        self.n_jobs = n_jobs
+        self.chunk_size = chunk_size
+        self.random_state = random_state
+
+    def _build_tree(self, X: np.ndarray, seed: int) -> np.ndarray:
+        """잎별 점 인덱스를 -1로 채운 (n_leaves × leaf_size) 배열로 반환"""
+        rs = np.random.RandomState(seed)
+        leaf_size = max(int(self.leaf_size), self.n_neighbors, 2)
+        leaves, stack = [], [np.arange(X.shape[0])]
+        while stack:
+            idx = stack.pop()
+            if idx.size <= leaf_size:
+                leaves.append(idx)
+                continue
+            a, b = X[idx[rs.randint(idx.size, size=2)]]
+            w = a - b if np.any(a != b) else rs.normal(size=X.shape[1])
+            proj = X[idx] @ w
+            half = idx.size // 2
+            part = np.argpartition(proj, half)
+            stack.append(idx[part[:half]])
+            stack.append(idx[part[half:]])
+        out = np.full((len(leaves), leaf_size), -1, dtype=np.intp)
+        for r, idx in enumerate(leaves):
+            out[r, :idx.size] = idx
+        return out
+
+    def _merge_leaves(self, X, leaves, best_d, best_i):
+        """잎 내부 거리로 후보를 만들고 현재 상위 k와 병합 (잎 chunk 단위)"""
+        k = self.n_neighbors
+        step = max(1, int(self.chunk_size) // leaves.shape[1])
+        for s in range(0, leaves.shape[0], step):
+            L = leaves[s:s + step]                       # (b, m)
+            valid = L >= 0
+            P = X[np.where(valid, L, 0)]                 # (b, m, d)
+            sq = np.einsum("bmd,bmd->bm", P, P)
+            D = sq[:, :, None] + sq[:, None, :] - 2.0 * (P @ P.transpose(0, 2, 1))
+            D = np.maximum(D, 0.0)
+            D[~np.broadcast_to(valid[:, None, :], D.shape)] = np.inf
+            eye = np.arange(L.shape[1])
+            D[:, eye, eye] = -1.0                        # 자기 자신을 맨 앞에 고정
+
+            # 잎 안에서 먼저 상위 k만 추린 뒤 기존 후보와 병합
+            kk = min(k, L.shape[1])
+            near = np.argpartition(D, kk - 1, axis=2)[:, :, :kk] if kk < L.shape[1] else \
+                np.broadcast_to(eye, D.shape)
+            pts = L[valid]                               # 이 chunk의 점 (트리 내 중복 없음)
+            cand_i = np.take_along_axis(np.broadcast_to(L[:, None, :], D.shape), near, axis=2)[valid]
+            cand_d = np.take_along_axis(D, near, axis=2)[valid]
+            all_i = np.concatenate([best_i[pts], cand_i], axis=1)
+            all_d = np.concatenate([best_d[pts], cand_d], axis=1)
+
+            # 여러 트리에서 중복으로 찾은 이웃 제거
+            o = np.argsort(all_i, axis=1, kind="stable")
+            si = np.take_along_axis(all_i, o, axis=1)
+            dup = np.zeros_like(si, dtype=bool)
+            dup[:, 1:] = (si[:, 1:] == si[:, :-1]) & (si[:, 1:] >= 0)
+            np.put_along_axis(all_d, o, np.where(dup, np.inf, np.take_along_axis(all_d, o, axis=1)), axis=1)
+
+            top = np.argsort(all_d, axis=1, kind="stable")[:, :k]
+            best_i[pts] = np.take_along_axis(all_i, top, axis=1)
+            best_d[pts] = np.take_along_axis(all_d, top, axis=1)
+
+    def kneighbors_self(self, X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float64)
+        n, k = X.shape[0], self.n_neighbors
+        seeds = check_random_state(self.random_state).randint(np.iinfo(np.int32).max, size=self.n_trees)
+        trees = Parallel(n_jobs=self.n_jobs, prefer="threads")(
+            delayed(self._build_tree)(X, int(sd)) for sd in seeds
+        )
+        best_d = np.full((n, k), np.inf)
+        best_i = np.full((n, k), -1, dtype=np.intp)
+        for leaves in trees:
+            self._merge_leaves(X, leaves, best_d, best_i)
+        # 후보가 k개 미만인 점(잎이 매우 작은 경우)은 자기 자신으로 채움
+        missing = best_i < 0
+        if missing.any():
+            best_i[missing] = np.nonzero(missing)[0]
+        return best_i
+
+
+NEIGHBOR_BACKENDS = {"exact": ExactNeighbors, "rp_forest": RandomProjectionForest}
+
+def make_neighbor_backend(backend, n_neighbors: int, n_jobs=None, chunk_size: int = 10000, random_state=None):
+    """문자열 이름 또는 kneighbors_self(X)를 가진 객체를 백엔드로 변환"""
+    if hasattr(backend, "kneighbors_self"):
+        return backend
+    if backend == "exact":
+        return ExactNeighbors(n_neighbors, n_jobs=n_jobs, chunk_size=chunk_size)
+    if backend == "rp_forest":
+        return RandomProjectionForest(n_neighbors, n_jobs=n_jobs, chunk_size=chunk_size,
+                                      random_state=random_state)
+    raise ValueError(f"unknown neighbor_backend: {backend!r} (choose from {list(NEIGHBOR_BACKENDS)})")
+
 
 # =========================================================
 # 0) 커스텀 오버샘플러: MajorityVoteSMOTENC
 #    - 수치형: 선형보간
 #    - 범주형: k-이웃 다수결(동률 랜덤)
+#    - 합성은 NumPy 일괄 연산 (행 단위 Series 복사 없음)
+#    - 이웃 탐색: neighbor_backend="exact"(기본) | "rp_forest"(근사)
 #    - 반드시 전처리(OneHot) 이전에 배치!
 # =========================================================
 class MajorityVoteSMOTENC(BaseSampler):
@@ -22,12 +163,24 @@ class MajorityVoteSMOTENC(BaseSampler):
                  categorical_features: Sequence[Union[int, str]],
                  k_neighbors: int = 5,
                  sampling_strategy="auto",
-                 random_state: int = 42):
+                 random_state: int = 42,
+                 neighbor_backend="exact",
+                 n_jobs=None,
+                 chunk_size: int = 10000):
         super().__init__(sampling_strategy=sampling_strategy)
         # ✅ 파라미터를 그대로 저장 (list() 변환 제거)
         self.categorical_features = categorical_features
         self.k_neighbors = k_neighbors
         self.random_state = random_state
+        self.neighbor_backend = neighbor_backend
+        self.n_jobs = n_jobs
+        self.chunk_size = chunk_size
+
+    def __setstate__(self, state):
+        # 이웃 백엔드 파라미터 추가 이전에 저장된 모델(pkl) 호환
+        super().__setstate__(state)
+        for key, default in (("neighbor_backend", "exact"), ("n_jobs", None), ("chunk_size", 10000)):
+            self.__dict__.setdefault(key, default)
 
     def _validate_and_indexify(self, X: pd.DataFrame):
         if not isinstance(X, pd.DataFrame):
@@ -45,6 +198,30 @@ class MajorityVoteSMOTENC(BaseSampler):
         num_idx = [i for i in all_idx if i not in cat_idx]
         return cat_idx, num_idx
 
+    # ===== 범주형 다수결 후보 (정수 코드 + bincount, 행 단위 반복 없음) =====
+    @staticmethod
+    def _vote_modes(codes: np.ndarray, neigh: np.ndarray, n_levels: int):
+        """
+        각 소수 샘플 i의 이웃 범주값 최빈값 후보
+        - 반환: order (n_min×n_levels, 행별 앞쪽 n_modes[i]개가 최빈값 코드), n_modes (n_min,)
+        - 후보 순서는 이웃 목록에서 처음 등장한 순서 (value_counts 동률 순서와 동일)
+        """
+        n_min, k = neigh.shape
+        nb = codes[neigh]                               # (n_min, k), 결측은 -1
+        rows = np.repeat(np.arange(n_min), k)
+        valid = nb.ravel() >= 0
+        counts = np.bincount(rows[valid] * n_levels + nb.ravel()[valid],
+                             minlength=n_min * n_levels).reshape(n_min, n_levels)
+        max_count = counts.max(axis=1, initial=0)
+        is_mode = (counts == max_count[:, None]) & (max_count[:, None] > 0)
+
+        first = np.full((n_min, n_levels), k, dtype=np.int64)
+        for p in range(k - 1, -1, -1):                  # 뒤에서부터 덮어써 최초 위치만 남김
+            ok = nb[:, p] >= 0
+            first[np.flatnonzero(ok), nb[ok, p]] = p
+        order = np.argsort(np.where(is_mode, first, k + 1), axis=1, kind="stable")
+        return order, is_mode.sum(axis=1)
+
     # ★ BaseSampler가 요구하는 추상 메서드 구현
     def _fit_resample(self, X, y):
         rs = check_random_state(self.random_state)
@@ -80,6 +257,7 @@ class MajorityVoteSMOTENC(BaseSampler):
 
         # 소수 클래스 서브셋
         X_min = X[y == target_class].reset_index(drop=True)
+        n_min = len(X_min)
 
         # 이웃 탐색 임베딩(수치형 우선, 없으면 범주형 OHE)
         if len(num_idx) == 0:
@@ -88,41 +266,64 @@ class MajorityVoteSMOTENC(BaseSampler):
         else:
             X_emb = X_min.iloc[:, num_idx].to_numpy()
 
-        nn = NearestNeighbors(
-            n_neighbors=min(self.k_neighbors + 1, len(X_min)),
-            metric="euclidean"
+        backend = make_neighbor_backend(
+            self.neighbor_backend,
+            n_neighbors=min(self.k_neighbors + 1, n_min),
+            n_jobs=self.n_jobs,
+            chunk_size=self.chunk_size,
+            random_state=self.random_state,
         )
-        nn.fit(X_emb)
-        neigh_idx = nn.kneighbors(X_emb, return_distance=False)
-
-        synth_rows = []
-        for _ in range(n_new):
-            i = rs.randint(0, len(X_min))
-            neighs = neigh_idx[i][1:] if neigh_idx.shape[1] > 1 else neigh_idx[i]
-            j = i if np.size(neighs) == 0 else rs.choice(neighs)
-
-            xi = X_min.iloc[i, :].copy()
-            xj = X_min.iloc[j, :].copy()
-            x_new = xi.copy()
-
-            # 1) 수치형 보간
-            if len(num_idx) > 0:
-                lam = rs.rand()
-                x_new.iloc[num_idx] = xi.iloc[num_idx] + lam * (xj.iloc[num_idx] - xi.iloc[num_idx])
-
-            # 2) 범주형 다수결(동률 랜덤)
-            if len(cat_idx) > 0:
-                neigh_cats = X_min.iloc[neighs, cat_idx] if np.size(neighs) > 0 else X_min.iloc[[i], cat_idx]
-                for col_pos, col_idx_val in enumerate(cat_idx):
-                    counts = neigh_cats.iloc[:, col_pos].value_counts()
-                    max_count = counts.max()
-                    modes = counts[counts == max_count].index.tolist()
-                    chosen = rs.choice(modes)
-                    x_new.iloc[col_idx_val] = chosen
-
-            synth_rows.append(x_new)
-
-        X_syn = pd.DataFrame(synth_rows, columns=X.columns)
+        neigh_idx = backend.kneighbors_self(X_emb)
+        neigh = neigh_idx[:, 1:] if neigh_idx.shape[1] > 1 else neigh_idx
+        k = neigh.shape[1]
+
+        # 범주형: 정수 코드화 후 샘플별 최빈값 후보를 미리 계산
+        cat_codes, cat_uniques, cat_order, cat_n_modes = [], [], [], []
+        for col_idx_val in cat_idx:
+            codes, uniques = pd.factorize(X_min.iloc[:, col_idx_val])
+            order, n_modes = self._vote_modes(codes, neigh, max(len(uniques), 1))
+            cat_codes.append(codes)
+            cat_uniques.append(uniques)
+            cat_order.append(order)
+            cat_n_modes.append(n_modes)
+
+        # 1) 난수 추출 — 기존 구현과 같은 순서(i → 이웃 → λ → 범주별 동률)로 뽑아야 동일 결과
+        #    (legacy RandomState의 randint는 상한이 바뀌면 일괄 추출 결과가 달라지므로 스칼라 호출 유지)
+        randint, rand = rs.randint, rs.rand
+        has_num, n_cat = len(num_idx) > 0, len(cat_idx)
+        n_modes_lists = [m.tolist() for m in cat_n_modes]
+        i_arr = np.empty(n_new, dtype=np.int64)
+        j_pos = np.empty(n_new, dtype=np.int64)
+        lam = np.zeros(n_new)
+        picks = np.empty((n_new, n_cat), dtype=np.int64)
+        for t in range(n_new):
+            i = randint(0, n_min)
+            i_arr[t] = i
+            j_pos[t] = randint(0, k)                    # == rs.choice(neigh[i])
+            if has_num:
+                lam[t] = rand()
+            for c in range(n_cat):
+                m = n_modes_lists[c][i]
+                if m == 0:
+                    raise ValueError(f"범주형 열 {X.columns[cat_idx[c]]!r}: 이웃 값이 모두 결측입니다.")
+                picks[t, c] = randint(0, m)             # == rs.choice(modes)
+        j_arr = neigh[i_arr, j_pos]
+
+        # 2) 수치형 보간 (브로드캐스트 1회)
+        syn = {}
+        if has_num:
+            num = X_min.iloc[:, num_idx].to_numpy(dtype=np.float64)
+            xi, xj = num[i_arr], num[j_arr]
+            vals = xi + lam[:, None] * (xj - xi)
+            for pos, col_idx_val in enumerate(num_idx):
+                syn[X.columns[col_idx_val]] = vals[:, pos]
+
+        # 3) 범주형 다수결 결과
+        for c, col_idx_val in enumerate(cat_idx):
+            level = cat_order[c][i_arr, picks[:, c]]
+            syn[X.columns[col_idx_val]] = cat_uniques[c].take(level)
+
+        X_syn = pd.DataFrame(syn, columns=X.columns)
         y_syn = pd.Series([target_class] * len(X_syn), name=y.name)
 
         X_res = pd.concat([X, X_syn], axis=0, ignore_index=True)
@@ -0,0 +1,293 @@
+# models/FinalModel/train_per_mold.py
+# 금형(mold_code)별 파이프라인 병렬 학습 → models/RandomForest/<family>_mold_*.pkl
+#
+# 사용 예)
+#   python models/FinalModel/train_per_mold.py                       # data/train.csv, 전체 CPU, RF
+#   python models/FinalModel/train_per_mold.py --n-jobs 16 --time-budget 3600 --publish
+#   python models/FinalModel/train_per_mold.py --family hgb --out models/HistGB
+#   python models/FinalModel/train_per_mold.py --params params.json  # {"smote": {...}, "rf": {...}}
+import argparse
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))  # pkl 안의 클래스 경로를 shared.py 와 동일하게 유지
+
+from models.FinalModel.smote_sampler import MajorityVoteSMOTENC  # noqa: E402
+
+DEFAULT_DATA = ROOT / "data" / "train.csv"
+DEFAULT_OUT = ROOT / "models" / "RandomForest"
+DEFAULT_CACHE = ROOT / "cache" / "train_pipeline"
+
+TARGET = "passorfail"
+MOLD_COL = "mold_code"
+MOLDS = ["8412", "8573", "8600", "8722", "8917"]
+
+# service_predict.do_predict 입력과 같은 순서
+NUM_COLS = [
+    "molten_temp", "molten_volume", "sleeve_temperature", "EMS_operation_time",
+    "cast_pressure", "biscuit_thickness", "low_section_speed", "high_section_speed",
+    "physical_strength", "upper_mold_temp1", "upper_mold_temp2", "lower_mold_temp1",
+    "lower_mold_temp2", "Coolant_temperature", "facility_operation_cycleTime",
+    "production_cycletime", "count",
+]
+CAT_COLS = ["working", "tryshot_signal"]
+
+DEFAULT_PARAMS = {
+    "smote": {"sampling_strategy": 0.2, "k_neighbors": 5, "random_state": 42},
+    "rf": {"n_estimators": 300, "max_depth": None, "min_samples_leaf": 1,
+           "max_features": "sqrt", "random_state": 42},
+    "hgb": {"learning_rate": 0.1, "max_iter": 300, "max_leaf_nodes": 31,
+            "early_stopping": False, "random_state": 42},
+    "lgbm": {"n_estimators": 300, "learning_rate": 0.05, "num_leaves": 31,
+             "random_state": 42, "verbose": -1},
+    "test_size": 0.2,
+}
+SPLIT_SEED = 42   # 학습/평가 분할 시드 — manifest 에 기록 (compact_forest 가 같은 holdout 을 재현할 때 확인)
+FAMILIES = ("rf", "hgb", "lgbm")
+
+_THREAD_ENV = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS",
+               "NUMEXPR_NUM_THREADS", "VECLIB_MAXIMUM_THREADS")
+
+
+# ===== CPU 배분 / 스레드 고정 =====
+def cpu_budget(n_jobs: int | None, n_tasks: int) -> tuple[int, int]:
+    """전체 CPU 수 → (프로세스 수, 프로세스당 스레드 수)"""
+    total = os.cpu_count() or 1
+    if n_jobs is not None and n_jobs > 0:
+        total = min(total, n_jobs)
+    workers = max(1, min(n_tasks, total))
+    return workers, max(1, total // workers)
+
+def pin_threads(n_threads: int):
+    """워커 초기화: BLAS/OpenMP 스레드를 n_threads로 제한 (과다 구독 방지)"""
+    for key in _THREAD_ENV:
+        os.environ[key] = str(n_threads)
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(n_threads)
+    except ImportError:
+        pass
+
+
+# ===== 데이터 =====
+def file_sha1(path: Path, chunk: int = 1 << 20) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def load_training_frame(path: Path) -> pd.DataFrame:
+    """학습용 컬럼만 로드 + 최소 정제 (SMOTE 이웃 탐색은 결측을 허용하지 않음)"""
+    df = pd.read_csv(path, usecols=lambda c: c in set(NUM_COLS + CAT_COLS + [TARGET, MOLD_COL]))
+    df = df.dropna(subset=[TARGET, MOLD_COL])
+    df[MOLD_COL] = df[MOLD_COL].astype(int).astype(str)
+    df[TARGET] = df[TARGET].astype(int)
+    df["tryshot_signal"] = df["tryshot_signal"].fillna("A")   # 화면 입력: 미체크 = "A"
+    df["working"] = df["working"].fillna("가동")
+    # 수치형 결측은 금형별 중앙값으로 채움
+    df[NUM_COLS] = df.groupby(MOLD_COL)[NUM_COLS].transform(lambda s: s.fillna(s.median()))
+    df[NUM_COLS] = df[NUM_COLS].fillna(df[NUM_COLS].median())
+    return df.dropna(subset=NUM_COLS)
+
+
+# ===== 파이프라인 =====
+def make_estimator(family: str, params: dict, n_threads: int = 1):
+    """모델 계열별 분류기 (모두 shap.TreeExplainer 지원)"""
+    if family == "rf":
+        from sklearn.ensemble import RandomForestClassifier
+        return RandomForestClassifier(n_jobs=n_threads, **params["rf"])
+    if family == "hgb":
+        from sklearn.ensemble import HistGradientBoostingClassifier
+        return HistGradientBoostingClassifier(**params["hgb"])   # 스레드 수는 OpenMP 제한을 따름
+    if family == "lgbm":
+        from lightgbm import LGBMClassifier
+        return LGBMClassifier(n_jobs=n_threads, **params["lgbm"])
+    raise ValueError(f"unknown model family: {family!r} (choose from {FAMILIES})")
+
+def build_pipeline(params: dict, n_threads: int = 1, memory=None, family: str = "rf"):
+    """SMOTE(전처리 이전) → preprocess → model (step 이름은 shared.py 에서 사용)"""
+    from imblearn.pipeline import Pipeline as ImbPipeline
+    from sklearn.compose import ColumnTransformer
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+    preprocess = ColumnTransformer([
+        ("num", StandardScaler(), NUM_COLS),
+        ("cat", OneHotEncoder(handle_unknown="ignore", sparse_output=False), CAT_COLS),
+    ])
+    return ImbPipeline(steps=[
+        ("smote", MajorityVoteSMOTENC(categorical_features=CAT_COLS, n_jobs=n_threads, **params["smote"])),
+        ("preprocess", preprocess),
+        ("model", make_estimator(family, params, n_threads)),
+    ], memory=memory)
+
+def split_mold(frame: pd.DataFrame, test_size: float, random_state: int = SPLIT_SEED):
+    """금형 데이터 → (X_tr, X_te, y_tr, y_te), 학습/벤치마크 공통 분할"""
+    from sklearn.model_selection import train_test_split
+
+    X, y = frame[NUM_COLS + CAT_COLS], frame[TARGET]
+    stratify = y if y.value_counts().min() >= 2 else None
+    return train_test_split(X, y, test_size=test_size, stratify=stratify, random_state=random_state)
+
+def _metrics(y_true, y_pred, y_proba) -> dict:
+    from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score, roc_auc_score
+    out = {
+        "accuracy": accuracy_score(y_true, y_pred),
+        "f1": f1_score(y_true, y_pred, pos_label=1, zero_division=0),
+        "precision": precision_score(y_true, y_pred, pos_label=1, zero_division=0),
+        "recall": recall_score(y_true, y_pred, pos_label=1, zero_division=0),
+    }
+    out["roc_auc"] = roc_auc_score(y_true, y_proba) if len(np.unique(y_true)) > 1 else None
+    return {k: (None if v is None else round(float(v), 6)) for k, v in out.items()}
+
+def train_one(mold: str, frame: pd.DataFrame, params: dict, n_threads: int,
+              version_dir: str, cache_dir: str | None, family: str = "rf") -> dict:
+    """워커 프로세스: 금형 1개 학습 → 아티팩트 저장 → manifest 항목 반환"""
+    t0 = time.perf_counter()
+    y = frame[TARGET]
+    X_tr, X_te, y_tr, y_te = split_mold(frame, params["test_size"])
+    memory = joblib.Memory(str(Path(cache_dir) / mold), verbose=0) if cache_dir else None
+    pipe = build_pipeline(params, n_threads=n_threads, memory=memory, family=family)
+    pipe.fit(X_tr, y_tr)
+    proba = pipe.predict_proba(X_te)[:, 1]
+    metrics = _metrics(y_te, (proba >= 0.5).astype(int), proba)
+
+    pipe.memory = None  # 캐시 경로는 아티팩트에 남기지 않음
+    artifact = Path(version_dir) / f"{family}_mold_{mold}.pkl"
+    joblib.dump(pipe, artifact)
+    return {
+        "mold_code": mold,
+        "family": family,
+        "status": "ok",
+        "artifact": artifact.name,
+        "n_train": int(len(X_tr)),
+        "n_test": int(len(X_te)),
+        "pos_rate": round(float(y.mean()), 6),
+        "metrics": metrics,
+        "train_time_s": round(time.perf_counter() - t0, 2),
+        "threads": n_threads,
+    }
+
+
+# ===== 실행 =====
+def run(data_path: Path, out_dir: Path, params: dict, molds=None, n_jobs=None,
+        time_budget: float | None = None, cache_dir: Path | None = DEFAULT_CACHE,
+        publish: bool = False, family: str = "rf") -> dict:
+    t_start = time.perf_counter()
+    data_hash = file_sha1(data_path)
+    df = load_training_frame(data_path)
+    molds = [m for m in (molds or MOLDS) if (df[MOLD_COL] == m).any()]
+    workers, threads = cpu_budget(n_jobs, len(molds))
+
+    version = f"{datetime.now():%Y%m%d_%H%M%S}_{data_hash[:8]}"
+    version_dir = out_dir / "versions" / version
+    version_dir.mkdir(parents=True, exist_ok=True)
+    print(f"[train] version={version} family={family} molds={molds} workers={workers} threads/worker={threads}")
+
+    results = {}
+    ctx = mp.get_context("spawn")  # fork + OpenMP 스레드 조합 회피
+    pool = ctx.Pool(processes=workers, initializer=pin_threads, initargs=(threads,))
+    try:
+        pending = {
+            m: pool.apply_async(train_one, (m, df[df[MOLD_COL] == m], params, threads,
+                                            str(version_dir), str(cache_dir) if cache_dir else None, family))
+            for m in molds
+        }
+        for m, res in pending.items():
+            remaining = None if time_budget is None else max(0.0, time_budget - (time.perf_counter() - t_start))
+            try:
+                results[m] = res.get(timeout=remaining)
+                r = results[m]
+                print(f"[train] mold {m}: f1={r['metrics']['f1']} auc={r['metrics']['roc_auc']} ({r['train_time_s']}s)")
+            except mp.TimeoutError:
+                results[m] = {"mold_code": m, "status": "timeout"}
+                print(f"[train] mold {m}: time budget exceeded")
+            except Exception as e:
+                results[m] = {"mold_code": m, "status": "error", "error": repr(e)}
+                print(f"[train] mold {m}: error {e!r}")
+    finally:
+        pool.terminate()   # 시간 초과 워커까지 정리
+        pool.join()
+
+    manifest = {
+        "version": version,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "data": {"path": str(data_path), "sha1": data_hash, "n_rows": int(len(df))},
+        "family": family,
+        "params": params,
+        "split": {"test_size": params["test_size"], "random_state": SPLIT_SEED},
+        "features": {"num": NUM_COLS, "cat": CAT_COLS},
+        "cpu": {"workers": workers, "threads_per_worker": threads},
+        "wall_time_s": round(time.perf_counter() - t_start, 2),
+        "molds": [results[m] for m in molds],
+    }
+    with open(version_dir / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    if publish:
+        publish_version(version_dir, out_dir)
+    return manifest
+
+def publish_version(version_dir: Path, out_dir: Path):
+    """성공한 금형 아티팩트만 shared.py 로딩 위치로 교체 (파일 단위 원자적 교체)"""
+    with open(version_dir / "manifest.json", "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    for entry in manifest["molds"]:
+        if entry.get("status") != "ok":
+            continue
+        tmp = out_dir / f".{entry['artifact']}.tmp"
+        shutil.copyfile(version_dir / entry["artifact"], tmp)
+        os.replace(tmp, out_dir / entry["artifact"])
+    shutil.copyfile(version_dir / "manifest.json", out_dir / "manifest.json")
+    print(f"[train] published {manifest['version']} → {out_dir}")
+
+def _load_params(path: str | None) -> dict:
+    params = json.loads(json.dumps(DEFAULT_PARAMS))
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            override = json.load(f)
+        for key, val in override.items():
+            if isinstance(val, dict):
+                params.setdefault(key, {}).update(val)
+            else:
+                params[key] = val
+    return params
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="금형별 파이프라인 병렬 학습")
+    ap.add_argument("--data", default=os.environ.get("DIECAST_TRAIN_DATA", str(DEFAULT_DATA)))
+    ap.add_argument("--out", default=str(DEFAULT_OUT))
+    ap.add_argument("--family", choices=FAMILIES, default="rf")
+    ap.add_argument("--params", default=None, help="하이퍼파라미터 JSON (기본값 위에 덮어씀)")
+    ap.add_argument("--molds", nargs="*", default=None)
+    ap.add_argument("--n-jobs", type=int, default=None, help="전체 CPU 예산 (기본: 모든 코어)")
+    ap.add_argument("--time-budget", type=float, default=None, help="전체 제한 시간(초)")
+    ap.add_argument("--no-cache", action="store_true", help="SMOTE/전처리 fit 캐시 사용 안 함")
+    ap.add_argument("--publish", action="store_true", help="성공한 모델을 --out 위치에 반영")
+    args = ap.parse_args(argv)
+
+    manifest = run(
+        Path(args.data), Path(args.out), _load_params(args.params),
+        molds=args.molds, n_jobs=args.n_jobs, time_budget=args.time_budget,
+        cache_dir=None if args.no_cache else DEFAULT_CACHE, publish=args.publish,
+        family=args.family,
+    )
+    failed = [m["mold_code"] for m in manifest["molds"] if m.get("status") != "ok"]
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
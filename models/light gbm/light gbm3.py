@@ -1,20 +1,27 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split, StratifiedKFold, cross_val_score
+from sklearn.model_selection import train_test_split, StratifiedKFold
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 from sklearn.compose import ColumnTransformer
-from sklearn.metrics import f1_score, accuracy_score, roc_auc_score, recall_score, make_scorer
+from sklearn.metrics import f1_score, accuracy_score, roc_auc_score, recall_score
 from lightgbm import LGBMClassifier
 from imblearn.over_sampling import SMOTE
 from imblearn.pipeline import Pipeline as ImbPipeline
 import optuna
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from tuning_harness import FoldCache, cv_score, load_xy, make_pruner, open_study, parse_args, plan_cpu  # noqa: E402
+
+args = parse_args()
+# LightGBM은 모델 스레드로 코어를 쓰고 trial은 순차 (3중 병렬 과다 구독 방지)
+cpu = plan_cpu(args.cpu_budget, model_threads=args.cpu_budget)
 
 # ==============================================================
 # 1. 데이터 불러오기
 # ==============================================================
-df = pd.read_csv("C:\\Users\\USER\\Desktop\\diecasting-project\\data\\data1.csv")
-X = df.drop(columns="passorfail")
-y = df["passorfail"]
+X, y = load_xy(args.data)
 
 # ==============================================================
 # 2. 컬럼 타입 분리
@@ -39,6 +46,10 @@ preprocessor = ColumnTransformer(
 # ==============================================================
 cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=42)
 
+# 폴드별 전처리 + SMOTE 결과는 한 번만 만들고 모든 trial이 재사용
+fold_cache = FoldCache(X, y, preprocessor, SMOTE(sampling_strategy=0.2, random_state=42), cv,
+                       cache_dir=args.cache_dir).prepare()
+
 def objective(trial):
     params = {
         "objective": "binary",
@@ -50,30 +61,19 @@ def objective(trial):
         "bagging_fraction": trial.suggest_float("bagging_fraction", 0.6, 1.0),
         "bagging_freq": trial.suggest_int("bagging_freq", 0, 10),
         "random_state": 42,
-        "n_jobs": -1,
+        "n_jobs": cpu["model_threads"],
         "class_weight": "balanced"   # 불균형 추가 대응
     }
 
     lgb_model = LGBMClassifier(**params)
-    clf = ImbPipeline(steps=[
-        ("preprocessor", preprocessor),
-        ("smote", SMOTE(sampling_strategy=0.2, random_state=42)),
-        ("model", lgb_model)
-    ])
-
-    score = cross_val_score(
-        clf, X, y,
-        scoring=make_scorer(f1_score, pos_label=1),
-        cv=cv,
-        n_jobs=-1
-    ).mean()
-    return score
+    return cv_score(lgb_model, fold_cache, trial=trial)
 
 # ==============================================================
 # 5. Optuna 실행
 # ==============================================================
-study = optuna.create_study(direction="maximize")
-study.optimize(objective, n_trials=50, n_jobs=-1)
+# 저장소의 study를 이어서 사용 (같은 명령을 여러 프로세스에서 실행하면 병렬 탐색)
+study = open_study("lightgbm", fold_cache.key, args, pruner=make_pruner(args.pruner, fold_cache.n_splits))
+study.optimize(objective, n_trials=args.n_trials, n_jobs=cpu["trials"])
 
 print("\n✅ [Optuna] Best Params:", study.best_params)
 print("✅ [Optuna] Best CV F1 Score:", study.best_value)
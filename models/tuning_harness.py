@@ -0,0 +1,243 @@
+# models/tuning_harness.py
+# Optuna 튜닝 스크립트 공용 하네스
+#  - 데이터 경로: --data 인자 > DIECAST_TUNING_DATA 환경변수 > data/data1.csv
+#  - 폴드별 (전처리 + SMOTE) 결과를 디스크(.npy, memmap)에 캐시 → trial은 모델 fit만 수행
+#  - CPU 예산을 trial 병렬 수 × 모델 스레드로 나눔 (폴드는 순차 → 1폴드 후 가지치기 가능)
+#  - study는 SQLite/저널 파일에 저장 → 중단 후 재개, 여러 프로세스·서버가 같은 study에 참여
+import argparse
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.base import clone
+from sklearn.metrics import f1_score
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_DATA = ROOT / "data" / "data1.csv"
+DEFAULT_CACHE = ROOT / "cache" / "cv_folds"
+DEFAULT_STORAGE = f"sqlite:///{(ROOT / 'cache' / 'optuna' / 'tuning.db').as_posix()}"
+TARGET = "passorfail"
+
+
+# ===== 데이터 =====
+def parse_args(argv=None, description: str = "Optuna 튜닝") -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description=description)
+    ap.add_argument("--data", default=os.environ.get("DIECAST_TUNING_DATA", str(DEFAULT_DATA)),
+                    help="학습 CSV 경로 (기본: DIECAST_TUNING_DATA 또는 data/data1.csv)")
+    ap.add_argument("--cache-dir", default=str(DEFAULT_CACHE), help="폴드 캐시 위치")
+    ap.add_argument("--n-trials", type=int, default=50)
+    ap.add_argument("--cpu-budget", type=int, default=os.cpu_count() or 1,
+                    help="전체 사용 코어 수 (trial 병렬 × 모델 스레드)")
+    ap.add_argument("--pruner", choices=["median", "hyperband", "none"], default="median")
+    ap.add_argument("--storage", default=os.environ.get("DIECAST_OPTUNA_STORAGE", DEFAULT_STORAGE),
+                    help="sqlite:///경로.db | journal:경로.log (공유 파일시스템이면 journal 권장)")
+    ap.add_argument("--study-name", default=None, help="기본: <스크립트>-<데이터 키>")
+    ap.add_argument("--no-warm-start", action="store_true", help="이전 데이터 버전 최적값 주입 안 함")
+    args, _ = ap.parse_known_args(argv)
+    return args
+
+def load_xy(path: str | Path, target: str = TARGET):
+    df = pd.read_csv(path)
+    return df.drop(columns=target), df[target]
+
+def split_columns(X: pd.DataFrame):
+    """(범주형, 수치형) 컬럼 목록"""
+    cat_cols = X.select_dtypes(include=["object"]).columns.tolist()
+    num_cols = X.select_dtypes(include=[np.number]).columns.tolist()
+    return cat_cols, num_cols
+
+
+# ===== 폴드 캐시 =====
+def _frame_hash(X: pd.DataFrame, y: pd.Series) -> str:
+    h = hashlib.sha1()
+    h.update(repr(list(X.columns)).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(X, index=False).to_numpy().tobytes())
+    h.update(pd.util.hash_pandas_object(y, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+def _params_repr(obj) -> str:
+    if obj is None:
+        return "None"
+    params = obj.get_params(deep=True)
+    return repr(sorted((k, repr(v)) for k, v in params.items()))
+
+def _dense(A) -> np.ndarray:
+    return np.asarray(A.toarray() if sparse.issparse(A) else A, dtype=np.float64)
+
+
+class FoldCache:
+    """
+    CV 폴드별 전처리·리샘플링 결과 캐시
+    - 키: 데이터 해시 + 전처리기/샘플러 파라미터 + CV 설정 → 같은 조건이면 스크립트가 달라도 재사용
+    - 각 폴드: 전처리기는 학습 폴드에만 fit, 샘플러는 변환된 학습 폴드에만 적용 (검증 폴드는 원본 분포)
+    - 배열은 .npy 로 저장 후 mmap_mode="r" 로 열어 trial 간·프로세스 간 메모리 공유
+    """
+
+    def __init__(self, X: pd.DataFrame, y: pd.Series, preprocessor, sampler, cv,
+                 cache_dir: str | Path = DEFAULT_CACHE):
+        self.X = X.reset_index(drop=True)
+        self.y = pd.Series(y).reset_index(drop=True)
+        self.preprocessor = preprocessor
+        self.sampler = sampler
+        self.cv = cv
+        raw = "|".join([
+            _frame_hash(self.X, self.y),
+            _params_repr(preprocessor),
+            type(sampler).__name__ + _params_repr(sampler),
+            type(cv).__name__ + repr(sorted(vars(cv).items())),
+        ])
+        self.key = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+        self.dir = Path(cache_dir) / self.key
+        self.n_splits = cv.get_n_splits(self.X, self.y)
+        self._folds: dict[int, tuple] = {}
+
+    def _paths(self, i: int) -> dict:
+        return {name: self.dir / f"fold{i}_{name}.npy" for name in ("X_tr", "y_tr", "X_va", "y_va")}
+
+    def _build(self, i: int, tr: np.ndarray, va: np.ndarray):
+        pre = clone(self.preprocessor)
+        X_tr = _dense(pre.fit_transform(self.X.iloc[tr], self.y.iloc[tr]))
+        X_va = _dense(pre.transform(self.X.iloc[va]))
+        y_tr = self.y.iloc[tr].to_numpy()
+        if self.sampler is not None:
+            X_tr, y_tr = clone(self.sampler).fit_resample(X_tr, y_tr)
+        arrays = {"X_tr": np.asarray(X_tr, dtype=np.float64), "y_tr": np.asarray(y_tr),
+                  "X_va": X_va, "y_va": self.y.iloc[va].to_numpy()}
+        self.dir.mkdir(parents=True, exist_ok=True)
+        for name, path in self._paths(i).items():
+            tmp = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npy")
+            np.save(tmp, arrays[name])
+            os.replace(tmp, path)   # 여러 프로세스가 동시에 만들어도 완성된 파일만 보임
+
+    def prepare(self) -> "FoldCache":
+        """없는 폴드만 만들어 둠 (이미 있으면 디스크 확인만)"""
+        for i, (tr, va) in enumerate(self.cv.split(self.X, self.y)):
+            if not all(p.exists() for p in self._paths(i).values()):
+                print(f"[tuning] building fold {i + 1}/{self.n_splits} → {self.dir}")
+                self._build(i, tr, va)
+        meta = self.dir / "meta.json"
+        if not meta.exists():
+            with open(meta, "w", encoding="utf-8") as f:
+                json.dump({"n_splits": self.n_splits, "n_rows": int(len(self.X)),
+                           "preprocessor": type(self.preprocessor).__name__,
+                           "sampler": type(self.sampler).__name__}, f, ensure_ascii=False)
+        return self
+
+    def fold(self, i: int):
+        """(X_tr, y_tr, X_va, y_va) — 읽기 전용 memmap"""
+        if i not in self._folds:
+            paths = self._paths(i)
+            if not all(p.exists() for p in paths.values()):
+                self.prepare()
+            self._folds[i] = tuple(np.load(paths[n], mmap_mode="r") for n in ("X_tr", "y_tr", "X_va", "y_va"))
+        return self._folds[i]
+
+
+# ===== CPU 예산 =====
+def plan_cpu(budget: int, model_threads: int = 1) -> dict:
+    """
+    중첩 병렬(optuna n_jobs × CV n_jobs × 모델 n_jobs) 대신 한 단계씩만 병렬화
+    - trials: study.optimize(n_jobs=...) 에 넘길 동시 trial 수
+    - model_threads: 모델 자체 스레드 (LightGBM n_jobs 등, 단일 스레드 모델은 1)
+    - 폴드는 항상 순차 (폴드마다 중간 점수 보고 → 가지치기)
+    """
+    budget = max(1, int(budget))
+    model_threads = max(1, min(int(model_threads), budget))
+    plan = {"budget": budget, "trials": max(1, budget // model_threads), "model_threads": model_threads}
+    limit_threads(model_threads)
+    print(f"[tuning] cpu plan: {plan}")
+    return plan
+
+def limit_threads(n_threads: int):
+    """BLAS/OpenMP 스레드 상한 (trial 스레드마다 코어 전체를 쓰지 않도록)"""
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(n_threads)
+    except ImportError:
+        pass
+
+def make_pruner(name: str = "median", n_splits: int = 5):
+    import optuna
+    if name == "median":
+        return optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=0)
+    if name == "hyperband":
+        return optuna.pruners.HyperbandPruner(min_resource=1, max_resource=n_splits)
+    return optuna.pruners.NopPruner()
+
+
+# ===== 평가 =====
+def f1_pos(y_true, y_pred) -> float:
+    return f1_score(y_true, y_pred, pos_label=1)
+
+def cv_score(estimator, cache: FoldCache, metric: Callable = f1_pos, trial=None) -> float:
+    """
+    캐시된 폴드에서 estimator만 fit → metric 평균
+    - trial이 주어지면 폴드마다 누적 평균을 보고하고, 가지치기 대상이면 즉시 중단
+    """
+    scores = []
+    for i in range(cache.n_splits):
+        X_tr, y_tr, X_va, y_va = cache.fold(i)
+        model = clone(estimator).fit(X_tr, y_tr)
+        scores.append(metric(y_va, model.predict(X_va)))
+        if trial is not None:
+            trial.report(float(np.mean(scores)), step=i)
+            if trial.should_prune():
+                import optuna
+                raise optuna.TrialPruned()
+    return float(np.mean(scores))
+
+
+# ===== 영속 study =====
+def open_storage(url: str):
+    """sqlite:///... → RDB, journal:경로 또는 *.log → 파일 락 기반 저널 스토리지"""
+    import optuna
+    if url.startswith("journal:") or url.endswith(".log"):
+        path = Path(url.split(":", 1)[1] if url.startswith("journal:") else url)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            from optuna.storages.journal import JournalFileBackend
+        except ImportError:  # optuna < 4.0
+            from optuna.storages import JournalFileStorage as JournalFileBackend
+        return optuna.storages.JournalStorage(JournalFileBackend(str(path)))
+    if url.startswith("sqlite:///"):
+        Path(url[len("sqlite:///"):]).parent.mkdir(parents=True, exist_ok=True)
+    return url
+
+def _previous_best(storage, base: str, current: str):
+    """같은 base 이름의 다른(이전 데이터) study 중 가장 최근 것의 최적 파라미터"""
+    import optuna
+    best = None
+    for summary in optuna.get_all_study_summaries(storage, include_best_trial=True):
+        name = summary.study_name
+        if name == current or not name.startswith(base + "-") or summary.best_trial is None:
+            continue
+        started = summary.datetime_start
+        if best is None or (started and best[0] and started > best[0]):
+            best = (started, summary.best_trial.params, name)
+    return best
+
+def open_study(base: str, data_key: str, args, direction: str = "maximize", pruner=None):
+    """
+    저장소의 study를 이어서 사용 (없으면 생성)
+    - 이름: <base>-<데이터 키> → 같은 데이터·전처리로 실행한 모든 프로세스가 같은 study에 trial 추가
+    - 데이터가 바뀌어 새 study가 생기면 직전 study의 최적 파라미터를 첫 trial로 주입(warm start)
+    """
+    import optuna
+    storage = open_storage(args.storage)
+    name = args.study_name or f"{base}-{data_key}"
+    study = optuna.create_study(study_name=name, storage=storage, direction=direction,
+                                pruner=pruner, load_if_exists=True)
+    study.set_user_attr("data_key", data_key)
+    if not args.no_warm_start and len(study.trials) == 0:
+        prev = _previous_best(storage, base, name)
+        if prev is not None:
+            study.enqueue_trial(prev[1], skip_if_exists=True)
+            print(f"[tuning] warm start from {prev[2]}: {prev[1]}")
+    done = sum(t.state == optuna.trial.TrialState.COMPLETE for t in study.trials)
+    print(f"[tuning] study {name} ({done} completed trials) @ {args.storage}")
+    return study
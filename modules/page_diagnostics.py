@@ -0,0 +1,196 @@
+# modules/page_diagnostics.py — 관리자 진단 페이지 (핫패스 구간 소요 시간 · 입력 데이터 드리프트)
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from shiny import ui, render, reactive
+
+from modules.service_offload import figure_png, png_ui
+from shared import drift_monitor, name_map_kor
+from utils.timing import REGISTRY
+
+REFRESH_SEC = 5
+# JSON 엔드포인트 경로 (app.py 에서 Starlette 라우트로 연결)
+TIMINGS_PATH = "/_diag/timings"
+DRIFT_PATH = "/_diag/drift"
+
+
+def page_diagnostics_ui():
+    return ui.page_fluid(
+        ui.h3("구간별 처리 시간 진단"),
+        ui.p(f"전처리 · predict_proba · SHAP · 조정 가이드(R-SG) · 그래프 렌더링 구간 기록 "
+             f"({REFRESH_SEC}초마다 갱신, JSON: {TIMINGS_PATH})", class_="text-muted"),
+        ui.div(
+            ui.input_action_button("diag_refresh", "새로고침", class_="btn btn-secondary me-2"),
+            ui.input_action_button("diag_reset", "기록 초기화", class_="btn btn-outline-danger"),
+            class_="mb-3",
+        ),
+        ui.card(
+            ui.card_header("📈 구간별 요약 (분위수는 최근 기록 기준)"),
+            ui.output_data_frame("diag_summary_table"),
+        ),
+        ui.layout_columns(
+            ui.card(
+                ui.card_header("📉 입력 데이터 드리프트 (금형·변수별 최근 샷 vs 학습 데이터)"),
+                ui.output_ui("drift_summary"),
+                ui.output_data_frame("drift_table"),
+            ),
+            ui.card(
+                ui.card_header("🚨 드리프트 알림"),
+                ui.output_data_frame("drift_alert_table"),
+            ),
+            col_widths=[7, 5],
+        ),
+        ui.layout_columns(
+            ui.card(
+                ui.card_header("📊 구간 히스토그램"),
+                ui.input_select("diag_stage", "구간 선택", choices=[]),
+                ui.output_ui("diag_hist_plot"),
+            ),
+            ui.card(
+                ui.card_header("🕒 최근 기록"),
+                ui.output_data_frame("diag_recent_table"),
+            ),
+            col_widths=[6, 6],
+        ),
+    )
+
+
+def _hist_figure(snap: dict, stage):
+    """구간 1개의 소요 시간 히스토그램 Figure"""
+    st = snap["stages"].get(stage)
+    fig, ax = plt.subplots(figsize=(7, 3.5))
+    if st is None:
+        ax.text(0.5, 0.5, "기록된 구간이 없습니다", ha="center", va="center", fontsize=12, color="#6c757d")
+        ax.axis("off")
+        return fig
+    edges = snap["buckets_ms"]
+    labels = [f"≤{e}" for e in edges] + [f">{edges[-1]}"]
+    ax.bar(np.arange(len(labels)), st["hist"], color="#0d6efd", alpha=0.7)
+    ax.set_xticks(np.arange(len(labels)), labels, rotation=45, fontsize=8)
+    ax.set_xlabel("ms")
+    ax.set_ylabel("횟수")
+    ax.set_title(f"{stage}  (p50={st['p50_ms']}ms, p95={st['p95_ms']}ms)", fontsize=11)
+    fig.tight_layout()
+    return fig
+
+
+def page_diagnostics_server(input, output, session):
+
+    @reactive.calc
+    def snapshot():
+        input.diag_refresh()
+        reactive.invalidate_later(REFRESH_SEC)
+        return REGISTRY.snapshot(recent=200)
+
+    @reactive.effect
+    @reactive.event(input.diag_reset)
+    def _reset():
+        REGISTRY.reset()
+        if drift_monitor is not None:
+            drift_monitor.reset()
+
+    @reactive.effect
+    def _stage_choices():
+        stages = list(snapshot()["stages"])
+        with reactive.isolate():
+            current = input.diag_stage()
+        ui.update_select("diag_stage", choices=stages,
+                         selected=current if current in stages else (stages[0] if stages else None))
+
+    @output
+    @render.data_frame
+    def diag_summary_table():
+        stages = snapshot()["stages"]
+        rows = [{"구간": name, **{k: v for k, v in st.items() if k != "hist"}} for name, st in stages.items()]
+        return render.DataGrid(pd.DataFrame(rows), width="100%")
+
+    @output
+    @render.ui
+    def diag_hist_plot():
+        # 작업 스레드의 그림 생성과 pyplot 전역 상태를 공유하므로 figure_png(PYPLOT_LOCK) 경유
+        return png_ui(figure_png(_hist_figure, snapshot(), input.diag_stage()), alt="구간 히스토그램")
+
+    @output
+    @render.data_frame
+    def diag_recent_table():
+        recent = pd.DataFrame(snapshot()["recent"])
+        if not recent.empty:
+            recent["ts"] = pd.to_datetime(recent["ts"], unit="s").dt.strftime("%H:%M:%S.%f").str[:-3]
+        return render.DataGrid(recent, width="100%", height="360px")
+
+    # ===== 데이터 드리프트 =====
+    @reactive.calc
+    def drift_snapshot():
+        input.diag_refresh()
+        input.diag_reset()
+        reactive.invalidate_later(REFRESH_SEC)
+        return drift_monitor.snapshot() if drift_monitor is not None else None
+
+    @output
+    @render.ui
+    def drift_summary():
+        snap = drift_snapshot()
+        if snap is None:
+            return ui.p("드리프트 감시가 꺼져 있습니다 (DIECAST_DRIFT=0)", class_="text-muted")
+        th = snap["thresholds"]
+        seen = ", ".join(f"{c}: {n}" for c, n in snap["seen"].items())
+        return ui.p(f"금형별 최근 {snap['window']}샷 기준 (판정 최소 {snap['min_count']}샷) · "
+                    f"PSI ≥ {th['warn_psi']} 주의, ≥ {th['alert_psi']} 경보 · 누적 샷 [{seen}] "
+                    f"(JSON: {DRIFT_PATH})", class_="text-muted small")
+
+    @output
+    @render.data_frame
+    def drift_table():
+        snap = drift_snapshot()
+        rows = pd.DataFrame(snap["status"] if snap else [])
+        if not rows.empty:
+            rows["feature"] = rows["feature"].map(lambda f: name_map_kor.get(f, f))
+            rows = rows.rename(columns={"mold_code": "금형", "feature": "변수", "n": "샷 수", "status": "상태"})
+        return render.DataGrid(rows, width="100%", height="360px")
+
+    @output
+    @render.data_frame
+    def drift_alert_table():
+        snap = drift_snapshot()
+        alerts = pd.DataFrame(snap["alerts"] if snap else [])
+        if not alerts.empty:
+            alerts["ts"] = pd.to_datetime(alerts["ts"], unit="s").dt.strftime("%m-%d %H:%M:%S")
+            alerts["feature"] = alerts["feature"].map(lambda f: name_map_kor.get(f, f))
+            alerts = alerts[["ts", "mold_code", "feature", "status", "psi", "ks", "js"]].rename(
+                columns={"ts": "시각", "mold_code": "금형", "feature": "변수", "status": "상태"})
+        return render.DataGrid(alerts, width="100%", height="360px")
+
+    # 새 주의·경보는 어느 탭에 있든 알림으로 표시 (세션 시작 이후 발생분만)
+    last_seq = [drift_monitor.seq if drift_monitor is not None else 0]
+
+    @reactive.effect
+    def _drift_notify():
+        reactive.invalidate_later(REFRESH_SEC)
+        if drift_monitor is None:
+            return
+        new = drift_monitor.alerts(since=last_seq[0])
+        if not new:
+            return
+        last_seq[0] = new[-1]["seq"]
+        for a in [a for a in new if a["level"] >= 1][-3:]:
+            ui.notification_show(
+                f"⚠️ 데이터 드리프트 {a['status']}: 금형 {a['mold_code']} · "
+                f"{name_map_kor.get(a['feature'], a['feature'])} (PSI {a['psi']:.2f}, 최근 {a['n']}샷)",
+                type="error" if a["level"] >= 2 else "warning", duration=10)
+
+
+async def timings_json(request):
+    """GET /_diag/timings[?recent=N] — 스크레이핑용 JSON"""
+    from starlette.responses import JSONResponse
+    try:
+        n = int(request.query_params.get("recent", 100))
+    except ValueError:
+        n = 100
+    return JSONResponse(REGISTRY.snapshot(recent=max(0, n)))
+
+async def drift_json(request):
+    """GET /_diag/drift — 금형·변수별 드리프트 지표와 알림"""
+    from starlette.responses import JSONResponse
+    if drift_monitor is None:
+        return JSONResponse({"enabled": False})
+    return JSONResponse({"enabled": True, **drift_monitor.snapshot()})
@@ -4,12 +4,15 @@ from viz.eda_plots import (
     # 변수 분포
     plot_varpair_or_dist_main, plot_varpair_or_dist_fixed,
     # 상관관계 (전처리 only)
-    plot_corr_heatmap_fixed_subset, get_fixed_numeric_cols,
+    plot_corr_heatmap_fixed_subset, get_fixed_numeric_cols, get_corr_drift_fixed3,
     # 공정별 시계열 (Plotly HTML)
     plot_timeseries_fixed3_plotly_html, get_mold_code_levels,
     # 공통 설정
     EXCLUDE_VARS, NONE_LABEL, VAR_LABELS, CAT_VARS,
 )
+from viz.render_cache import cached_img
+from modules.service_offload import figure_png, png_ui, restart, restart_if_visible, run_offloaded, task_ui
+from viz.single_flight import coalesced
 from shared import df as DF_MAIN
 from pathlib import Path
 import pandas as pd
@@ -38,6 +41,14 @@ def _fixed3_path():
             return p
     return None
 
+def _fixed3_version() -> str:
+    """fixeddata3 파일 버전 (경로 + 수정 시각 + 크기) — 동시 요청 합치기 키에 사용"""
+    p = _fixed3_path()
+    if p is None:
+        return "none"
+    st = p.stat()
+    return f"{p.name}:{st.st_mtime_ns}:{st.st_size}"
+
 def _load_fixed3_date_range():
     """fixeddata3의 최소~최대 날짜(YYYY-MM-DD)"""
     try:
@@ -232,7 +243,12 @@ def page_eda_ui():
                     ),
                     ui.card(
                         ui.card_header("상관관계 Heatmap"),
-                        ui.output_plot("corr_heatmap_fixed", width="80%", height="520px"),
+                        ui.output_ui("corr_heatmap_fixed"),
+                    ),
+                    ui.card(
+                        ui.card_header("금형별 상관 변화 감지 (7일 롤링 vs 전체 기간)"),
+                        ui.output_table("corr_drift_table"),
+                        ui.help_text("금형별 전체 기간 상관계수 대비 |Δr| ≥ 0.3 인 변수쌍을 변화가 큰 순으로 표시합니다."),
                     ),
                 ),
             ),
@@ -294,11 +310,11 @@ def page_eda_server(input, output, session):
             return ui.layout_columns(
                 ui.card(
                     ui.card_header("원본 데이터 그래프"),
-                    ui.output_plot("dist_plot_primary", width="100%", height="700px"),
+                    ui.output_image("dist_plot_primary", width="100%", height="auto"),
                 ),
                 ui.card(
                     ui.card_header("전처리 데이터 그래프"),
-                    ui.output_plot("dist_plot_secondary", width="100%", height="700px"),
+                    ui.output_image("dist_plot_secondary", width="100%", height="auto"),
                 ),
                 col_widths=(6, 6),
             )
@@ -307,7 +323,7 @@ def page_eda_server(input, output, session):
                 ui.div(
                     ui.card(
                         ui.card_header("원본 데이터 그래프"),
-                        ui.output_plot("dist_plot_main_single", width="90%", height="700px"),
+                        ui.output_image("dist_plot_main_single", width="90%", height="auto"),
                     ),
                     class_="centerwide",
                 ),
@@ -318,7 +334,7 @@ def page_eda_server(input, output, session):
                 ui.div(
                     ui.card(
                         ui.card_header("전처리 데이터 그래프"),
-                        ui.output_plot("dist_plot_fixed_single", width="90%", height="700px"),
+                        ui.output_image("dist_plot_fixed_single", width="90%", height="auto"),
                     ),
                     class_="centerwide",
                 ),
@@ -371,37 +387,35 @@ def page_eda_server(input, output, session):
           </div>
         """)
 
-    # ---- 비교 모드 좌/우 그래프
+    # ---- 비교 모드 좌/우 그래프 (정적 데이터 → 렌더 캐시 이미지)
     @output
-    @render.plot
+    @render.image
     def dist_plot_primary():
         mode = input.dist_mode(); v1 = input.dist_var1(); v2 = input.dist_var2()
         if mode in ("compare", "main"):
-            return plot_varpair_or_dist_main(v1, v2)
-        import matplotlib.pyplot as plt
-        fig, ax = plt.subplots(); ax.axis("off"); return fig
+            return cached_img(plot_varpair_or_dist_main, v1, v2, data=DF_MAIN, alt="원본 데이터 그래프")
+        return None
 
     @output
-    @render.plot
+    @render.image
     def dist_plot_secondary():
         mode = input.dist_mode(); v1 = input.dist_var1(); v2 = input.dist_var2()
         if mode in ("compare","fixed"):
-            return plot_varpair_or_dist_fixed(v1, v2)
-        import matplotlib.pyplot as plt
-        fig, ax = plt.subplots(); ax.axis("off"); return fig
+            return cached_img(plot_varpair_or_dist_fixed, v1, v2, data=DF_FIXED, alt="전처리 데이터 그래프")
+        return None
 
     # ---- 단일(원본/전처리) 그래프
     @output
-    @render.plot
+    @render.image
     def dist_plot_main_single():
         v1 = input.dist_var1(); v2 = input.dist_var2()
-        return plot_varpair_or_dist_main(v1, v2)
+        return cached_img(plot_varpair_or_dist_main, v1, v2, data=DF_MAIN, alt="원본 데이터 그래프")
 
     @output
-    @render.plot
+    @render.image
     def dist_plot_fixed_single():
         v1 = input.dist_var1(); v2 = input.dist_var2()
-        return plot_varpair_or_dist_fixed(v1, v2)
+        return cached_img(plot_varpair_or_dist_fixed, v1, v2, data=DF_FIXED, alt="전처리 데이터 그래프")
 
     # ---- 상관관계: 체크리스트 UI (초기엔 전부 체크)
     @output
@@ -428,13 +442,22 @@ def page_eda_server(input, output, session):
         except Exception:
             session.send_input_message("heat_vars_all", {"value": (num_cols if sel_all else [])})
 
-    # ---- 히트맵 렌더 (오직 HIT 클릭 시에만 갱신, 최초는 전체)
-    @output
-    @render.plot
+    # ---- 히트맵 렌더 (오직 HIT 클릭 시에만 갱신, 최초는 전체) — 작업 풀에서 렌더
+    @reactive.extended_task
+    async def corr_heatmap_task(selected):
+        # 그림에는 체크 순서 그대로, 공유 키만 순서 무관 (set)
+        return await run_offloaded(coalesced, figure_png, plot_corr_heatmap_fixed_subset, selected,
+                                   data=DF_FIXED, key_args=(plot_corr_heatmap_fixed_subset, set(selected)))
+
+    @reactive.Effect
     @reactive.event(input.heat_go)
+    def _invoke_corr_heatmap():
+        restart(corr_heatmap_task, list(input.heat_vars_all() or []))
+
+    @output
+    @render.ui
     def corr_heatmap_fixed():
-        selected = input.heat_vars_all()
-        return plot_corr_heatmap_fixed_subset(selected)
+        return task_ui(corr_heatmap_task, lambda png: png_ui(png, alt="상관관계 Heatmap", width="80%"))
 
     # 최초 진입시 전체 히트맵 1회 표시
     @reactive.Effect
@@ -442,6 +465,25 @@ def page_eda_server(input, output, session):
         if input.heat_go() == 0:
             session.send_input_message("heat_go", {"value": 1})
 
+    # ---- 상관 변화 감지 테이블 (금형별 × 7일 롤링)
+    @output
+    @render.table
+    def corr_drift_table():
+        drift = get_corr_drift_fixed3()
+        if drift is None or drift.empty:
+            return pd.DataFrame({"결과": ["상관 변화가 감지된 변수쌍이 없습니다."]})
+        top = drift.head(20)
+        return pd.DataFrame({
+            "금형코드": top["group"],
+            "윈도우 종료": top["window_end"].dt.strftime("%Y-%m-%d"),
+            "변수 1": top["var1"].map(lambda c: VAR_LABELS.get(c, c)),
+            "변수 2": top["var2"].map(lambda c: VAR_LABELS.get(c, c)),
+            "전체 r": top["r_base"].round(2),
+            "윈도우 r": top["r_window"].round(2),
+            "Δr": top["delta"].round(2),
+            "샷 수": top["n"],
+        })
+
     # ---- 공정별 시계열 탐색 (Plotly HTML)
     @output
     @render.ui
@@ -459,13 +501,23 @@ def page_eda_server(input, output, session):
             "proc_single_var", "변수 선택", cols_view, add_none=False
         )
 
-    @output
-    @render.ui
-    def process_timeseries():
+    # Plotly HTML 생성은 작업 풀에서 (입력이 바뀌면 이전 생성 취소)
+    @reactive.extended_task
+    async def process_timeseries_task(yvar, codes, start, end):
+        return await run_offloaded(coalesced, plot_timeseries_fixed3_plotly_html, yvar, codes, start, end,
+                                   data=_fixed3_version())
+
+    @reactive.Effect
+    def _invoke_process_timeseries():
         yvar   = input.proc_single_var()
         codes  = input.mold_codes() or []
         dr     = input.proc_date_range()
         start  = dr[0] if dr and dr[0] else None
         end    = dr[1] if dr and dr[1] else None
-        html = plot_timeseries_fixed3_plotly_html(yvar, codes, start, end)
-        return ui.HTML(html)
+        # 시계열 탭이 열려 있을 때만 생성
+        restart_if_visible(session, "process_timeseries", process_timeseries_task, yvar, list(codes), start, end)
+
+    @output
+    @render.ui
+    def process_timeseries():
+        return task_ui(process_timeseries_task, ui.HTML)
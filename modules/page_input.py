@@ -1,3 +1,4 @@
+import logging
 from shiny import ui, render, reactive
 import pandas as pd
 import numpy as np
@@ -5,13 +6,14 @@ from typing import Dict, Any
 
 from shared import (
     feature_name_map, feature_name_map_kor,
-    rf_models, rf_explainers
+    rf_models, rf_explainers, rf_surrogates, rf_schemas, rf_quantized, drift_monitor
 )
 from viz.shap_plots import register_shap_plots
 from modules.service_predict import do_predict
 from modules.service_warnings import shap_based_warning
 
 from modules.service_adjustment import adjust_variables_to_target, print_adjustment_summary
+from modules.service_offload import computing_ui, restart, run_offloaded, task_ui
 
 # ======================
 # 상태 저장용 (세션 전역)
@@ -23,6 +25,7 @@ pred_state = reactive.Value(None)
 proba_state = reactive.Value(None)
 
 X_input_raw = reactive.Value(None)
+predict_mode_state = reactive.Value(None)   # "model" | "vote" | "screened"(대리 모델에서 종료)
 
 
 # ======================
@@ -192,7 +195,7 @@ def inputs_layout():
 
         ui.card(
             ui.card_header("SHAP 시각화"),
-            ui.output_plot("shap_force_plot"),
+            ui.output_ui("shap_force_plot"),
         ),
     )
 
@@ -208,7 +211,8 @@ def page_input_server(input, output, session):
         y_test_state,
         rf_models,
         rf_explainers,
-        input
+        input,
+        mode_state=predict_mode_state,
     )
     
     # ✅ 초기 상태: 안내 텍스트
@@ -298,9 +302,12 @@ def page_input_server(input, output, session):
     @render.ui
     @reactive.event(input.btn_predict)
     def pred_result_card():
-        pred, proba = do_predict(input, shap_values_state, X_input_state, X_input_raw, rf_models, rf_explainers)
+        pred, proba = do_predict(input, shap_values_state, X_input_state, X_input_raw, rf_models, rf_explainers,
+                                 surrogates=rf_surrogates, schemas=rf_schemas, drift=drift_monitor,
+                                 quantized=rf_quantized, mode_state=predict_mode_state)
         pred_state.set(pred)
         proba_state.set(pred)
+        start_adjustment(pred)
 
         if pred == -1:
             return ui.div(
@@ -389,20 +396,49 @@ def page_input_server(input, output, session):
             
     # modules/page_input.py - adjustment_guide 관련 부분만 발췌
 
-    # ✅ 조정 가이드 결과 (수정된 버전)
-    @output
-    @render.ui
-    @reactive.event(input.btn_predict)
-    def adjustment_guide_result():
-        pred = pred_state.get()
-        proba = proba_state.get()
-        
+    # ✅ 조정 가이드 (R-SG 반복 예측) — 작업 풀에서 실행, 새 예측 시 이전 계산 취소
+    adjust_notice = reactive.Value(None)   # "pass" | "unavailable" | None(계산 결과 표시)
+
+    @reactive.extended_task
+    async def adjustment_task(raw_sample, shap_values, preprocessor, model):
+        return await run_offloaded(
+            adjust_variables_to_target,
+            raw_sample=raw_sample,        # 원본 입력 데이터
+            shap_values=shap_values,      # SHAP 값 (전처리된 변수명)
+            preprocessor=preprocessor,    # 전처리기
+            model=model,                  # 모델
+            target_prob=0.30,
+            trace=logging.INFO            # 조정 과정 상세 (아래 접기 영역) — 단계 요약만 수집
+        )
+
+    def start_adjustment(pred):
+        """do_predict 직후 호출 — 상태값을 읽어 조정 가이드 계산 시작"""
         # ✅ 올바른 데이터 가져오기
         shap_values = shap_values_state.get()  # 전처리된 변수명 기준 SHAP 값
         raw_sample = X_input_raw.get()         # 원본 입력 값 (사용자 입력)
 
-        # PASS일 경우 → 안내 메시지
         if pred == 0:
+            adjust_notice.set("pass")
+            adjustment_task.cancel()
+            return
+        if pred == -1 or raw_sample is None or shap_values is None:
+            adjust_notice.set("unavailable")
+            adjustment_task.cancel()
+            return
+
+        # ❌ FAIL → 조정 가이드 실행
+        mold_code = raw_sample.get("mold_code", "8412")
+        model = rf_models[mold_code]
+        adjust_notice.set(None)
+        restart(adjustment_task, raw_sample, shap_values, model.named_steps["preprocess"], model.named_steps["model"])
+
+    @output
+    @render.ui
+    def adjustment_guide_result():
+        notice = adjust_notice.get()
+
+        # PASS일 경우 → 안내 메시지
+        if notice == "pass":
             return ui.div(
                 "✅ 양품으로 판정되어 조정 가이드가 필요하지 않습니다.",
                 class_="p-3 text-center text-white",
@@ -410,29 +446,17 @@ def page_input_server(input, output, session):
             )
 
         # 모델 없음 또는 데이터 없음
-        if pred == -1 or raw_sample is None or shap_values is None:
+        if notice == "unavailable":
             return ui.div(
                 "⚠️ 조정 가이드를 생성할 수 없습니다.",
                 class_="p-3 text-center text-white",
                 style="background-color:#6c757d;border-radius:12px;font-weight:600;"
             )
 
-        # ❌ FAIL → 조정 가이드 실행
-        mold_code = raw_sample.get("mold_code", "8412")
-        model = rf_models[mold_code]
-        preprocessor = model.named_steps["preprocess"]
-
-        # ✅ 핵심 수정: 올바른 데이터 전달
-        # raw_sample: 원본 입력값 (사용자가 입력한 그대로)
-        # shap_values: 전처리된 변수명 기준 SHAP 값
-        result = adjust_variables_to_target(
-            raw_sample=raw_sample,        # 원본 입력 데이터
-            shap_values=shap_values,      # SHAP 값 (전처리된 변수명)
-            preprocessor=preprocessor,     # 전처리기
-            model=model.named_steps["model"],  # 모델
-            target_prob=0.30
-        )
+        return task_ui(adjustment_task, adjustment_guide_ui,
+                       placeholder=computing_ui("조정 가이드 계산 중…"))
 
+    def adjustment_guide_ui(result):
         # ✅ 결과를 HTML UI로 표시
         guide_html = [
             # f"<div><b>초기 확률</b>: {result['initial_prob']:.2%}</div>",
@@ -453,6 +477,13 @@ def page_input_server(input, output, session):
         if not result["rule_adjustments"] and not result["shap_adjustments"]:
             guide_html.append("모든 변수가 정상 범위 내에 있어 추가 조정 불필요합니다.")
 
+        if result.get("trace"):
+            guide_html.append(
+                "<details style='margin-top:0.5rem;font-weight:400;'><summary>조정 과정 상세</summary>"
+                + "".join(f"<div style='font-size:0.85rem;'>{ev['msg']}</div>" for ev in result["trace"])
+                + "</details>"
+            )
+
         color = "#0d6efd" if result["success"] else "#dc3545"
         return ui.div(
             ui.HTML("".join(guide_html)),
@@ -4,8 +4,12 @@ from modules import service_preprocess as tbl  # 테이블/이미지 모듈 불
 import pandas as pd
 from viz import preprocess_plots as plots
 from modules import service_preprocess as tbl
+from viz.render_cache import cached_img, register_fingerprint
 
-from shared import df
+from shared import df, df_profile
+
+# 프로파일 버전을 데이터 지문으로 등록 → 캐시 키 계산 시 원본 해시 스캔 생략
+register_fingerprint(df, df_profile["version"])
 
 def page_preprocess_ui():
     return ui.page_fluid(
@@ -27,11 +31,11 @@ def page_preprocess_ui():
                 ui.card(
                     ui.card_header("🎯 타겟 변수 분포 (passorfail)"),
                     ui.p("Pass(정상) / Fail(불량) 분포 확인"),
-                    ui.output_plot("target_distribution_plot")
+                    ui.output_image("target_distribution_plot", height="auto")
                 ),
                 ui.card(
                     ui.card_header("⚠️ 결측치 현황"),
-                    ui.output_plot("missing_overview_plot")
+                    ui.output_image("missing_overview_plot", height="auto")
                 )
             ),
 
@@ -232,33 +236,26 @@ def page_preprocess_server(input, output, session):
     def variable_types_table():
         return ui.HTML(tbl.get_variable_types())
     
+    # 정적 데이터(shared.df) 그림은 렌더 캐시에서 바로 전송
     @output
-    @render.plot
+    @render.image
     def data_types_plot():
-        return plots.plot_data_types(df)
+        return cached_img(plots.plot_data_types, df, alt="데이터 타입별 변수 분포")
     
     @output
-    @render.plot
+    @render.image
     def missing_overview_plot():
-        return plots.plot_missing_overview(df)
+        return cached_img(plots.plot_missing_overview, df, alt="결측치 현황")
     
     @output
-    @render.plot
+    @render.image
     def target_distribution_plot():
-        return plots.plot_target_distribution(df, target_col='passorfail')
+        return cached_img(plots.plot_target_distribution, df, target_col='passorfail', alt="타겟 변수 분포")
     
     @output
     @render.table
     def numeric_stats_table():
-        numeric_cols = df.select_dtypes(include=['int64', 'float64']).columns
-        # passorfail이 숫자형이라면 제외
-        numeric_cols = [col for col in numeric_cols if col != 'passorfail']
-        if len(numeric_cols) > 0:
-            stats = df[numeric_cols].describe().T
-            stats['결측치'] = df[numeric_cols].isnull().sum()
-            return stats.round(2)
-        else:
-            return pd.DataFrame()
+        return tbl.get_numeric_stats()
         
     @output
     @render.download(filename="데이터전처리보고서.pdf")  # 다운로드될 때 사용자에게 보이는 파일명
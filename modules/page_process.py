@@ -118,7 +118,7 @@ def page_process_ui():
                             ("용탕 부피 (molten_volume)", "5", "113"),
                         ])
                     ),
-                    ui.card(ui.card_header("실제 데이터 기반 불량율 변화 그래프"), ui.output_plot("plot_selected_var_quality_molten"))
+                    ui.card(ui.card_header("실제 데이터 기반 불량율 변화 그래프"), ui.output_ui("plot_selected_var_quality_molten"))
                 )
             ),
 
@@ -153,7 +153,7 @@ def page_process_ui():
                             ("EMS 작동 시간 (EMS_operation_time)", "-", "-"),
                         ])
                     ),
-                    ui.card(ui.card_header("실제 데이터 기반 불량율 변화 그래프"), ui.output_plot("plot_selected_var_quality_slurry"))
+                    ui.card(ui.card_header("실제 데이터 기반 불량율 변화 그래프"), ui.output_ui("plot_selected_var_quality_slurry"))
                 )
             ),
 
@@ -194,7 +194,7 @@ def page_process_ui():
                             ("형체력 (physical_strength)", "-", "-"),
                         ])
                     ),
-                    ui.card(ui.card_header("실제 데이터 기반 불량율 변화 그래프"), ui.output_plot("plot_selected_var_quality_injection"))
+                    ui.card(ui.card_header("실제 데이터 기반 불량율 변화 그래프"), ui.output_ui("plot_selected_var_quality_injection"))
                 )
             ),
 
@@ -232,7 +232,7 @@ def page_process_ui():
                             ("냉각수 온도 (Coolant_temperature)", "29", "-"),
                         ])
                     ),
-                    ui.card(ui.card_header("실제 데이터 기반 불량율 변화 그래프"), ui.output_plot("plot_selected_var_quality_solid"))
+                    ui.card(ui.card_header("실제 데이터 기반 불량율 변화 그래프"), ui.output_ui("plot_selected_var_quality_solid"))
                 )
             ),
 
@@ -255,9 +255,11 @@ def page_process_ui():
 # ----------------------------------------------------
 
 # (이 부분은 page_process_ui와 분리된 파일에 있어야 함)
-from shiny import render
+from shiny import render, reactive
 # from viz.plots import plot_failrate_cutoff_dual_fast # 이 임포트는 순환참조 가능성이 높음
 from shared import df2
+from modules.service_offload import figure_png, png_ui, restart_if_visible, run_offloaded, task_ui
+from viz.single_flight import coalesced
 
 def page_process_server(input, output, session):
     
@@ -269,35 +271,28 @@ def page_process_server(input, output, session):
         print("Warning: plot_failrate_cutoff_dual_fast not imported correctly in server.")
         return 
 
-    @output()
-    @render.plot()
-    def plot_selected_var_quality_molten():
-        selected_var = input.selected_var_molten()
-        # Vars to hide (예시)
-        VARS_TO_HIDE = ["physical_strength"]
-        fig = plot_failrate_cutoff_dual_fast(df2, selected_var, vars_to_hide=VARS_TO_HIDE)
-        return fig
+    # Vars to hide (예시)
+    VARS_TO_HIDE = ["physical_strength"]
 
-    @output()
-    @render.plot()
-    def plot_selected_var_quality_slurry():
-        selected_var = input.selected_var_slurry()
-        VARS_TO_HIDE = ["physical_strength"]
-        fig = plot_failrate_cutoff_dual_fast(df2, selected_var, vars_to_hide=VARS_TO_HIDE)
-        return fig
+    # 공정 단계별 Cut-off 그래프: 작업 풀에서 계산·렌더 → 이벤트 루프(다른 세션)는 막지 않음
+    # 같은 변수를 동시에 요청한 세션들은 한 번의 계산 결과(PNG)를 공유
+    def cutoff_plot(group: str):
+        @reactive.extended_task
+        async def cutoff_task(selected_var):
+            return await run_offloaded(coalesced, figure_png, plot_failrate_cutoff_dual_fast, df2, selected_var,
+                                       vars_to_hide=VARS_TO_HIDE)
 
-    @output()
-    @render.plot()
-    def plot_selected_var_quality_injection():
-        selected_var = input.selected_var_injection()
-        VARS_TO_HIDE = ["physical_strength"]
-        fig = plot_failrate_cutoff_dual_fast(df2, selected_var, vars_to_hide=VARS_TO_HIDE)
-        return fig
+        out_id = f"plot_selected_var_quality_{group}"
 
-    @output()
-    @render.plot()
-    def plot_selected_var_quality_solid():
-        selected_var = input.selected_var_solid()
-        VARS_TO_HIDE = ["physical_strength"]
-        fig = plot_failrate_cutoff_dual_fast(df2, selected_var, vars_to_hide=VARS_TO_HIDE)
-        return fig
\ No newline at end of file
+        @reactive.effect
+        def _invoke():
+            # 해당 공정 탭이 열려 있을 때만 (세션 시작 시 4개 그래프를 모두 그리지 않음)
+            restart_if_visible(session, out_id, cutoff_task, input[f"selected_var_{group}"]())
+
+        @output(id=out_id)
+        @render.ui
+        def _plot():
+            return task_ui(cutoff_task, lambda png: png_ui(png, alt="불량율 변화 그래프"))
+
+    for group in ("molten", "slurry", "injection", "solid"):
+        cutoff_plot(group)
@@ -1,8 +1,24 @@
 # modules/service_adjustment.py
 
+import logging
+import os
+
 import numpy as np
 import pandas as pd
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+
+from utils.timing import span, timed
+
+# 조정 과정 로그: 기본 WARNING (요청 경로에서 출력 없음)
+# DIECAST_ADJUST_LOG=INFO → 단계 요약, DEBUG → 변수·반복 단위까지 (stderr 로 출력)
+logger = logging.getLogger("diecast.adjustment")
+if os.environ.get("DIECAST_ADJUST_LOG"):
+    logger.setLevel(os.environ["DIECAST_ADJUST_LOG"].upper())
+    if not logger.handlers:   # 앱에 로깅 설정이 없으면 기본 처리기는 WARNING 이상만 출력 → 전용 처리기 부착
+        _handler = logging.StreamHandler()
+        _handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+        logger.addHandler(_handler)
+        logger.propagate = False
 
 
 # ============================================
@@ -112,6 +128,37 @@ SHAP_TO_RAW_MAP = {
 }
 
 
+# ============================================
+# 1-1) 조정 과정 추적 (레벨 게이트 로그 + 요청별 trace)
+# ============================================
+class AdjustTrace:
+    """
+    조정 과정 이벤트 기록기
+    - 호출부는 `if tr.debug:` / `if tr.info:` 로 감싸서 호출 → 꺼져 있으면 메시지 생성 비용 없음
+    - collect: 이 레벨 이상 이벤트를 events 에 모아 결과와 함께 반환 (UI 상세 보기용)
+      (True = DEBUG 전부, logging.INFO = 단계 요약만, False/None = 수집 안 함)
+    """
+    __slots__ = ("events", "collect_level", "debug", "info")
+
+    def __init__(self, collect: bool | int | None = False):
+        if collect is True:
+            collect = logging.DEBUG
+        self.collect_level = collect or None
+        self.events = [] if self.collect_level else None
+        self.debug = self._wanted(logging.DEBUG)
+        self.info = self._wanted(logging.INFO)
+
+    def _wanted(self, level: int) -> bool:
+        return (self.collect_level is not None and level >= self.collect_level) or logger.isEnabledFor(level)
+
+    def emit(self, level: int, event: str, msg: str, **fields):
+        text = msg.format(**fields)
+        if self.events is not None and level >= self.collect_level:
+            self.events.append({"event": event, "level": logging.getLevelName(level), "msg": text, **fields})
+        if logger.isEnabledFor(level):
+            logger.log(level, "[%s] %s", event, text)
+
+
 # ============================================
 # 2) 예측 함수 (원본 데이터 → 전처리 → 예측)
 # ============================================
@@ -125,8 +172,10 @@ def predict_with_raw_data(raw_sample, preprocessor, model) -> float:
         raise ValueError("raw_sample must be a pandas Series or DataFrame")
 
     # 전처리 수행
-    transformed = preprocessor.transform(raw_df)
-    prob = model.predict_proba(transformed)[0, 1]
+    with span("adjust.preprocess"):
+        transformed = preprocessor.transform(raw_df)
+    with span("adjust.predict_proba"):
+        prob = model.predict_proba(transformed)[0, 1]
     return float(prob)
 
 
@@ -160,46 +209,53 @@ def fix_rule_violations(raw_sample: pd.Series) -> Tuple[pd.Series, List[str]]:
 # ============================================
 # 4) SHAP 기반 우선순위 (SHAP 변수명 → 원본 변수명 변환)
 # ============================================
-def calculate_priority(shap_values: Dict) -> List[Tuple[str, float, str]]:
+@timed("adjust.priority")
+def calculate_priority(shap_values: Dict, trace: Optional[AdjustTrace] = None) -> List[Tuple[str, float, str]]:
     """SHAP 변수명을 원본 변수명으로 변환하여 우선순위 계산"""
+    tr = trace or AdjustTrace()
     priorities = []
     
-    print("🔍 SHAP 값 분석 (전체):")
-    print(f"   총 {len(shap_values)}개 변수 수신")
+    if tr.debug:
+        tr.emit(logging.DEBUG, "shap_received", "SHAP 값 {n}개 변수 수신", n=len(shap_values))
     
     # 변수별 처리 (정렬하지 않고 모든 변수 확인)
     for shap_var, val in shap_values.items():
         # SHAP 변수명을 원본 변수명으로 변환
         raw_var = SHAP_TO_RAW_MAP.get(shap_var, shap_var)
         
-        print(f"   {shap_var} → {raw_var}: {val:.4f} (절댓값: {abs(val):.4f})")
-        
         # 매핑되지 않은 변수는 건너뛰기
         if raw_var not in ADJUSTMENT_STEP:
-            print(f"      ⚠️ 스킵: (설정값 없음)")
+            if tr.debug:
+                tr.emit(logging.DEBUG, "shap_skip", "{shap_var} → {raw_var}: {value:.4f} 스킵 (설정값 없음)",
+                        shap_var=shap_var, raw_var=raw_var, value=float(val))
             continue
         
         if abs(val) < 1e-6:  # 거의 0인 값은 제외
-            print(f"      ⚠️ 스킵: 영향도 너무 낮음")
+            if tr.debug:
+                tr.emit(logging.DEBUG, "shap_skip", "{shap_var} → {raw_var}: {value:.4f} 스킵 (영향도 너무 낮음)",
+                        shap_var=shap_var, raw_var=raw_var, value=float(val))
             continue
         
         if val > 0:
             # 양수: 불량률 증가 요인 → 변수값 감소 필요
             direction = "↓"
             priorities.append((raw_var, abs(val), direction))  # 절댓값으로 우선순위
-            print(f"      ✅ 추가: {direction} (불량률↑ → 값 감소)")
         elif val < 0:
             # 음수: 불량률 감소 요인 → 변수값 증가 필요
             direction = "↑"
             priorities.append((raw_var, abs(val), direction))  # 절댓값으로 우선순위
-            print(f"      ✅ 추가: {direction} (불량률↓ → 값 증가)")
+        else:
+            continue
+        if tr.debug:
+            tr.emit(logging.DEBUG, "shap_add", "{shap_var} → {raw_var}: {value:.4f} 추가 ({direction})",
+                    shap_var=shap_var, raw_var=raw_var, value=float(val), direction=direction)
     
     # 절댓값이 큰 순서대로 정렬 (불량 예측 기여도가 높은 순)
     sorted_priorities = sorted(priorities, key=lambda x: x[1], reverse=True)
     
-    print(f"\n📊 최종 조정 우선순위 (절댓값 기준):")
-    for i, (var, importance, dir) in enumerate(sorted_priorities[:10], 1):
-        print(f"   {i}. {var}: {importance:.4f} ({dir})")
+    if tr.info:
+        tr.emit(logging.INFO, "priority", "조정 우선순위(절댓값 기준): {order}",
+                order=[f"{var}({dir})" for var, _, dir in sorted_priorities[:10]])
         
     return sorted_priorities
 
@@ -207,13 +263,15 @@ def calculate_priority(shap_values: Dict) -> List[Tuple[str, float, str]]:
 # ============================================
 # 5) 메인 알고리즘 (R-SG) - 수정된 버전
 # ============================================
+@timed("adjust.total")
 def adjust_variables_to_target(
     raw_sample: pd.Series,
     shap_values: Dict,
     preprocessor,
     model,
     target_prob: float = 0.3,
-    max_iterations: int = 10
+    max_iterations: int = 10,
+    trace: bool | int = False,
 ) -> Dict:
     """
     R-SG 알고리즘: Rule 기반 + SHAP Greedy
@@ -225,7 +283,10 @@ def adjust_variables_to_target(
         model: 모델
         target_prob: 목표 불량률
         max_iterations: 최대 반복 횟수
+        trace: 조정 과정 이벤트 목록을 result["trace"] 로 함께 반환
+               (True = 변수·반복 단위 DEBUG 까지, logging.INFO = 단계 요약만)
     """
+    tr = AdjustTrace(collect=trace)
     
     # ✅ SHAP Explanation 객체 자동 변환
     if not isinstance(shap_values, dict):
@@ -250,31 +311,35 @@ def adjust_variables_to_target(
         "final_sample": raw_sample.to_dict(),
         "success": False,
     }
+    if trace:
+        result["trace"] = tr.events
 
     # ✅ Step 1: Rule 기반 보정 (원본 값 기준)
-    print("🔧 Step 1: Rule 기반 보정 시작...")
-    adjusted_raw, rule_logs = fix_rule_violations(raw_sample)
-    prob_after_rule = predict_with_raw_data(adjusted_raw, preprocessor, model)
+    with span("adjust.rule"):
+        adjusted_raw, rule_logs = fix_rule_violations(raw_sample)
+        prob_after_rule = predict_with_raw_data(adjusted_raw, preprocessor, model)
     
     result["rule_adjustments"] = rule_logs
     result["final_sample"] = adjusted_raw.to_dict()
     result["final_prob"] = prob_after_rule
     
-    print(f"   Rule 보정 후: {prob_after_rule:.3f}")
+    if tr.info:
+        tr.emit(logging.INFO, "rule", "Rule 보정 {n}건 → 확률 {initial:.3f} → {prob:.3f}",
+                n=len(rule_logs), initial=initial_prob, prob=prob_after_rule)
 
     if prob_after_rule <= target_prob:
-        print("✅ Rule 보정만으로 목표 달성!")
+        if tr.info:
+            tr.emit(logging.INFO, "done", "Rule 보정만으로 목표 달성 ({prob:.3f} ≤ {target:.3f})",
+                    prob=prob_after_rule, target=target_prob)
         result["success"] = True
         return result
 
     # ✅ Step 2: SHAP 기반 Greedy (SHAP → 원본 변수명 변환)
-    print("🎯 Step 2: SHAP 기반 최적화 시작...")
     current_raw = adjusted_raw.copy()
     best_prob = prob_after_rule
     
     # SHAP 변수명을 원본 변수명으로 변환하여 우선순위 계산
-    priority_list = calculate_priority(shap_values)
-    print(f"   우선순위: {[f'{var}({dir})' for var, _, dir in priority_list[:5]]}")
+    priority_list = calculate_priority(shap_values, tr)
 
     for var, importance, direction in priority_list:
         if var not in ADJUSTMENT_STEP or var not in DATA_RANGES:
@@ -310,7 +375,9 @@ def adjust_variables_to_target(
             if new_prob < best_prob:
                 best_prob, best_val = new_prob, new_val
                 val_now = new_val
-                print(f"   {var}: {val:.1f} → {new_val:.1f} (확률: {new_prob:.3f}) {direction}")
+                if tr.debug:
+                    tr.emit(logging.DEBUG, "step", "{var}: {old:.1f} → {new:.1f} (확률 {prob:.3f}) {direction}",
+                            var=var, old=val, new=float(new_val), prob=new_prob, direction=direction)
             else:
                 break
 
@@ -325,12 +392,17 @@ def adjust_variables_to_target(
             result["shap_adjustments"].append(
                 f"{var}: {val:.1f} → {best_val:.1f} ({actual_direction}) {direction_match}"
             )
-            print(f"   📝 최종: {var} {val:.1f} → {best_val:.1f} (예상:{expected_direction}, 실제:{actual_direction}) {direction_match}")
+            if tr.info:
+                tr.emit(logging.INFO, "adjust", "{var}: {old:.1f} → {new:.1f} (예상 {expected}, 실제 {actual}) {match}",
+                        var=var, old=val, new=float(best_val), expected=expected_direction,
+                        actual=actual_direction, match=direction_match)
 
         result["final_prob"] = best_prob
 
         if best_prob <= target_prob:
-            print(f"✅ 목표 달성! 최종 확률: {best_prob:.3f}")
+            if tr.info:
+                tr.emit(logging.INFO, "done", "목표 달성 ({prob:.3f} ≤ {target:.3f})",
+                        prob=best_prob, target=target_prob)
             break
 
     result["final_sample"] = current_raw.to_dict()
@@ -0,0 +1,265 @@
+# modules/service_api.py — 헤드리스 채점 REST/JSON API (Shiny 세션 없이 MES·배치 작업에서 호출)
+#
+#   POST /api/v1/score   본문: 샷 1건(객체) | 샷 목록(배열) | {"records": [...], "shap_top_k": 3, "adjust": true}
+#   GET  /api/v1/health  로드된 금형 모델 목록
+#
+# 대량 채점은 바이너리 열 형식도 지원 (service_codec 참고):
+#   Content-Type: application/vnd.apache.arrow.stream | application/x-npy  (옵션은 ?shap_top_k=3 쿼리로)
+#   응답 형식은 Accept 헤더로 선택, 없으면 요청과 같은 형식 (조정 가이드는 JSON 응답에서만)
+#
+# - 대시보드와 같은 금형별 파이프라인(shared.rf_models) 사용, 모델 없는 금형은 do_predict 처럼 soft voting
+# - 한 요청의 샷은 금형별로 묶어 predict_proba 1회 → 대량 페이로드도 행 단위 루프 없음
+# - 채점·조정 가이드 계산은 service_offload 작업 풀에서 실행 (이벤트 루프 비점유)
+# - keep-alive 는 서버(uvicorn HTTP/1.1) 기본 동작 그대로 사용
+# - 채점한 샷은 드리프트 감시(shared.drift_monitor)에 반영 (요청 옵션 "monitor": false 로 제외, 재채점·백필용)
+# - 응답 크기 제한: DIECAST_API_MAX_RECORDS (기본 50000), 조정 가이드는 DIECAST_API_MAX_ADJUST 건 (기본 20)
+#
+# 요청 예)
+#   curl -X POST localhost:8000/api/v1/score -H 'content-type: application/json' \
+#        -d '{"records": [{"mold_code": "8412", "molten_temp": 720, ...}], "shap_top_k": 3}'
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+
+from modules import service_codec as codec
+from modules.service_offload import EXECUTOR, run_offloaded
+from modules.service_predict import FEATURE_COLUMNS, predict_batch
+from shared import drift_monitor, feature_name_map, rf_explainers, rf_models, rf_quantized, rf_schemas
+from utils.input_schema import CATEGORY_ALIASES
+from utils.timing import span
+
+try:  # 선택 의존성: 있으면 직렬화가 훨씬 빠름
+    import orjson
+except ImportError:
+    orjson = None
+
+MAX_RECORDS = int(os.environ.get("DIECAST_API_MAX_RECORDS", "50000"))
+MAX_ADJUST = int(os.environ.get("DIECAST_API_MAX_ADJUST", "20"))
+MAX_SHAP_TOP_K = 10
+TARGET_PROB = 0.30   # 조정 가이드 목표 불량 확률 (page_input 과 동일)
+
+# UI 입력 이름 → 모델 입력 이름
+FIELD_ALIASES = {"coolant_temp": "Coolant_temperature"}
+# 결측 시 UI 기본값과 동일하게 채움
+FIELD_DEFAULTS = {"working": "가동", "tryshot_signal": "A"}
+NUMERIC_COLUMNS = [c for c in FEATURE_COLUMNS if c not in ("working", "tryshot_signal")]
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str, **detail):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.detail = detail
+
+
+# ===== 직렬화 =====
+def _default(o):
+    if isinstance(o, np.generic):
+        return o.item()
+    if isinstance(o, np.ndarray):
+        return o.tolist()
+    raise TypeError(f"직렬화 불가: {type(o).__name__}")
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, ensure_ascii=False, default=_default, allow_nan=False).encode("utf-8")
+
+def loads(body: bytes):
+    return orjson.loads(body) if orjson is not None else json.loads(body)
+
+def json_response(obj, status: int = 200) -> Response:
+    return Response(dumps(obj), status_code=status, media_type="application/json")
+
+
+# ===== 요청 파싱 =====
+def parse_payload(payload) -> tuple[list, dict]:
+    """본문 → (샷 목록, 옵션) — 단건 객체·배열·{"records": ...} 모두 허용"""
+    if isinstance(payload, list):
+        return payload, {}
+    if isinstance(payload, dict):
+        if "records" in payload:
+            records = payload["records"]
+            if not isinstance(records, list):
+                raise ApiError(400, "records 는 배열이어야 합니다")
+            return records, {k: v for k, v in payload.items() if k != "records"}
+        return [payload], {"single": True}
+    raise ApiError(400, "본문은 JSON 객체 또는 배열이어야 합니다")
+
+def records_to_frame(records: list) -> tuple[pd.DataFrame, np.ndarray]:
+    """샷 목록 → (FEATURE_COLUMNS 순서 DataFrame, 금형 코드 배열) — 형식 오류는 422 + 행 번호"""
+    if not records:
+        raise ApiError(400, "records 가 비어 있습니다")
+    if len(records) > MAX_RECORDS:
+        raise ApiError(413, f"한 요청당 최대 {MAX_RECORDS}건까지 처리합니다", count=len(records))
+    for i, r in enumerate(records):
+        if not isinstance(r, dict):
+            raise ApiError(422, "각 레코드는 JSON 객체여야 합니다", index=i)
+
+    df = pd.DataFrame.from_records(records).rename(columns=FIELD_ALIASES)
+    if "mold_code" not in df:
+        raise ApiError(422, "mold_code 가 없습니다", index=0)
+    missing_code = df["mold_code"].isna().to_numpy()
+    if missing_code.any():
+        raise ApiError(422, "mold_code 가 없습니다", index=int(np.argmax(missing_code)))
+    try:
+        codes = codec.mold_codes(df["mold_code"].to_numpy())   # 8412.0 → "8412", 8412.5 → 422
+    except codec.CodecError as e:
+        raise ApiError(422, e.message, **e.detail)
+
+    for col, default in FIELD_DEFAULTS.items():
+        df[col] = df[col].fillna(default) if col in df else default
+    for col, allowed in codec.CATEGORY_FIELDS.items():
+        aliases = CATEGORY_ALIASES.get(col, {})
+        df[col] = df[col].map(lambda v: aliases.get(v, v))
+        unknown = ~df[col].isin(allowed).to_numpy()
+        if unknown.any():
+            raise ApiError(422, f"{col} 값은 {allowed} 중 하나여야 합니다", index=int(np.argmax(unknown)), field=col)
+
+    for col in NUMERIC_COLUMNS:
+        if col not in df:
+            raise ApiError(422, f"{col} 값이 없습니다", index=0, field=col)
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    bad = df[FEATURE_COLUMNS].isna().to_numpy()
+    if bad.any():
+        i, j = np.argwhere(bad)[0]
+        raise ApiError(422, f"{FEATURE_COLUMNS[j]} 값이 없거나 형식이 올바르지 않습니다",
+                       index=int(i), field=FEATURE_COLUMNS[j])
+    return df[FEATURE_COLUMNS], codes
+
+def _flag(value) -> bool:
+    return value.lower() in ("1", "true", "yes") if isinstance(value, str) else bool(value)
+
+def parse_options(opts) -> tuple[int, bool, bool]:
+    """JSON 본문 옵션 또는 쿼리 파라미터 → (shap_top_k, adjust, monitor)"""
+    try:
+        k = int(opts.get("shap_top_k", 0) or 0)
+    except (TypeError, ValueError):
+        raise ApiError(400, "shap_top_k 는 정수여야 합니다")
+    return max(0, min(k, MAX_SHAP_TOP_K)), _flag(opts.get("adjust", False)), _flag(opts.get("monitor", True))
+
+def observe_drift(X: pd.DataFrame, codes: np.ndarray):
+    if drift_monitor is not None:
+        with span("drift.observe"):
+            drift_monitor.observe_batch(codes, X)
+
+def decode_binary(fmt: str, body: bytes) -> tuple[pd.DataFrame, np.ndarray]:
+    """Arrow / npy 본문 → (FEATURE_COLUMNS 순서 DataFrame, 금형 코드 배열)"""
+    try:
+        X, codes = codec.decode_arrow(body) if fmt == "arrow" else codec.decode_npy(body)
+    except codec.CodecError as e:
+        raise ApiError(422, e.message, **e.detail)
+    if len(X) > MAX_RECORDS:
+        raise ApiError(413, f"한 요청당 최대 {MAX_RECORDS}건까지 처리합니다", count=len(X))
+    return X[FEATURE_COLUMNS], codes
+
+
+# ===== 채점 =====
+def adjustment_guide(X_row: pd.DataFrame, code: str, shap_values: dict) -> dict:
+    """불량 판정 샷 1건의 R-SG 조정 가이드 (page_input 과 같은 설정)"""
+    from modules.service_adjustment import adjust_variables_to_target
+
+    pipe = rf_models[code]
+    res = adjust_variables_to_target(X_row, shap_values, pipe.named_steps["preprocess"],
+                                     pipe.named_steps["model"], target_prob=TARGET_PROB)
+    return {k: res[k] for k in ("initial_prob", "final_prob", "target_prob", "success",
+                                "rule_adjustments", "shap_adjustments")}
+
+def score_records(X: pd.DataFrame, codes: np.ndarray, shap_top_k: int = 0, adjust: bool = False) -> list[dict]:
+    """샷 목록 채점 → 행별 결과 dict (작업 풀에서 호출)"""
+    with span("api.score"):
+        res = predict_batch(X, codes, rf_models, rf_explainers, shap_top_k=shap_top_k, keep_shap=adjust,
+                            schemas=rf_schemas, quantized=rf_quantized)
+
+    out = []
+    for i in range(len(X)):
+        row = {"mold_code": str(codes[i]), "mode": res["mode"][i], "label": int(res["pred"][i]),
+               "proba": None if np.isnan(res["proba"][i]) else round(float(res["proba"][i]), 6)}
+        if res["shap_top"][i] is not None:
+            row["shap_top"] = [{"feature": feature_name_map.get(name, name), "value": round(v, 6)}
+                               for name, v in res["shap_top"][i]]
+        out.append(row)
+
+    if adjust:
+        fails = [i for i in range(len(X)) if res["pred"][i] == 1 and res["shap"][i] is not None]
+        with span("api.adjust"):
+            for i in fails[:MAX_ADJUST]:
+                out[i]["adjustment"] = adjustment_guide(X.iloc[[i]], codes[i], res["shap"][i])
+        for i in fails[MAX_ADJUST:]:
+            out[i]["adjustment"] = None
+    return out
+
+def score_binary(X: pd.DataFrame, codes: np.ndarray, shap_top_k: int, fmt: str) -> bytes:
+    """샷 목록 채점 → Arrow / npy 응답 bytes (행별 dict 없이 열 단위로 인코딩)"""
+    with span("api.score"):
+        res = predict_batch(X, codes, rf_models, rf_explainers, shap_top_k=shap_top_k, schemas=rf_schemas,
+                            quantized=rf_quantized)
+    with span("api.serialize"):
+        if fmt == "arrow":
+            return codec.encode_arrow(codes, res, shap_top_k, names=feature_name_map)
+        return codec.encode_npy(res)
+
+
+# ===== 핸들러 =====
+async def score(request: Request) -> Response:
+    fmt_in = codec.format_of(request.headers.get("content-type")) or "json"
+    fmt_out = codec.format_of(request.headers.get("accept")) or fmt_in
+    opts = {}
+    try:
+        with span("api.parse"):
+            body = await request.body()
+            if fmt_in == "json":
+                try:
+                    payload = loads(body)
+                except ValueError:
+                    raise ApiError(400, "JSON 형식이 올바르지 않습니다")
+                records, opts = parse_payload(payload)
+                shap_top_k, adjust, monitor = parse_options(opts)
+                X, codes = records_to_frame(records)
+            else:
+                shap_top_k, adjust, monitor = parse_options(request.query_params)
+                X, codes = decode_binary(fmt_in, body)
+
+        if fmt_out != "json":
+            if adjust:
+                raise ApiError(400, "조정 가이드는 JSON 응답에서만 제공합니다")
+            if fmt_out == "npy" and shap_top_k:
+                raise ApiError(400, "SHAP 상위 변수는 Arrow / JSON 응답에서만 제공합니다")
+            if fmt_out == "arrow" and codec.pa is None:
+                raise ApiError(406, "Arrow 응답은 pyarrow 가 설치된 서버에서만 지원합니다")
+            data = await run_offloaded(score_binary, X, codes, shap_top_k, fmt_out)   # ValueError → 422
+            if monitor:
+                EXECUTOR.submit(observe_drift, X, codes)   # 응답을 기다리게 하지 않음
+            media = codec.ARROW_TYPE if fmt_out == "arrow" else codec.NPY_TYPE
+            return Response(data, media_type=media)
+
+        results = await run_offloaded(score_records, X, codes, shap_top_k, adjust)
+        if monitor:
+            EXECUTOR.submit(observe_drift, X, codes)
+    except ApiError as e:
+        return json_response({"error": e.message, **e.detail}, status=e.status)
+    except ValueError as e:   # 입력 스키마 검증 실패 (utils.input_schema)
+        return json_response({"error": str(e)}, status=422)
+
+    with span("api.serialize"):
+        body = results[0] if opts.get("single") else {"count": len(results), "results": results}
+        return json_response(body)
+
+async def health(request: Request) -> Response:
+    return json_response({"status": "ok", "models": sorted(rf_models), "features": FEATURE_COLUMNS,
+                          "max_records": MAX_RECORDS, "max_adjust": MAX_ADJUST,
+                          "binary": {"arrow": codec.pa is not None, "npy_columns": codec.NPY_COLUMNS,
+                                     "categories": codec.CATEGORY_FIELDS}})
+
+
+# app.py 에서 Mount("/api", routes=routes)
+routes = [
+    Route("/v1/score", score, methods=["POST"]),
+    Route("/v1/health", health, methods=["GET"]),
+]
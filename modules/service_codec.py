@@ -0,0 +1,213 @@
+# modules/service_codec.py — 대량 채점용 바이너리 열 형식 (Arrow IPC stream / NumPy .npy)
+#
+# JSON 파싱·직렬화가 추론보다 비싼 대량 요청용. 스키마는 shared.feature_name_map 에서 고정 도출:
+#   - 수치 변수: "num__<이름>" 순서 그대로 (float64, float32/정수도 허용)
+#   - 범주 변수: "cat__<이름>_<값>" → {이름: [값, ...]} (첫 값이 UI 기본값: working=가동, tryshot_signal=A)
+#
+# Arrow 요청: 열 mold_code(문자열/정수) + 수치 변수 + 범주 변수(문자열, 생략 시 기본값)
+# npy 요청  : 2차원 실수 배열, 열 순서 NPY_COLUMNS = [mold_code, 수치 변수..., 범주 변수(값 인덱스)...]
+# 응답      : Arrow → mold_code, mode, label, proba (+ shap_top{j}_feature/value)
+#             npy   → (n, 2) float64 [proba, label]
+#
+# 디코딩은 요청 버퍼를 그대로 가리키는 배열로 DataFrame 을 구성 (수치 열 복사 없음) → 전처리(StandardScaler)가 첫 복사
+import io
+
+import numpy as np
+import pandas as pd
+
+from shared import feature_name_map
+
+try:  # 선택 의존성: 없으면 npy 형식만 지원
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+ARROW_TYPE = "application/vnd.apache.arrow.stream"
+NPY_TYPE = "application/x-npy"
+JSON_TYPE = "application/json"
+
+NUMERIC_FIELDS = [v for k, v in feature_name_map.items() if k.startswith("num__")]
+CATEGORY_FIELDS: dict[str, list[str]] = {}
+for _k in feature_name_map:
+    if _k.startswith("cat__"):
+        _col, _val = _k[len("cat__"):].rsplit("_", 1)
+        CATEGORY_FIELDS.setdefault(_col, []).append(_val)
+NPY_COLUMNS = ["mold_code", *NUMERIC_FIELDS, *CATEGORY_FIELDS]
+
+
+class CodecError(ValueError):
+    """요청 버퍼가 스키마와 맞지 않음 (API 에서 422 로 변환)"""
+
+    def __init__(self, message: str, **detail):
+        super().__init__(message)
+        self.message = message
+        self.detail = detail
+
+
+def format_of(content_type: str | None) -> str | None:
+    """Content-Type / Accept 헤더 → "arrow" | "npy" | "json" | None"""
+    ct = (content_type or "").lower()
+    if ARROW_TYPE in ct or "application/vnd.apache.arrow.file" in ct:
+        return "arrow"
+    if NPY_TYPE in ct or "application/octet-stream+npy" in ct:
+        return "npy"
+    if JSON_TYPE in ct:
+        return "json"
+    return None
+
+def mold_codes(values) -> np.ndarray:
+    """
+    mold_code 값 배열 → 모델 키 문자열 배열 ("8412")
+    - 정수·정수값 실수(8412.0)는 str(int(v)), 소수부가 있는 수는 CodecError (모델 조회 실패 → soft voting 방지)
+    - 문자열은 앞뒤 공백만 제거
+    """
+    arr = np.asarray(values)
+    if arr.dtype.kind in "iu":
+        return arr.astype(np.int64).astype(str)
+    if arr.dtype.kind == "f":
+        frac = ~np.isfinite(arr) | (arr != np.round(arr))
+        if frac.any():
+            i = int(np.argmax(frac))
+            raise CodecError(f"mold_code 는 정수여야 합니다 ({float(arr[i])!r})", index=i, field="mold_code")
+        return arr.astype(np.int64).astype(str)
+    out = np.empty(arr.shape[0], dtype=object)
+    for i, v in enumerate(arr):
+        if isinstance(v, (bool, np.bool_)):
+            raise CodecError(f"mold_code 는 정수여야 합니다 ({v!r})", index=i, field="mold_code")
+        if isinstance(v, (int, np.integer)):
+            out[i] = str(int(v))
+        elif isinstance(v, (float, np.floating)):
+            if not float(v).is_integer():
+                raise CodecError(f"mold_code 는 정수여야 합니다 ({v!r})", index=i, field="mold_code")
+            out[i] = str(int(v))
+        else:
+            out[i] = str(v).strip()
+    return out.astype(str)
+
+def _frame(columns: dict, codes: np.ndarray) -> tuple[pd.DataFrame, np.ndarray]:
+    """열 배열 → 예측 입력 DataFrame (copy=False: 수치 열은 요청 버퍼 뷰 유지), 결측 검사"""
+    for col in NUMERIC_FIELDS:
+        nan = np.isnan(columns[col])
+        if nan.any():
+            raise CodecError(f"{col} 값이 없거나 형식이 올바르지 않습니다", index=int(np.argmax(nan)), field=col)
+    return pd.DataFrame(columns, copy=False), codes
+
+def _categories(col: str, values: np.ndarray) -> np.ndarray:
+    allowed = CATEGORY_FIELDS[col]
+    bad = ~np.isin(values, allowed)
+    if bad.any():
+        raise CodecError(f"{col} 값은 {allowed} 중 하나여야 합니다", index=int(np.argmax(bad)), field=col)
+    return values
+
+
+# ===== Arrow IPC =====
+def request_schema():
+    """Arrow 요청 스키마 (클라이언트 참고용, mold_code 는 정수도 허용)"""
+    return pa.schema([pa.field("mold_code", pa.string(), nullable=False)]
+                     + [pa.field(c, pa.float64(), nullable=False) for c in NUMERIC_FIELDS]
+                     + [pa.field(c, pa.string()) for c in CATEGORY_FIELDS])
+
+def _arrow_numeric(name: str, col) -> np.ndarray:
+    if not (pa.types.is_floating(col.type) or pa.types.is_integer(col.type)):
+        raise CodecError(f"{name} 열은 수치형이어야 합니다", field=name)
+    if col.num_chunks == 1 and col.null_count == 0:
+        return col.chunk(0).to_numpy(zero_copy_only=True)   # 요청 버퍼 뷰
+    return col.to_numpy().astype(np.float64, copy=False)   # 여러 청크·null → 한 번 복사 (null=NaN)
+
+def decode_arrow(body: bytes) -> tuple[pd.DataFrame, np.ndarray]:
+    if pa is None:
+        raise CodecError("Arrow 형식은 pyarrow 가 설치된 서버에서만 지원합니다")
+    try:
+        buf = pa.py_buffer(body)
+        try:
+            table = pa.ipc.open_stream(buf).read_all()
+        except pa.ArrowInvalid:
+            table = pa.ipc.open_file(buf).read_all()
+    except pa.ArrowInvalid as e:
+        raise CodecError(f"Arrow IPC 버퍼를 읽을 수 없습니다: {e}")
+
+    names = set(table.column_names)
+    missing = [c for c in ["mold_code", *NUMERIC_FIELDS] if c not in names]
+    if missing:
+        raise CodecError(f"{missing[0]} 열이 없습니다", field=missing[0])
+    if table.num_rows == 0:
+        raise CodecError("행이 없습니다")
+
+    codes = table.column("mold_code")
+    if codes.null_count:
+        raise CodecError("mold_code 가 없습니다", index=int(np.argmax(codes.is_null().to_numpy(zero_copy_only=False))))
+    codes = mold_codes(codes.to_numpy(zero_copy_only=False))
+
+    columns = {}
+    for col in NUMERIC_FIELDS:
+        columns[col] = _arrow_numeric(col, table.column(col))
+    for col, allowed in CATEGORY_FIELDS.items():
+        if col in names:
+            values = table.column(col).fill_null(allowed[0]).cast(pa.string()).to_numpy(zero_copy_only=False)
+            columns[col] = _categories(col, values)
+        else:
+            columns[col] = np.full(table.num_rows, allowed[0], dtype=object)
+    return _frame(columns, codes)
+
+def encode_arrow(codes: np.ndarray, res: dict, shap_top_k: int = 0, names: dict | None = None) -> bytes:
+    """predict_batch 결과 → Arrow IPC stream bytes"""
+    cols = {
+        "mold_code": pa.array(codes, pa.string()),
+        "mode": pa.array(res["mode"], pa.string()),
+        "label": pa.array(res["pred"], pa.int8()),
+        "proba": pa.array(res["proba"], pa.float64(), from_pandas=True),   # NaN → null
+    }
+    names = names or {}
+    for j in range(shap_top_k):
+        tops = [t[j] if t is not None and j < len(t) else None for t in res["shap_top"]]
+        cols[f"shap_top{j + 1}_feature"] = pa.array([names.get(t[0], t[0]) if t else None for t in tops], pa.string())
+        cols[f"shap_top{j + 1}_value"] = pa.array([t[1] if t else None for t in tops], pa.float64())
+    table = pa.table(cols)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+# ===== NumPy .npy =====
+def decode_npy(body: bytes) -> tuple[pd.DataFrame, np.ndarray]:
+    f = io.BytesIO(body)
+    try:
+        version = np.lib.format.read_magic(f)
+        shape, fortran, dtype = (np.lib.format.read_array_header_1_0(f) if version == (1, 0)
+                                 else np.lib.format.read_array_header_2_0(f))
+    except ValueError as e:
+        raise CodecError(f".npy 헤더를 읽을 수 없습니다: {e}")
+    if dtype.kind != "f" or len(shape) != 2 or shape[1] != len(NPY_COLUMNS):
+        raise CodecError(f".npy 는 (n, {len(NPY_COLUMNS)}) 실수 배열이어야 합니다 (열: {NPY_COLUMNS})",
+                         shape=list(shape), dtype=str(dtype))
+    if shape[0] == 0:
+        raise CodecError("행이 없습니다")
+    count = shape[0] * shape[1]
+    if len(body) - f.tell() < count * dtype.itemsize:
+        raise CodecError(".npy 본문 길이가 헤더와 맞지 않습니다")
+    arr = np.frombuffer(body, dtype=dtype, count=count, offset=f.tell()).reshape(
+        shape, order="F" if fortran else "C")   # 읽기 전용 뷰
+
+    code_col = arr[:, 0]
+    if np.isnan(code_col).any():
+        raise CodecError("mold_code 가 없습니다", index=int(np.argmax(np.isnan(code_col))))
+    codes = mold_codes(code_col)   # 8412.5 → 422 (JSON·Arrow 와 같은 검증)
+
+    columns = {col: arr[:, 1 + i] for i, col in enumerate(NUMERIC_FIELDS)}
+    base = 1 + len(NUMERIC_FIELDS)
+    for i, (col, allowed) in enumerate(CATEGORY_FIELDS.items()):
+        idx = arr[:, base + i]
+        bad = ~np.isin(idx, np.arange(len(allowed)))
+        if bad.any():
+            raise CodecError(f"{col} 는 값 인덱스 0..{len(allowed) - 1} ({allowed}) 여야 합니다",
+                             index=int(np.argmax(bad)), field=col)
+        columns[col] = np.asarray(allowed, dtype=object)[idx.astype(np.intp)]
+    return _frame(columns, codes)
+
+def encode_npy(res: dict) -> bytes:
+    """predict_batch 결과 → (n, 2) float64 [proba, label] .npy bytes"""
+    out = np.column_stack([res["proba"], res["pred"].astype(np.float64)])
+    buf = io.BytesIO()
+    np.save(buf, out, allow_pickle=False)
+    return buf.getvalue()
@@ -0,0 +1,108 @@
+# modules/service_offload.py — 무거운 렌더 계산을 이벤트 루프 밖(제한된 스레드 풀)으로
+#
+# 사용 패턴 (server 함수 안):
+#   @reactive.extended_task
+#   async def cutoff_task(var):
+#       return await run_offloaded(figure_png, plot_failrate_cutoff_dual_fast, df2, var)
+#
+#   @reactive.effect
+#   def _():
+#       restart(cutoff_task, input.selected_var())   # 입력이 바뀌면 이전 계산 취소 후 재실행
+#       # 탭 안의 출력이면: restart_if_visible(session, "plot_area", cutoff_task, input.selected_var())
+#
+#   @render.ui
+#   def plot_area():
+#       return task_ui(cutoff_task, png_ui)            # 실행 중이면 "계산 중…" 표시
+#
+# - 풀 크기: DIECAST_OFFLOAD_WORKERS (기본 min(4, CPU 수)) → 요청이 몰려도 CPU 과점 방지
+# - 취소: 아직 시작 전인 작업은 풀에서 제거, 이미 실행 중인 작업은 끝까지 돌고 결과만 버림
+# - pyplot 전역 상태는 스레드 안전하지 않으므로 그림 생성~PNG 인코딩은 PYPLOT_LOCK 으로 직렬화
+#   (계산 자체보다 이벤트 루프를 막지 않는 것이 목적) — 이벤트 루프에서 그리는 경로
+#   (viz.render_cache.render_cached, 진단 탭 히스토그램)도 같은 잠금을 사용하고,
+#   플롯 함수는 plt.gcf() 대신 만든 Figure 를 직접 반환할 것
+import asyncio
+import base64
+import functools
+import io
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import matplotlib.pyplot as plt
+from shiny import reactive, ui
+
+MAX_WORKERS = int(os.environ.get("DIECAST_OFFLOAD_WORKERS", min(4, os.cpu_count() or 1)))
+EXECUTOR = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="diecast-offload")
+PYPLOT_LOCK = threading.RLock()
+_LAST_ARGS: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()   # 작업 → 마지막 실행 인자
+
+
+# ===== 실행 =====
+async def run_offloaded(fn, *args, **kwargs):
+    """fn(*args, **kwargs) 를 작업 풀에서 실행하고 결과를 await (ExtendedTask 본문에서 사용)"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(EXECUTOR, functools.partial(fn, *args, **kwargs))
+
+def figure_png(fn, *args, dpi: int = 100, **kwargs) -> bytes:
+    """Figure 를 반환하는 플롯 함수 → PNG bytes (작업 스레드에서 생성·인코딩까지 완료)"""
+    with PYPLOT_LOCK:
+        fig = fn(*args, **kwargs)
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", dpi=dpi, bbox_inches="tight")
+        plt.close(fig)
+    return buf.getvalue()
+
+def restart(task, *args, **kwargs):
+    """진행 중(및 대기 중) 실행을 취소하고 새 인자로 다시 실행"""
+    task.cancel()
+    task(*args, **kwargs)
+
+def output_visible(session, output_id: str) -> bool:
+    """출력이 지금 화면에 보이는지 (클라이언트가 숨김 상태를 아직 보고하지 않았으면 False)"""
+    return session.clientdata.output_hidden(output_id) is False
+
+def restart_if_visible(session, output_id: str, task, *args, **kwargs):
+    """
+    출력이 보일 때만 restart — 닫힌 탭의 출력은 계산하지 않음 (@render.plot 의 숨김 시 일시정지와 같은 효과)
+    - 숨김 상태에 반응성 의존 → 탭을 열면 effect 가 다시 돌아 이때 실행
+    - 같은 인자로 이미 실행 중이거나 완료된 작업은 그대로 둠 (탭을 오갈 때 재계산 방지)
+    """
+    if not output_visible(session, output_id):
+        return
+    key = (args, kwargs)
+    with reactive.isolate():
+        status = task.status()
+    if _LAST_ARGS.get(task) == key and status in ("running", "success"):
+        return
+    _LAST_ARGS[task] = key
+    restart(task, *args, **kwargs)
+
+
+# ===== UI =====
+def computing_ui(msg: str = "계산 중…"):
+    return ui.div(
+        ui.span(class_="spinner-border spinner-border-sm me-2", role="status"),
+        msg,
+        class_="p-3 text-center text-muted",
+    )
+
+def png_ui(png: bytes, alt: str = "", width: str = "100%"):
+    src = "data:image/png;base64," + base64.b64encode(png).decode("ascii")
+    return ui.img(src=src, alt=alt, style=f"width:{width};height:auto;")
+
+def task_ui(task, render_result, placeholder=None, idle=None):
+    """
+    ExtendedTask 상태별 UI
+    - running / cancelled(재실행 대기) → placeholder (기본: 계산 중…)
+    - initial(아직 실행 전) → idle
+    - success → render_result(결과), error → 오류 메시지
+    """
+    status = task.status()
+    if status == "success":
+        return render_result(task.value.get())
+    if status == "error":
+        return ui.div(f"⚠️ 계산 실패: {str(task.error.get())[:200]}", class_="p-3 text-danger")
+    if status == "initial":
+        return idle
+    return placeholder if placeholder is not None else computing_ui()
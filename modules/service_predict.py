@@ -3,41 +3,60 @@ import pandas as pd
 from shiny import reactive
 import numpy as np
 
+from utils.quantized_forest import MAX_ROWS as QUANTIZED_MAX_ROWS
+from utils.timing import span, timed
+
 shap_values_state = reactive.Value(None)
 X_input_state = reactive.Value(None)
 X_input_raw = reactive.Value(None)
 
-def do_predict(input, shap_values_state, X_input_state, X_input_raw, models, explainers):
+def cascade_screen(X: pd.DataFrame, surrogate: dict):
     """
-    버튼 클릭 시 실행되는 예측 함수
-    - mold_code 모델이 있으면 해당 모델 사용
-    - 없으면 전체 모델 soft voting
+    대리 모델 1차 스크리닝
+    - 반환: (대리 모델 불량 점수, 전체 모델로 넘길 샷 여부) — escalate_above 이상만 True
     """
-    features = {
-        "molten_temp": input.molten_temp(),
-        "molten_volume": input.molten_volume(),
-        "sleeve_temperature": input.sleeve_temperature(),
-        "EMS_operation_time": input.EMS_operation_time(),
-        "cast_pressure": input.cast_pressure(),
-        "biscuit_thickness": input.biscuit_thickness(),
-        "low_section_speed": input.low_section_speed(),
-        "high_section_speed": input.high_section_speed(),
-        "physical_strength": input.physical_strength(),
-        "upper_mold_temp1": input.upper_mold_temp1(),
-        "upper_mold_temp2": input.upper_mold_temp2(),
-        "lower_mold_temp1": input.lower_mold_temp1(),
-        "lower_mold_temp2": input.lower_mold_temp2(),
-        "Coolant_temperature": input.coolant_temp(),
-        "facility_operation_cycleTime": input.facility_operation_cycleTime(),
-        "production_cycletime": input.production_cycletime(),
-        "count": input.count(),
-        "working": input.working(),
-        "tryshot_signal": "D" if input.tryshot_check() else "A"
-    }
+    score = np.clip(np.asarray(surrogate["model"].predict(X), dtype=float), 0.0, 1.0)
+    return score, score >= surrogate["escalate_above"]
 
-    X = pd.DataFrame([features])
-    mold_code = input.mold_code()
+# do_predict 입력 컬럼 (UI 입력 순서 그대로) — 벤치마크·배치 경로에서도 같은 순서 사용
+FEATURE_COLUMNS = [
+    "molten_temp", "molten_volume", "sleeve_temperature", "EMS_operation_time", "cast_pressure",
+    "biscuit_thickness", "low_section_speed", "high_section_speed", "physical_strength",
+    "upper_mold_temp1", "upper_mold_temp2", "lower_mold_temp1", "lower_mold_temp2",
+    "Coolant_temperature", "facility_operation_cycleTime", "production_cycletime", "count",
+    "working", "tryshot_signal",
+]
 
+def _as_frame(X) -> pd.DataFrame:
+    """1행 dict → DataFrame (스키마가 없는 경로·대리 모델용)"""
+    return X if isinstance(X, pd.DataFrame) else pd.DataFrame([X], columns=FEATURE_COLUMNS)
+
+def _model_proba(model, schema, X, quantized=None):
+    """
+    금형 모델 양성 확률 (+ 스키마 경로면 모델 입력 배열) — 스키마가 없으면 파이프라인 그대로
+    - quantized(QuantizedForest)가 있고 QUANTIZED_MAX_ROWS 행 이하면 정수 코드 순회 (결과 동일, 소량에서 빠름)
+    """
+    if schema is None:
+        return model.predict_proba(_as_frame(X))[:, 1], None
+    with span("predict.encode"):
+        Xt = schema.encode(X)
+    if quantized is not None and Xt.shape[0] <= QUANTIZED_MAX_ROWS:
+        with span("predict.quantized"):
+            return quantized.predict_proba(None, codes=quantized.encode_transformed(Xt))[:, 1], Xt
+    return model.named_steps["model"].predict_proba(Xt)[:, 1], Xt
+
+def predict_one(X, mold_code, models, explainers, surrogates=None, with_shap=True, schemas=None,
+                quantized=None) -> dict:
+    """
+    1행 입력 예측 (Shiny 상태 없이 계산만) — do_predict 와 벤치마크가 같은 경로를 사용
+    - X: FEATURE_COLUMNS 1행 dict 또는 DataFrame
+    - schemas(금형별 InputSchema)가 있으면 전처리를 거치지 않고 모델 입력 배열로 한 번만 인코딩
+    - quantized(금형별 QuantizedForest)가 있으면 스키마 경로 확률을 정수 코드 순회로 계산
+    - 반환: {"mode", "pred", "proba", "shap_values", "X_transformed"}
+      mode: "screened"(대리 모델에서 종료) | "model"(금형 모델) | "vote"(soft voting)
+      pred == -1 이면 예측 실패, mode == "model" 인데 X_transformed 가 None 이면 전처리 실패
+    """
+    out = {"mode": None, "pred": -1, "proba": None, "shap_values": None, "X_transformed": None}
     model = models.get(mold_code)
     explainer = explainers.get(mold_code)
 
@@ -45,55 +64,183 @@ def do_predict(input, shap_values_state, X_input_state, X_input_raw, models, exp
     # Case 1: 해당 mold_code 모델 있음
     # ---------------------------
     if model is not None and explainer is not None:
+        surrogate = (surrogates or {}).get(mold_code)
+        if surrogate is not None:
+            try:
+                with span("predict.surrogate"):
+                    score, escalate = cascade_screen(_as_frame(X), surrogate)
+                if not escalate[0]:
+                    # 확실한 양품 → RF/SHAP 생략
+                    out.update(mode="screened", pred=0, proba=float(score[0]))
+                    return out
+            except Exception as e:
+                print(f"[WARN] Surrogate screening failed, using full model: {e}")
+
+        out["mode"] = "model"
+        schema = (schemas or {}).get(mold_code)
         try:
-            pred = model.predict(X)[0]
-            proba = model.predict_proba(X)[0][1]
+            with span("predict.model"):
+                proba, Xt = _model_proba(model, schema, X, (quantized or {}).get(mold_code))
+                out["proba"] = proba[0]
+                out["pred"] = int(proba[0] > 0.5)   # predict(argmax) 와 동일 (동률은 0)
         except Exception as e:
             print(f"[ERROR] Prediction failed: {e}")
-            return -1, None
+            out["pred"] = -1
+            return out
+        if not with_shap:
+            return out
 
-        # 전처리 + shap
+        # 전처리 + shap (스키마 경로는 예측에 쓴 배열 그대로)
         try:
-            X_transformed = model.named_steps["preprocess"].transform(X)
-            feature_names = model.named_steps["preprocess"].get_feature_names_out()
-            X_transformed_df = pd.DataFrame(X_transformed, columns=feature_names)
+            with span("predict.preprocess"):
+                if Xt is not None:
+                    out["X_transformed"] = schema.frame(Xt)
+                else:
+                    X_transformed = model.named_steps["preprocess"].transform(_as_frame(X))
+                    feature_names = model.named_steps["preprocess"].get_feature_names_out()
+                    out["X_transformed"] = pd.DataFrame(X_transformed, columns=feature_names)
         except Exception as e:
             print(f"[ERROR] Preprocessing failed: {e}")
-            return pred, proba
+            return out
 
         try:
-            shap_values = explainer(X_transformed_df)
+            with span("predict.shap"):
+                out["shap_values"] = explainer(out["X_transformed"])
         except Exception as e:
             print(f"[ERROR] SHAP calculation failed: {e}")
-            shap_values = None
-
-        shap_values_state.set(shap_values)
-        X_input_state.set(X_transformed_df)
-        X_input_raw.set(X.copy())
-
-        return pred, proba
+        return out
 
     # ---------------------------
     # Case 2: mold_code 모델 없음 → soft voting
     # ---------------------------
-    else:
-        all_probas = []
-        for mc, mdl in models.items():
-            try:
-                p = mdl.predict_proba(X)[0][1]
-                all_probas.append(p)
-            except Exception as e:
-                print(f"[WARN] 모델 {mc} 예측 실패: {e}")
-
-        if not all_probas:
-            return -1, None
+    out["mode"] = "vote"
+    all_probas = []
+    for mc, mdl in models.items():
+        try:
+            with span("predict.vote"):
+                p = _model_proba(mdl, (schemas or {}).get(mc), X, (quantized or {}).get(mc))[0][0]
+            all_probas.append(p)
+        except Exception as e:
+            print(f"[WARN] 모델 {mc} 예측 실패: {e}")
 
+    if all_probas:
         avg_proba = np.mean(all_probas)
-        pred = 1 if avg_proba >= 0.5 else 0
-
         # soft voting일 때는 shap 계산이 애매 → None으로
-        shap_values_state.set(None)
-        X_input_state.set(None)
-        X_input_raw.set(X.copy())
+        out.update(pred=1 if avg_proba >= 0.5 else 0, proba=avg_proba)
+    return out
+
+def _shap_top_k(explainer, Xt: pd.DataFrame, k: int):
+    """행별 |SHAP| 상위 k개 [(전처리 변수명, 값), ...] (양성 클래스 기준)"""
+    vals = explainer(Xt).values
+    if vals.ndim == 3:
+        vals = vals[:, :, 1]
+    k = min(k, vals.shape[1])
+    top = np.argpartition(-np.abs(vals), k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(np.abs(vals), top, axis=1).argsort(axis=1)[:, ::-1]
+    top = np.take_along_axis(top, order, axis=1)
+    names = np.asarray(Xt.columns)
+    return [[(names[j], float(vals[i, j])) for j in row] for i, row in enumerate(top)], vals
+
+def predict_batch(X: pd.DataFrame, mold_codes, models, explainers, shap_top_k: int = 0, keep_shap: bool = False,
+                  schemas=None, quantized=None) -> dict:
+    """
+    여러 샷 일괄 예측 (금형별로 묶어 한 번씩 predict_proba) — REST API 등 헤드리스 경로용
+    - X: FEATURE_COLUMNS 순서의 원본 입력, mold_codes: 행별 금형 코드
+    - schemas 가 있으면 금형 묶음마다 모델 입력 배열로 한 번 인코딩 (전처리·SHAP 공용)
+    - quantized 가 있으면 QUANTIZED_MAX_ROWS 행 이하 금형 묶음은 정수 코드 순회
+    - 금형 모델이 없는 행은 do_predict 와 같게 전체 모델 soft voting
+    - 반환: {"proba", "pred", "mode", "shap_top", "shap"} (행 순서 유지)
+      shap_top: shap_top_k > 0 이면 행별 상위 k개, shap: keep_shap 이면 행별 {변수명: 값} (soft voting 행은 None)
+    """
+    n = len(X)
+    codes = np.asarray(mold_codes, dtype=str)
+    proba = np.full(n, np.nan)
+    pred = np.full(n, -1, dtype=int)
+    mode = np.full(n, "model", dtype=object)
+    shap_top = [None] * n
+    shap_rows = [None] * n
+
+    for code in pd.unique(codes):
+        idx = np.flatnonzero(codes == code)
+        Xg = X.iloc[idx]
+        model, explainer = models.get(code), explainers.get(code)
+        if model is None or explainer is None:
+            with span("predict.batch.vote"):
+                all_probas = [_model_proba(m, (schemas or {}).get(mc), Xg, (quantized or {}).get(mc))[0]
+                              for mc, m in models.items()]
+            if all_probas:
+                p = np.mean(all_probas, axis=0)
+                proba[idx], pred[idx] = p, (p >= 0.5).astype(int)
+            mode[idx] = "vote"
+            continue
+
+        schema = (schemas or {}).get(code)
+        with span("predict.batch.model"):
+            p, Xt = _model_proba(model, schema, Xg, (quantized or {}).get(code))
+        proba[idx], pred[idx] = p, (p > 0.5).astype(int)   # predict 와 동일 (동률은 0)
+        if shap_top_k > 0 or keep_shap:
+            with span("predict.batch.shap"):
+                if Xt is not None:
+                    Xt = schema.frame(Xt)
+                else:
+                    pre = model.named_steps["preprocess"]
+                    Xt = pd.DataFrame(pre.transform(Xg), columns=pre.get_feature_names_out())
+                top, vals = _shap_top_k(explainer, Xt, max(shap_top_k, 1))
+            for r, i in enumerate(idx):
+                if shap_top_k > 0:
+                    shap_top[i] = top[r]
+                if keep_shap:
+                    shap_rows[i] = dict(zip(Xt.columns, vals[r]))
+    return {"proba": proba, "pred": pred, "mode": mode, "shap_top": shap_top, "shap": shap_rows}
+
+@timed("predict.do_predict")
+def do_predict(input, shap_values_state, X_input_state, X_input_raw, models, explainers, surrogates=None,
+               schemas=None, drift=None, quantized=None, mode_state=None):
+    """
+    버튼 클릭 시 실행되는 예측 함수
+    - mold_code 모델이 있으면 해당 모델 사용
+    - 없으면 전체 모델 soft voting
+    - surrogates(금형별 대리 모델)가 있으면 1차 스크리닝 → 불확실 구간 이상만 전체 모델 + SHAP
+    - drift(DriftMonitor)가 있으면 예측한 샷을 드리프트 감시 창에 반영
+    - mode_state 가 있으면 예측 경로("model" | "vote" | "screened")를 기록 (SHAP 패널 안내 문구용)
+    """
+    features = {
+        "molten_temp": input.molten_temp(),
+        "molten_volume": input.molten_volume(),
+        "sleeve_temperature": input.sleeve_temperature(),
+        "EMS_operation_time": input.EMS_operation_time(),
+        "cast_pressure": input.cast_pressure(),
+        "biscuit_thickness": input.biscuit_thickness(),
+        "low_section_speed": input.low_section_speed(),
+        "high_section_speed": input.high_section_speed(),
+        "physical_strength": input.physical_strength(),
+        "upper_mold_temp1": input.upper_mold_temp1(),
+        "upper_mold_temp2": input.upper_mold_temp2(),
+        "lower_mold_temp1": input.lower_mold_temp1(),
+        "lower_mold_temp2": input.lower_mold_temp2(),
+        "Coolant_temperature": input.coolant_temp(),
+        "facility_operation_cycleTime": input.facility_operation_cycleTime(),
+        "production_cycletime": input.production_cycletime(),
+        "count": input.count(),
+        "working": input.working(),
+        "tryshot_signal": "D" if input.tryshot_check() else "A"
+    }
+
+    res = predict_one(features, input.mold_code(), models, explainers, surrogates=surrogates, schemas=schemas,
+                      quantized=quantized)
+
+    if mode_state is not None:
+        mode_state.set(res["mode"] if res["pred"] != -1 else None)
+    if res["pred"] == -1:
+        return -1, None
+    if drift is not None:
+        with span("drift.observe"):
+            drift.observe(input.mold_code(), features)
+    if res["mode"] == "model" and res["X_transformed"] is None:
+        return res["pred"], res["proba"]
+
+    shap_values_state.set(res["shap_values"])
+    X_input_state.set(res["X_transformed"])
+    X_input_raw.set(_as_frame(features))   # 조정 가이드(R-SG)용 원본 입력
 
-        return pred, avg_proba
+    return res["pred"], res["proba"]
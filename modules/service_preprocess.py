@@ -1,15 +1,19 @@
 # modules/service_preprocess.py
 from shiny import ui
-from shared import df, name_map_kor
+from shared import df_profile, name_map_kor
+from utils.profile_utils import (
+    NUMERIC_DTYPES, CATEGORICAL_DTYPES, profile_columns, profile_numeric_stats,
+)
 import pandas as pd
 
-# 0. 데이터 요약
+# 0. 데이터 요약 (원본 대신 shared.df_profile 스냅샷 사용)
 # 기본 정보 요약 함수
 def get_data_summary():
+    n_missing_cols = sum(1 for info in df_profile["columns"].values() if info["missing"] > 0)
     return {
-        "전체 행 수": f"{len(df):,}",
-        "전체 열 수": f"{len(df.columns):,}",
-        "결측치 포함 열": f"{df.isnull().any().sum()}",
+        "전체 행 수": f"{df_profile['n_rows']:,}",
+        "전체 열 수": f"{df_profile['n_cols']:,}",
+        "결측치 포함 열": f"{n_missing_cols}",
     }
 
 # 데이터 요약 테이블 HTML
@@ -23,8 +27,8 @@ data_summary_table = ui.HTML("""
 
 # 변수 타입별 요약 함수
 def get_variable_types():
-    numeric_cols = df.select_dtypes(include=['int64', 'float64']).columns.tolist()
-    categorical_cols = df.select_dtypes(include=['object', 'category']).columns.tolist()
+    numeric_cols = profile_columns(df_profile, NUMERIC_DTYPES)
+    categorical_cols = profile_columns(df_profile, CATEGORICAL_DTYPES)
     
     # 매핑 적용 (없는 경우 원래 변수명 유지)
     numeric_cols_kor = [name_map_kor.get(col, col) for col in numeric_cols]
@@ -56,6 +60,11 @@ def get_variable_types():
     return html_table
 
 
+# 수치형 변수 기술통계 + 결측치 표
+def get_numeric_stats():
+    return profile_numeric_stats(df_profile, exclude=("passorfail",)).round(2)
+
+
 # 1. 가용 변수 테이블
 available_vars_table = ui.HTML("""
 <table class="table table-bordered table-hover" style="font-size:0.9rem; text-align:center;">
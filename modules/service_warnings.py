@@ -2,6 +2,7 @@
 from shiny import ui
 import numpy as np
 from shared import feature_name_map, feature_name_map_kor
+from utils.timing import timed
 
 # -----------------------------------
 # 1) Cut-off 기준 정의
@@ -96,6 +97,7 @@ def normalize_rule_severity(var, value):
 # -----------------------------------
 # 3) 경고 메시지 생성 함수
 # -----------------------------------
+@timed("warnings.shap_based_warning")
 def shap_based_warning(process: str,
                        shap_values_state,
                        X_input_state,
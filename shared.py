@@ -6,8 +6,13 @@ import joblib
 import shap
 from matplotlib import font_manager as fm
 import os
+import json
 
 from models.FinalModel.smote_sampler import MajorityVoteSMOTENC
+from utils.profile_utils import load_or_build_profile
+from utils.quantized_forest import quantize_models
+from utils.input_schema import compile_schemas
+from utils.drift_utils import DriftMonitor
 
 # app.py가 있는 위치를 기준으로 절대 경로 관리
 app_dir = Path(__file__).parent
@@ -53,6 +58,9 @@ setup_korean_font()
 df = pd.read_csv(data_dir / "train.csv")
 df.info()
 
+# 데이터 버전별 프로파일(기술통계·결측·타입) 스냅샷 — 요청 시 원본 스캔 없이 사용
+df_profile = load_or_build_profile(data_dir / "train.csv", df=df)
+
 # 이상치 제거 데이터
 df2 = pd.read_csv(data_dir / "outlier_remove_data2.csv")
 
@@ -76,14 +84,21 @@ df2 = pd.read_csv(data_dir / "outlier_remove_data2.csv")
 #     "8917": shap.TreeExplainer(models["8917"].named_steps["model"]),
 # }
 
-rf_models = {
-    "8412": joblib.load(models_dir / "RandomForest" /"rf_mold_8412.pkl"),
-    "8573": joblib.load(models_dir / "RandomForest" /"rf_mold_8573.pkl"),
-    "8600": joblib.load(models_dir / "RandomForest" /"rf_mold_8600.pkl"),
-    "8722": joblib.load(models_dir / "RandomForest" /"rf_mold_8722.pkl"),
-    "8917": joblib.load(models_dir / "RandomForest" /"rf_mold_8917.pkl"),
-    
-}
+# 금형별 서빙 모델 — 기본은 RandomForest, DIECAST_MODEL_DIR 로 벤치마크 선정 모델(models/Selected) 등 교체 가능
+# (폴더 안의 <family>_mold_<code>.pkl, 이름은 기존 호환을 위해 rf_* 유지)
+MOLD_CODES = ["8412", "8573", "8600", "8722", "8917"]
+model_dir = Path(os.environ.get("DIECAST_MODEL_DIR", models_dir / "RandomForest"))
+
+def _mold_model_path(code: str) -> Path:
+    preferred = model_dir / f"rf_mold_{code}.pkl"
+    if preferred.exists():
+        return preferred
+    found = sorted(model_dir.glob(f"*_mold_{code}.pkl"))
+    if not found:
+        raise FileNotFoundError(f"{model_dir} 에 금형 {code} 모델(*_mold_{code}.pkl)이 없습니다.")
+    return found[0]
+
+rf_models = {code: joblib.load(_mold_model_path(code)) for code in MOLD_CODES}
 
 # rf_models = {
 #     "8412": joblib.load(models_dir / "FinalModel" /"final_rf_mold_8412.pkl"),
@@ -94,23 +109,37 @@ rf_models = {
     
 # }
 
-rf_explainers = {
-    "8412": shap.TreeExplainer(rf_models["8412"].named_steps["model"]),
-    "8573": shap.TreeExplainer(rf_models["8573"].named_steps["model"]),
-    "8600": shap.TreeExplainer(rf_models["8600"].named_steps["model"]),
-    "8722": shap.TreeExplainer(rf_models["8722"].named_steps["model"]),
-    "8917": shap.TreeExplainer(rf_models["8917"].named_steps["model"]),
-    
-}
+rf_explainers = {code: shap.TreeExplainer(m.named_steps["model"]) for code, m in rf_models.items()}
 
 # shared.py에 추가
-rf_preprocessors = {
-    "8412": rf_models["8412"].named_steps["preprocess"],
-    "8573": rf_models["8573"].named_steps["preprocess"],
-    "8600": rf_models["8600"].named_steps["preprocess"],
-    "8722": rf_models["8722"].named_steps["preprocess"],
-    "8917": rf_models["8917"].named_steps["preprocess"],
-}
+rf_preprocessors = {code: m.named_steps["preprocess"] for code, m in rf_models.items()}
+
+# 금형별 입력 스키마 (feature_names_in_·스케일러·인코더 범주) — 예측 시 DataFrame/ColumnTransformer 없이 모델 입력 배열 생성
+rf_schemas = compile_schemas(rf_models)
+
+# 정수 구간 코드 추론 표현 (선택, DIECAST_QUANTIZED=1) — 예측값은 원본과 동일
+# 스키마 경로에서 MAX_ROWS(DIECAST_QUANTIZED_MAX_ROWS) 행 이하 예측에 사용 (1행 UI 예측·소량 API 요청)
+rf_quantized = quantize_models(rf_models) if os.environ.get("DIECAST_QUANTIZED") == "1" else {}
+
+# 1차 스크리닝용 경량 대리 모델 (models/FinalModel/distill_surrogate.py 산출물)
+# 캐스케이드 모드는 선택 사항: DIECAST_CASCADE=1 이고 surrogates.json 이 있을 때만 활성
+# (기본은 비활성 → 모든 샷을 전체 모델 + SHAP 으로 예측)
+surrogate_dir = Path(os.environ.get("DIECAST_SURROGATE_DIR", models_dir / "Surrogate"))
+
+def _load_surrogates() -> dict:
+    meta_path = surrogate_dir / "surrogates.json"
+    if os.environ.get("DIECAST_CASCADE", "0") != "1" or not meta_path.exists():
+        return {}
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)["molds"]
+    return {
+        code: {"model": joblib.load(surrogate_dir / f"surrogate_mold_{code}.pkl"),
+               "escalate_above": float(info["escalate_above"])}
+        for code, info in meta.items()
+        if code in rf_models and (surrogate_dir / f"surrogate_mold_{code}.pkl").exists()
+    }
+
+rf_surrogates = _load_surrogates()
 
 # 전처리된 컬럼명 → 원래 변수명
 feature_name_map = {
@@ -210,4 +239,20 @@ name_map_kor = {
     "day": "일",
     "month": "월",
     "weekday": "요일"
-}
\ No newline at end of file
+}
+# 입력 분포 드리프트 감시 — 금형별 학습 데이터(df2) 분포 vs 최근 채점 샷 (DIECAST_DRIFT=0 이면 비활성)
+# tryshot_signal 결측은 UI·API 와 같게 "A" 로 보고 기준 분포를 만든다
+def _build_drift_monitor():
+    if os.environ.get("DIECAST_DRIFT", "1") == "0":
+        return None
+    ref = df2.assign(tryshot_signal=df2["tryshot_signal"].fillna("A"))
+    ref = ref[ref["mold_code"].astype(str).isin(rf_models)]
+    return DriftMonitor.from_frame(
+        ref,
+        numeric=[v for k, v in feature_name_map.items() if k.startswith("num__")],
+        categorical=["working", "tryshot_signal"],
+        window=int(os.environ.get("DIECAST_DRIFT_WINDOW", "500")),
+        min_count=int(os.environ.get("DIECAST_DRIFT_MIN_COUNT", "250")),
+    )
+
+drift_monitor = _build_drift_monitor()
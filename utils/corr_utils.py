@@ -0,0 +1,220 @@
+# utils/corr_utils.py
+import numpy as np
+import pandas as pd
+import warnings
+from typing import Iterable, Optional, Sequence
+
+
+def _nan_shift(X: np.ndarray) -> np.ndarray:
+    """열별 평균(결측 무시) — 전부 결측인 열은 0"""
+    if X.shape[0] == 0:
+        return np.zeros(X.shape[1])
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nan_to_num(np.nanmean(X, axis=0))
+
+
+class CorrStats:
+    """
+    상관계수용 충분통계량(합·제곱합·교차곱·쌍별 개수) 누적기
+    - 결측은 pandas .corr()과 동일하게 '쌍별 완전 관측'으로 처리
+    - update()로 신규 샷을 스트리밍 반영 → corr()는 전체 행렬 1회 계산 후 부분집합 인덱싱
+    - spearman=True면 원자료를 보관해 순위를 캐시 (순위는 전체 데이터에 의존하므로 증분 불가)
+    """
+
+    def __init__(self, columns: Sequence[str], spearman: bool = False):
+        self.columns = list(dict.fromkeys(columns))
+        self._pos = {c: i for i, c in enumerate(self.columns)}
+        p = len(self.columns)
+        self.n = np.zeros((p, p))     # n[i,j]   : i, j 모두 관측된 행 수
+        self.sx = np.zeros((p, p))    # sx[i,j]  : i, j 모두 관측된 행에서 x_i 합
+        self.sxx = np.zeros((p, p))   # sxx[i,j] : 동일 조건의 x_i² 합
+        self.sxy = np.zeros((p, p))   # sxy[i,j] : 동일 조건의 x_i·x_j 합
+        self.shift: Optional[np.ndarray] = None  # 수치 안정성용 기준값 (첫 배치 평균)
+        self.spearman = spearman
+        self._raw: list[np.ndarray] = []
+        self._pearson: Optional[np.ndarray] = None
+        self._rank_corr: Optional[np.ndarray] = None
+
+    # ---------- 누적 ----------
+    def _to_array(self, df: pd.DataFrame) -> np.ndarray:
+        X = df.reindex(columns=self.columns)
+        return X.apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+
+    def update(self, df: pd.DataFrame) -> "CorrStats":
+        """신규 행(샷) 배치를 통계량에 더함"""
+        X = self._to_array(df)
+        if X.shape[0] == 0:
+            return self
+        if self.shift is None:
+            self.shift = _nan_shift(X)
+        self.add_arrays(*self.sufficient_stats(X, self.shift))
+        if self.spearman:
+            self._raw.append(X)
+        return self
+
+    @staticmethod
+    def sufficient_stats(X: np.ndarray, shift: np.ndarray):
+        """(n, sx, sxx, sxy) 계산 — 결측은 0으로 두고 관측 마스크 행렬곱으로 쌍별 집계"""
+        M = ~np.isnan(X)
+        Mf = M.astype(np.float64)
+        Z = np.where(M, X - shift, 0.0)
+        return Mf.T @ Mf, Z.T @ Mf, (Z * Z).T @ Mf, Z.T @ Z
+
+    def add_arrays(self, n, sx, sxx, sxy) -> "CorrStats":
+        self.n += n
+        self.sx += sx
+        self.sxx += sxx
+        self.sxy += sxy
+        self._pearson = None
+        self._rank_corr = None
+        return self
+
+    # ---------- 계산 ----------
+    @staticmethod
+    def pearson_from_stats(n, sx, sxx, sxy, min_periods: int = 2) -> np.ndarray:
+        """충분통계량 → 상관행렬 (앞쪽 축이 더 있으면 행렬 묶음 단위로 계산)"""
+        sy, syy = np.swapaxes(sx, -1, -2), np.swapaxes(sxx, -1, -2)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = n * sxy - sx * sy
+            var_x = n * sxx - sx * sx
+            var_y = n * syy - sy * sy
+            r = cov / np.sqrt(var_x * var_y)
+        r = np.clip(r, -1.0, 1.0)
+        r[(n < max(min_periods, 2)) | (var_x <= 0) | (var_y <= 0)] = np.nan
+        d = np.arange(r.shape[-1])
+        r[..., d, d] = np.where(np.isnan(r[..., d, d]), np.nan, 1.0)
+        return r
+
+    def _pearson_matrix(self) -> np.ndarray:
+        if self._pearson is None:
+            self._pearson = self.pearson_from_stats(self.n, self.sx, self.sxx, self.sxy)
+        return self._pearson
+
+    def _spearman_matrix(self) -> np.ndarray:
+        if not self.spearman:
+            raise ValueError("spearman=True로 생성한 경우에만 Spearman 상관을 계산할 수 있습니다.")
+        if self._rank_corr is None:
+            X = np.vstack(self._raw) if self._raw else np.empty((0, len(self.columns)))
+            ranks = pd.DataFrame(X).rank(method="average").to_numpy(dtype=np.float64)
+            self._rank_corr = self.pearson_from_stats(*self.sufficient_stats(ranks, _nan_shift(ranks)))
+        return self._rank_corr
+
+    def corr(self, cols: Optional[Iterable[str]] = None, method: str = "pearson") -> pd.DataFrame:
+        """캐시된 전체 행렬에서 cols 부분집합만 잘라 반환"""
+        mat = self._spearman_matrix() if method == "spearman" else self._pearson_matrix()
+        cols = self.columns if cols is None else [c for c in cols if c in self._pos]
+        idx = [self._pos[c] for c in cols]
+        return pd.DataFrame(mat[np.ix_(idx, idx)], index=cols, columns=cols)
+
+
+# =========================================================
+# 그룹(mold_code) × 시간 구간별 상관 누적 → 롤링 윈도우 상관 변화 감지
+# =========================================================
+class GroupedCorrStats:
+    """
+    (그룹, 시간 구간)별 충분통계량을 한 번의 순회로 누적
+    - 모든 그룹이 같은 shift를 공유하므로 구간 통계량을 더하기만 하면 윈도우/전체 통계량이 됨
+    - update()를 청크 단위로 호출하면 수개월 데이터도 메모리에 올리지 않고 처리 가능
+    """
+
+    def __init__(self, columns: Sequence[str], group_col: str = "mold_code",
+                 time_col: str = "_t_", freq: str = "D"):
+        self.columns = list(dict.fromkeys(columns))
+        self.group_col = group_col
+        self.time_col = time_col
+        self.freq = freq
+        self.shift: Optional[np.ndarray] = None
+        self.stats: dict[tuple, np.ndarray] = {}  # (그룹, 구간시작) → [n, sx, sxx, sxy] (4×p×p)
+
+    def update(self, df: pd.DataFrame) -> "GroupedCorrStats":
+        if df is None or df.empty:
+            return self
+        X = df.reindex(columns=self.columns).apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+        if self.shift is None:
+            self.shift = _nan_shift(X)
+        groups = df[self.group_col].astype(str).to_numpy()
+        buckets = pd.to_datetime(df[self.time_col], errors="coerce").dt.floor(self.freq)
+        keys = pd.MultiIndex.from_arrays([groups, buckets])
+        codes, uniques = pd.factorize(keys)
+        order = np.argsort(codes, kind="stable")
+        bounds = np.flatnonzero(np.diff(codes[order])) + 1
+        for rows in np.split(order, bounds):
+            if rows.size == 0 or codes[rows[0]] < 0:
+                continue
+            key = uniques[codes[rows[0]]]
+            if pd.isna(key[1]):
+                continue
+            acc = np.stack(CorrStats.sufficient_stats(X[rows], self.shift))
+            if key in self.stats:
+                self.stats[key] += acc
+            else:
+                self.stats[key] = acc
+        return self
+
+    def group_stats(self, group) -> tuple[pd.DatetimeIndex, np.ndarray]:
+        """그룹의 구간 통계량을 빈 구간 포함 연속 시간축으로 정렬 (T×4×p×p)"""
+        items = sorted((t, a) for (g, t), a in self.stats.items() if g == group)
+        if not items:
+            return pd.DatetimeIndex([]), np.empty((0, 4, len(self.columns), len(self.columns)))
+        idx = pd.date_range(items[0][0], items[-1][0], freq=self.freq)
+        out = np.zeros((len(idx), 4, len(self.columns), len(self.columns)))
+        out[idx.get_indexer([t for t, _ in items])] = np.stack([a for _, a in items])
+        return idx, out
+
+    def groups(self) -> list:
+        return sorted({g for g, _ in self.stats})
+
+    def rolling_corr(self, group, window: int = 7) -> tuple[pd.DatetimeIndex, np.ndarray]:
+        """window 구간 롤링 상관행렬 묶음 (구간 끝 시각, T×p×p) — 누적합 차분으로 O(T·p²)"""
+        idx, acc = self.group_stats(group)
+        if len(idx) == 0:
+            return idx, np.empty((0, len(self.columns), len(self.columns)))
+        cum = np.cumsum(acc, axis=0)
+        win = cum.copy()
+        win[window:] -= cum[:-window]
+        return idx, CorrStats.pearson_from_stats(*np.moveaxis(win, 1, 0))
+
+    def pooled_corr(self, group) -> np.ndarray:
+        _, acc = self.group_stats(group)
+        return CorrStats.pearson_from_stats(*acc.sum(axis=0))
+
+    def drift_pairs(self, threshold: float = 0.3, window: int = 7, min_count: int = 30) -> pd.DataFrame:
+        """
+        그룹별 전체 기간(pooled) 상관 대비 롤링 윈도우 상관이 threshold 이상 변한 변수쌍 목록
+        반환 컬럼: group, window_end, var1, var2, r_base, r_window, delta, n
+        """
+        cols = ["group", "window_end", "var1", "var2", "r_base", "r_window", "delta", "n"]
+        iu, ju = np.triu_indices(len(self.columns), k=1)
+        frames = []
+        for g in self.groups():
+            idx, r_win = self.rolling_corr(g, window)
+            if len(idx) == 0:
+                continue
+            _, acc = self.group_stats(g)
+            cum = np.cumsum(acc[:, 0], axis=0)
+            n_win = cum.copy()
+            n_win[window:] -= cum[:-window]
+            r_base = self.pooled_corr(g)[iu, ju]
+            r_pairs = r_win[:, iu, ju]
+            n_pairs = n_win[:, iu, ju]
+            delta = r_pairs - r_base
+            with np.errstate(invalid="ignore"):
+                hit = (np.abs(delta) >= threshold) & (n_pairs >= min_count)
+            t_i, p_i = np.nonzero(hit)
+            if t_i.size == 0:
+                continue
+            frames.append(pd.DataFrame({
+                "group": g,
+                "window_end": idx[t_i] + pd.tseries.frequencies.to_offset(self.freq),
+                "var1": np.asarray(self.columns)[iu[p_i]],
+                "var2": np.asarray(self.columns)[ju[p_i]],
+                "r_base": r_base[p_i],
+                "r_window": r_pairs[t_i, p_i],
+                "delta": delta[t_i, p_i],
+                "n": n_pairs[t_i, p_i].astype(int),
+            }))
+        if not frames:
+            return pd.DataFrame(columns=cols)
+        out = pd.concat(frames, ignore_index=True)
+        return out.sort_values("delta", key=np.abs, ascending=False, ignore_index=True)
@@ -0,0 +1,274 @@
+# utils/drift_utils.py — 금형·변수별 입력 분포 드리프트 감시 (학습 데이터 기준 vs 최근 채점 샷)
+#
+# 기준(reference): 학습 데이터(shared.df2)의 금형별 분위수 구간(기본 10개) 히스토그램
+#   - 수치 변수: 기준 분위수를 구간 경계로 사용 (동률 경계는 합침), 범위 밖은 양끝 구간
+#   - 범주 변수: 기준 범주 + "기타" 구간
+# 최근(window): 금형별 최근 window 샷의 구간 번호 링버퍼 + 구간별 개수
+#   - 샷 1건 반영 = 가장 오래된 샷 구간 -1, 새 샷 구간 +1 → 변수당 O(1), 지표 계산은 변수당 O(구간 수)
+#
+# 지표 (변수별):
+#   PSI = Σ (p_w - p_r)·ln(p_w / p_r)              (확률 하한 eps 로 0 구간 보정)
+#   KS  = max |CDF_w - CDF_r|                       (구간 경계 기준 근사)
+#   JS  = Jensen-Shannon 발산 (log2, 0~1)
+# 수준: PSI < warn_psi → 정상, < alert_psi → 주의, 이상 → 경보 (업계 관례 0.1 / 0.25)
+#   분포가 같아도 표본 PSI 기댓값 ≈ (구간 수 - 1) / n 이므로 min_count 미만 샷에서는 판정하지 않음 (10구간·100샷 ≈ 0.09)
+# 수준이 올라가거나(주의·경보) 정상으로 돌아올 때만 알림 이벤트를 남김 (샷마다 중복 알림 없음)
+import threading
+import time
+from collections import deque
+from typing import Dict, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+LEVELS = {-1: "데이터 부족", 0: "정상", 1: "주의", 2: "경보"}
+
+
+class MoldReference:
+    """금형 1개의 변수별 기준 구간·확률 (생성 후 읽기 전용)"""
+
+    def __init__(self, features, edges, ref_counts, categories, eps: float = 1e-4):
+        self.features = list(features)
+        self.edges = edges                    # (F, B-1) 구간 경계, 남는 칸은 +inf
+        self.categories = categories          # {변수: {범주: 코드}} (범주 변수만)
+        self.n_bins = (np.isfinite(edges).sum(axis=1) + 1).astype(np.int64)   # 변수별 실제 구간 수
+        self.mask = np.arange(edges.shape[1] + 1)[None, :] < self.n_bins[:, None]
+        self.eps = eps
+        self.ref_n = ref_counts.sum(axis=1)
+        self.ref_p = _probs(ref_counts, self.mask, eps)
+        self.ref_cdf = np.cumsum(ref_counts / np.maximum(self.ref_n, 1)[:, None], axis=1)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, numeric: Sequence[str], categorical: Sequence[str] = (),
+                   bins: int = 10, **kwargs) -> "MoldReference":
+        features = list(numeric) + list(categorical)
+        cols, categories = [], {}
+        for col in numeric:
+            v = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float64)
+            v = v[~np.isnan(v)]
+            inner = np.unique(np.quantile(v, np.linspace(0, 1, bins + 1)[1:-1])) if v.size else np.empty(0)
+            cols.append(inner)
+        for col in categorical:
+            cats = df[col].dropna().astype(str).value_counts().index.tolist()
+            categories[col] = {c: i for i, c in enumerate(cats)}
+            cols.append(np.arange(len(cats)) + 0.5)   # 코드 0..k-1 → 구간 0..k-1, 기타(k) → 마지막 구간
+        width = max((c.size for c in cols), default=0)
+        edges = np.full((len(features), width), np.inf)
+        for i, c in enumerate(cols):
+            edges[i, :c.size] = c
+
+        ref = cls(features, edges, np.zeros((len(features), width + 1)), categories, **kwargs)
+        idx = ref.encode(df)
+        counts = np.zeros((len(features), width + 1))
+        _accumulate(counts, idx, +1)
+        return cls(features, edges, counts, categories, **kwargs)
+
+    def _row_values(self, row: Mapping) -> np.ndarray:
+        """1행 dict → (1, F) 값 (범주는 코드) — 샷마다 호출되므로 pandas 없이"""
+        vals = np.empty((1, len(self.features)))
+        for j, col in enumerate(self.features):
+            v = row.get(col)
+            if v is None or (isinstance(v, float) and v != v):
+                vals[0, j] = np.nan
+            elif col in self.categories:
+                codes = self.categories[col]
+                vals[0, j] = codes.get(str(v), len(codes))
+            else:
+                try:
+                    vals[0, j] = float(v)
+                except (TypeError, ValueError):
+                    vals[0, j] = np.nan
+        return vals
+
+    def encode(self, X) -> np.ndarray:
+        """원본 입력(1행 dict 또는 DataFrame) → (n, F) 구간 번호 (결측은 -1)"""
+        if isinstance(X, Mapping):
+            return self._bin(self._row_values(X))
+        vals = np.empty((len(X), len(self.features)))
+        for j, col in enumerate(self.features):
+            if col not in X:
+                vals[:, j] = np.nan
+            elif col in self.categories:
+                s = pd.Series(X[col], dtype=object)
+                code = s.astype(str).map(self.categories[col]).fillna(len(self.categories[col]))   # 기타
+                vals[:, j] = np.where(s.isna().to_numpy(), np.nan, code.to_numpy(dtype=np.float64))
+            else:
+                vals[:, j] = pd.to_numeric(pd.Series(X[col]), errors="coerce").to_numpy(dtype=np.float64)
+        return self._bin(vals)
+
+    def _bin(self, vals: np.ndarray) -> np.ndarray:
+        idx = (self.edges[None, :, :] <= vals[:, :, None]).sum(axis=2)
+        idx[np.isnan(vals)] = -1
+        return idx
+
+
+class MoldWindow:
+    """금형 1개의 최근 window 샷 구간 개수 (링버퍼)"""
+
+    def __init__(self, ref: MoldReference, window: int):
+        self.ref = ref
+        self.window = window
+        self.ring = np.full((window, len(ref.features)), -1, dtype=np.int16)
+        self.pos = 0
+        self.seen = 0
+        self.counts = np.zeros(ref.mask.shape)
+        self.levels = np.full(len(ref.features), -1)
+
+    def push(self, idx: np.ndarray):
+        """구간 번호 (n, F) 반영 — 빠지는 샷 -1, 들어오는 샷 +1"""
+        n = idx.shape[0]
+        if n >= self.window:
+            idx = idx[-self.window:]
+            self.counts[:] = 0
+            self.ring[:] = idx
+            self.pos = 0
+            _accumulate(self.counts, idx, +1)
+        else:
+            rows = (self.pos + np.arange(n)) % self.window
+            _accumulate(self.counts, self.ring[rows], -1)
+            _accumulate(self.counts, idx, +1)
+            self.ring[rows] = idx
+            self.pos = int((self.pos + n) % self.window)
+        self.seen += n
+
+    def metrics(self, min_count: int) -> dict:
+        """변수별 PSI / KS / JS (관측이 min_count 미만인 변수는 NaN)"""
+        ref, mask = self.ref, self.ref.mask
+        n = self.counts.sum(axis=1)
+        p_w = _probs(self.counts, mask, ref.eps)
+        p_r = ref.ref_p
+        psi = np.where(mask, (p_w - p_r) * np.log(p_w / p_r), 0.0).sum(axis=1)
+        m = 0.5 * (p_w + p_r)
+        js = np.where(mask, 0.5 * p_w * np.log2(p_w / m) + 0.5 * p_r * np.log2(p_r / m), 0.0).sum(axis=1)
+        cdf_w = np.cumsum(self.counts / np.maximum(n, 1)[:, None], axis=1)
+        ks = np.where(mask, np.abs(cdf_w - ref.ref_cdf), 0.0).max(axis=1)
+        low = n < min_count
+        return {"n": n.astype(np.int64),
+                "psi": np.where(low, np.nan, psi),
+                "ks": np.where(low, np.nan, ks),
+                "js": np.where(low, np.nan, js)}
+
+
+def _probs(counts: np.ndarray, mask: np.ndarray, eps: float) -> np.ndarray:
+    """구간 개수 → 확률 (eps 하한 후 재정규화, 사용하지 않는 칸은 1 로 채워 log 계산 안전)"""
+    n = np.maximum(counts.sum(axis=1, keepdims=True), 1)
+    p = np.where(mask, np.maximum(counts / n, eps), 0.0)
+    p = p / p.sum(axis=1, keepdims=True)
+    return np.where(mask, p, 1.0)
+
+def _accumulate(counts: np.ndarray, idx: np.ndarray, sign: int):
+    valid = idx >= 0
+    if valid.any():
+        cols = np.broadcast_to(np.arange(idx.shape[1]), idx.shape)
+        np.add.at(counts, (cols[valid], idx[valid].astype(np.intp)), sign)
+
+
+class DriftMonitor:
+    """
+    금형별 기준 분포 대비 최근 샷 드리프트 감시 (스레드 안전)
+    - observe(code, row) / observe_batch(codes, X): 채점한 샷 반영, 새 알림 목록 반환
+    - status(): 금형·변수별 현재 지표, alerts(since): 알림 이벤트
+    """
+
+    def __init__(self, references: Dict[str, MoldReference], window: int = 500, min_count: int = 250,
+                 warn_psi: float = 0.1, alert_psi: float = 0.25, max_alerts: int = 500):
+        self.references = references
+        self.window = window
+        self.min_count = min(min_count, window)
+        self.warn_psi = warn_psi
+        self.alert_psi = alert_psi
+        self._windows = {code: MoldWindow(ref, window) for code, ref in references.items()}
+        self._alerts = deque(maxlen=max_alerts)
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, numeric: Sequence[str], categorical: Sequence[str] = (),
+                   group_col: str = "mold_code", bins: int = 10, **kwargs) -> "DriftMonitor":
+        refs = {str(code): MoldReference.from_frame(g, numeric, categorical, bins=bins)
+                for code, g in df.groupby(group_col)}
+        return cls(refs, **kwargs)
+
+    # ---------- 반영 ----------
+    def observe(self, code, row: Mapping) -> list[dict]:
+        """샷 1건 반영 (기준이 없는 금형은 무시)"""
+        ref = self.references.get(str(code))
+        if ref is None:
+            return []
+        idx = ref.encode(row)
+        with self._lock:
+            return self._push(str(code), idx)
+
+    def observe_batch(self, codes, X: pd.DataFrame) -> list[dict]:
+        """여러 샷 반영 — 금형별로 묶어 한 번에 (지표·알림은 묶음 끝에서 1회 판정)"""
+        codes = np.asarray(codes, dtype=str)
+        new = []
+        for code in pd.unique(codes):
+            ref = self.references.get(code)
+            if ref is None:
+                continue
+            idx = ref.encode(X.iloc[np.flatnonzero(codes == code)])
+            with self._lock:
+                new += self._push(code, idx)
+        return new
+
+    def _level(self, psi: np.ndarray) -> np.ndarray:
+        return np.where(np.isnan(psi), -1, np.where(psi >= self.alert_psi, 2, np.where(psi >= self.warn_psi, 1, 0)))
+
+    def _push(self, code: str, idx: np.ndarray) -> list[dict]:
+        win = self._windows[code]
+        win.push(idx)
+        m = win.metrics(self.min_count)
+        levels = self._level(m["psi"])
+        new = []
+        for j in np.flatnonzero(levels != win.levels):
+            prev, cur = int(win.levels[j]), int(levels[j])
+            if cur > max(prev, 0) or (cur == 0 and prev > 0):   # 악화 또는 회복
+                self._seq += 1
+                event = {"seq": self._seq, "ts": round(time.time(), 3), "mold_code": code,
+                         "feature": win.ref.features[j], "level": cur, "status": LEVELS[cur],
+                         "psi": round(float(m["psi"][j]), 4), "ks": round(float(m["ks"][j]), 4),
+                         "js": round(float(m["js"][j]), 4), "n": int(m["n"][j])}
+                self._alerts.append(event)
+                new.append(event)
+        win.levels = levels
+        return new
+
+    # ---------- 조회 ----------
+    def status(self, code: Optional[str] = None) -> list[dict]:
+        """금형·변수별 현재 지표 (PSI 내림차순)"""
+        rows = []
+        with self._lock:
+            for c, win in self._windows.items():
+                if code is not None and c != str(code):
+                    continue
+                m = win.metrics(self.min_count)
+                for j, feat in enumerate(win.ref.features):
+                    rows.append({"mold_code": c, "feature": feat, "n": int(m["n"][j]),
+                                 "psi": _round(m["psi"][j]), "ks": _round(m["ks"][j]), "js": _round(m["js"][j]),
+                                 "status": LEVELS[int(win.levels[j])]})
+        return sorted(rows, key=lambda r: (r["psi"] is None, -(r["psi"] or 0.0)))
+
+    def alerts(self, since: int = 0, min_level: int = 0) -> list[dict]:
+        with self._lock:
+            return [a for a in self._alerts if a["seq"] > since and a["level"] >= min_level]
+
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    def snapshot(self) -> dict:
+        """JSON 직렬화 가능한 전체 상태 (진단 엔드포인트용)"""
+        return {"window": self.window, "min_count": self.min_count,
+                "thresholds": {"warn_psi": self.warn_psi, "alert_psi": self.alert_psi},
+                "seen": {c: w.seen for c, w in self._windows.items()},
+                "status": self.status(), "alerts": self.alerts()[::-1]}
+
+    def reset(self):
+        with self._lock:
+            self._windows = {code: MoldWindow(ref, self.window) for code, ref in self.references.items()}
+            self._alerts.clear()
+
+
+def _round(v, nd: int = 4):
+    return None if np.isnan(v) else round(float(v), nd)
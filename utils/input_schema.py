@@ -0,0 +1,169 @@
+# utils/input_schema.py — 금형별 파이프라인 입력 스키마 컴파일 (검증·정규화·전처리를 NumPy 버퍼에 직접)
+#
+# 파이프라인(preprocess=ColumnTransformer[StandardScaler, OneHotEncoder] → model)의
+# feature_names_in_ / 스케일러 평균·표준편차 / 인코더 범주를 한 번 읽어 두고,
+# 매 요청마다 dict → DataFrame → ColumnTransformer(열 이름·dtype 재검증) 를 거치는 대신
+# 입력값을 모델 입력 배열(전처리 결과와 같은 열 순서)에 바로 써 넣는다.
+#
+#   schema = InputSchema.from_pipeline(pipe)
+#   Xt = schema.encode({"molten_temp": 720.0, ..., "working": "가동", "tryshot_signal": "A"})  # (1, 특성)
+#   Xt = schema.encode(df, out=buf)                                                          # (n, 특성)
+#   proba = pipe.named_steps["model"].predict_proba(Xt)
+#
+# - 결과는 preprocess.transform(df) 와 같은 값 (수치: (x - mean) / scale, 범주: one-hot)
+# - 범주 값은 CATEGORY_ALIASES 로 정규화 (Y/N, True/False 등), 결측이면 첫 범주(UI 기본값)
+# - 수치 결측·비유한값, 모르는 범주는 ValueError (handle_unknown="ignore" 로 조용히 0 이 되는 것 방지)
+from typing import Mapping
+
+import numpy as np
+import pandas as pd
+
+# 범주 변수 입력 별칭 → 학습 범주
+CATEGORY_ALIASES = {
+    "working": {"Y": "가동", "N": "정지", "비가동": "정지", True: "가동", False: "정지",
+                "1": "가동", "0": "정지", "true": "가동", "false": "정지"},
+    "tryshot_signal": {True: "D", False: "A"},
+}
+
+
+class InputSchema:
+    """파이프라인 1개의 입력 레이아웃 (금형별 1회 컴파일, 이후 읽기 전용)"""
+
+    def __init__(self, columns, numeric, mean, scale, categories, feature_names):
+        self.columns = list(columns)                 # 파이프라인 원본 입력 열 (feature_names_in_)
+        self.numeric = list(numeric)                 # 수치 열 (출력 앞쪽 같은 순서)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.categories = {c: list(v) for c, v in categories.items()}   # 범주 열 → 범주 목록 (출력 순서)
+        self.feature_names = np.asarray(feature_names, dtype=object)    # get_feature_names_out()
+        self.n_features = len(self.feature_names)
+
+        # 범주 열별 출력 시작 위치
+        self._offsets, pos = {}, len(self.numeric)
+        for col, cats in self.categories.items():
+            self._offsets[col] = pos
+            pos += len(cats)
+        if pos != self.n_features:
+            raise ValueError(f"출력 특성 수 불일치: {pos} != {self.n_features}")
+        self._index = {col: {v: i for i, v in enumerate(cats)} for col, cats in self.categories.items()}
+
+    # ---------- 생성 ----------
+    @classmethod
+    def from_pipeline(cls, pipe) -> "InputSchema":
+        pre = pipe.named_steps["preprocess"]
+        columns = getattr(pipe, "feature_names_in_", None)
+        if columns is None:
+            columns = pre.feature_names_in_
+        numeric, mean, scale, categories = [], None, None, {}
+        for name, trans, cols in pre.transformers_:
+            if name == "remainder":
+                if trans != "drop" and len(cols):
+                    raise TypeError("remainder 열이 있는 전처리는 지원하지 않습니다")
+                continue
+            kind = type(trans).__name__
+            if kind == "StandardScaler" and not numeric:
+                numeric = list(cols)
+                mean = trans.mean_ if trans.with_mean else np.zeros(len(cols))
+                scale = trans.scale_ if trans.with_std else np.ones(len(cols))
+            elif kind == "OneHotEncoder" and not categories:
+                if getattr(trans, "drop_idx_", None) is not None:
+                    raise TypeError("drop 옵션이 있는 OneHotEncoder 는 지원하지 않습니다")
+                categories = {c: list(cats) for c, cats in zip(cols, trans.categories_)}
+            else:
+                raise TypeError(f"지원하지 않는 전처리 단계: {name}={kind}")
+        if set(numeric) | set(categories) != set(columns):
+            raise TypeError("전처리 대상 열이 파이프라인 입력 열과 다릅니다")
+        return cls(columns, numeric, mean, scale, categories, pre.get_feature_names_out())
+
+    # ---------- 인코딩 ----------
+    def alloc(self, n: int = 1) -> np.ndarray:
+        """모델 입력 버퍼 (재사용할 경우 encode(..., out=buf))"""
+        return np.empty((n, self.n_features), dtype=np.float64)
+
+    def normalize(self, col: str, value):
+        """범주 값 1개 → 학습 범주 (결측이면 첫 범주)"""
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            return self.categories[col][0]
+        value = CATEGORY_ALIASES.get(col, {}).get(value, value)
+        if value not in self._index[col]:
+            raise ValueError(f"{col}: 알 수 없는 값 {value!r} (허용: {self.categories[col]})")
+        return value
+
+    def encode(self, X, out: np.ndarray | None = None) -> np.ndarray:
+        """
+        원본 입력 → 모델 입력 배열 (n, n_features)
+        - X: 1행 dict(Mapping) 또는 DataFrame / 열 이름 → 배열 dict
+        - out: 미리 할당한 버퍼 (행 수가 같아야 함), 없으면 새로 할당
+        """
+        if isinstance(X, Mapping) and not isinstance(X, pd.DataFrame) \
+                and not any(isinstance(v, (np.ndarray, pd.Series, list)) for v in X.values()):
+            return self._encode_row(X, out)
+        return self._encode_batch(X, out)
+
+    def _encode_row(self, values: Mapping, out):
+        if out is None:
+            out = self.alloc(1)
+        row = out[0]
+        k = len(self.numeric)
+        for i, col in enumerate(self.numeric):
+            try:
+                row[i] = float(values[col])
+            except KeyError:
+                raise ValueError(f"{col}: 값이 없습니다")
+            except (TypeError, ValueError):
+                raise ValueError(f"{col}: 수치가 아닙니다 ({values[col]!r})")
+        if not np.isfinite(row[:k]).all():
+            bad = self.numeric[int(np.argmin(np.isfinite(row[:k])))]
+            raise ValueError(f"{bad}: 값이 없거나 유한하지 않습니다")
+        np.subtract(row[:k], self.mean, out=row[:k])
+        np.divide(row[:k], self.scale, out=row[:k])
+        row[k:] = 0.0
+        for col, off in self._offsets.items():
+            row[off + self._index[col][self.normalize(col, values.get(col))]] = 1.0
+        return out
+
+    def _encode_batch(self, X, out):
+        n = len(X) if isinstance(X, pd.DataFrame) else len(next(iter(X.values())))
+        if out is None:
+            out = self.alloc(n)
+        elif out.shape != (n, self.n_features):
+            raise ValueError(f"버퍼 크기 불일치: {out.shape} != {(n, self.n_features)}")
+        k = len(self.numeric)
+        num = out[:, :k]
+        for i, col in enumerate(self.numeric):
+            if col not in X:
+                raise ValueError(f"{col}: 열이 없습니다")
+            num[:, i] = X[col]
+        finite = np.isfinite(num)
+        if not finite.all():
+            r, c = np.argwhere(~finite)[0]
+            raise ValueError(f"{self.numeric[c]}: {r}번째 행 값이 없거나 유한하지 않습니다")
+        num -= self.mean
+        num /= self.scale
+        out[:, k:] = 0.0
+        for col, off in self._offsets.items():
+            cats = self.categories[col]
+            values = (pd.Series(np.asarray(X[col], dtype=object)) if col in X
+                      else pd.Series([cats[0]] * n, dtype=object))
+            values = values.fillna(cats[0]).map(lambda v, c=col: CATEGORY_ALIASES.get(c, {}).get(v, v))
+            codes = pd.Categorical(values, categories=cats).codes
+            if (codes < 0).any():
+                r = int(np.argmax(codes < 0))
+                raise ValueError(f"{col}: {r}번째 행 알 수 없는 값 {values.iloc[r]!r} (허용: {cats})")
+            out[np.arange(n), off + codes] = 1.0
+        return out
+
+    def frame(self, Xt: np.ndarray) -> pd.DataFrame:
+        """모델 입력 배열 → 전처리 변수명 DataFrame (복사 없이, SHAP 설명용)"""
+        return pd.DataFrame(Xt, columns=self.feature_names, copy=False)
+
+
+def compile_schemas(models: dict) -> dict:
+    """금형별 파이프라인 dict → 금형별 InputSchema (지원하지 않는 전처리는 제외 → 기존 파이프라인 경로)"""
+    out = {}
+    for code, pipe in models.items():
+        try:
+            out[code] = InputSchema.from_pipeline(pipe)
+        except (TypeError, KeyError, AttributeError, ValueError) as e:
+            print(f"[schema] skip mold {code}: {e}")
+    return out
@@ -0,0 +1,96 @@
+# utils/profile_utils.py — 데이터셋 프로파일(기술통계·결측·타입·카디널리티) 스냅샷
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+PROFILE_FORMAT = 1
+NUMERIC_DTYPES = {"int64", "float64"}
+CATEGORICAL_DTYPES = {"object", "category", "string", "str"}
+_STAT_KEYS = ["count", "mean", "std", "min", "25%", "50%", "75%", "max"]
+
+
+def data_version(path: str | Path) -> str:
+    """파일 이름·크기·수정시각 기반 데이터 버전 (내용 스캔 없음)"""
+    p = Path(path)
+    st = p.stat()
+    raw = f"{p.name}|{st.st_size}|{st.st_mtime_ns}|{PROFILE_FORMAT}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+def _num(v) -> Optional[float]:
+    return None if v is None or pd.isna(v) else float(v)
+
+def build_profile(df: pd.DataFrame, version: str = "") -> Dict[str, Any]:
+    """DataFrame 1회 스캔으로 열별 dtype·count·결측·고유값 수·분위수를 계산"""
+    missing = df.isnull().sum()
+    nunique = df.nunique(dropna=True)
+    num_cols = [c for c in df.columns if str(df[c].dtype) in NUMERIC_DTYPES]
+    desc = df[num_cols].describe().T if num_cols else pd.DataFrame()
+
+    columns = {}
+    for col in df.columns:
+        info = {
+            "dtype": str(df[col].dtype),
+            "count": int(len(df) - missing[col]),
+            "missing": int(missing[col]),
+            "nunique": int(nunique[col]),
+        }
+        if col in desc.index:
+            info["stats"] = {k: _num(desc.at[col, k]) for k in _STAT_KEYS}
+        columns[str(col)] = info
+
+    return {
+        "format": PROFILE_FORMAT,
+        "version": version,
+        "n_rows": int(len(df)),
+        "n_cols": int(df.shape[1]),
+        "columns": columns,
+    }
+
+def load_or_build_profile(csv_path: str | Path,
+                          df: Optional[pd.DataFrame] = None,
+                          out_dir: Optional[str | Path] = None) -> Dict[str, Any]:
+    """
+    data/profiles/<파일명>_<버전>.json 이 있으면 읽고, 없으면 만들어 저장
+    - df가 주어지면 재사용(이미 로드된 데이터), 아니면 csv를 읽어 생성
+    """
+    csv_path = Path(csv_path)
+    version = data_version(csv_path)
+    out_dir = Path(out_dir) if out_dir else csv_path.parent / "profiles"
+    out = out_dir / f"{csv_path.stem}_{version}.json"
+    if out.exists():
+        try:
+            with open(out, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            print("[profile] read error, rebuilding:", e)
+
+    frame = df if df is not None else pd.read_csv(csv_path)
+    profile = build_profile(frame, version=version)
+    try:
+        out_dir.mkdir(parents=True, exist_ok=True)
+        tmp = out.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(profile, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, out)
+    except OSError as e:
+        print("[profile] write error:", e)
+    return profile
+
+# ===== 프로파일 조회 헬퍼 =====
+def profile_columns(profile: Dict[str, Any], dtypes: set) -> list[str]:
+    return [c for c, info in profile["columns"].items() if info["dtype"] in dtypes]
+
+def profile_numeric_stats(profile: Dict[str, Any], exclude=("passorfail",)) -> pd.DataFrame:
+    """df[num].describe().T + 결측치 열과 같은 형태의 표"""
+    rows = {c: {**profile["columns"][c]["stats"], "결측치": profile["columns"][c]["missing"]}
+            for c in profile_columns(profile, NUMERIC_DTYPES)
+            if c not in exclude and "stats" in profile["columns"][c]}
+    if not rows:
+        return pd.DataFrame()
+    out = pd.DataFrame.from_dict(rows, orient="index")[_STAT_KEYS + ["결측치"]]
+    return out.astype({k: np.float64 for k in _STAT_KEYS})
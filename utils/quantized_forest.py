@@ -0,0 +1,167 @@
+# utils/quantized_forest.py — 분할 임계값 기반 정수 구간화 + 정수 코드 트리 추론
+#
+# 특성 f 의 임계값 집합(모든 트리의 합집합) T_f 를 정렬하면
+#   x ≤ T_f[j]  ⇔  code(x) ≤ j     (code(x) = T_f 중 x 보다 작은 값의 개수)
+# 이므로 트리의 모든 float 비교를 uint8/uint16 코드 비교로 바꿔도 예측이 같다.
+# 원본 입력 → 코드 변환은 특성당 1회(searchsorted), 이후 노드 비교는 정수만 사용.
+#
+# 서빙: 행 수가 적을 때(MAX_ROWS 이하)만 sklearn 보다 빠름 — 1행 ~0.35ms vs ~22ms(300트리, 스키마 인코딩 입력)
+#       대량 배치는 sklearn 의 컴파일된 순회가 빠르므로 service_predict 가 행 수로 골라 사용
+import os
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+TREE_LEAF = -1
+MAX_ROWS = int(os.environ.get("DIECAST_QUANTIZED_MAX_ROWS", 128))
+
+
+class QuantizedForest:
+    """
+    RandomForest/ExtraTrees 분류 파이프라인(preprocess → model)의 정수 추론 표현
+    - encode(X_raw): 원본 DataFrame → (n × 특성) 정수 코드 (uint8, 구간이 많으면 uint16)
+    - predict_proba(X_raw 또는 codes): 모든 트리를 깊이 단위로 동시에 진행하는 배치 평가
+    - raw_edges: 수치형 특성의 임계값을 원본 단위로 되돌린 값 (확인/설명용)
+    """
+
+    def __init__(self, preprocess, feature_names, thresholds, nodes, tree_roots, classes, max_depth):
+        self.preprocess = preprocess
+        self.feature_names = list(feature_names)
+        self.thresholds = thresholds            # 특성별 정렬된 임계값 (float64)
+        self.feature, self.thr_code, self.left, self.right, self.value = nodes
+        self.tree_roots = tree_roots
+        self.classes_ = classes
+        self.max_depth = max_depth
+        n_bins = max((t.size + 1 for t in thresholds), default=1)
+        self.code_dtype = np.uint8 if n_bins <= np.iinfo(np.uint8).max else np.uint16
+        self.raw_edges = self._raw_edges()
+
+        # 순회용 압축 배열: (특성 << 16 | 임계 코드) 1회 조회 + [오른쪽, 왼쪽] 자식 표 1회 조회
+        # 잎은 자기 자신을 가리키게 해 깊이가 다른 트리도 같은 반복 횟수로 진행
+        ids = np.arange(self.left.size, dtype=np.int32)
+        leaf = self.left == TREE_LEAF
+        self._packed = (self.feature.astype(np.int64) << 16) | self.thr_code.astype(np.int64)
+        self._child = np.stack([np.where(leaf, ids, self.right),
+                                np.where(leaf, ids, self.left)], axis=1).astype(np.int32).ravel()
+
+    # ---------- 생성 ----------
+    @classmethod
+    def from_pipeline(cls, pipe) -> "QuantizedForest":
+        preprocess, forest = pipe.named_steps["preprocess"], pipe.named_steps["model"]
+        if not hasattr(forest, "estimators_") or not hasattr(forest.estimators_[0], "tree_"):
+            raise TypeError(f"{type(forest).__name__}: 결정트리 앙상블(RandomForest 등)만 지원합니다.")
+        names = preprocess.get_feature_names_out()
+        trees = [est.tree_ for est in forest.estimators_]
+
+        thresholds = []
+        for f in range(len(names)):
+            vals = [t.threshold[(t.feature == f) & (t.children_left != TREE_LEAF)] for t in trees]
+            thresholds.append(np.unique(np.concatenate(vals)) if vals else np.empty(0))
+
+        pos = list(forest.classes_).index(1) if 1 in list(forest.classes_) else forest.classes_.size - 1
+        feat, code, left, right, value, roots = [], [], [], [], [], []
+        offset = 0
+        for t in trees:
+            internal = t.children_left != TREE_LEAF
+            f = np.where(internal, t.feature, 0)
+            c = np.zeros(t.node_count, dtype=np.int64)
+            for fi in np.unique(f[internal]):
+                m = internal & (f == fi)
+                c[m] = np.searchsorted(thresholds[fi], t.threshold[m], side="left")
+            v = t.value[:, 0, :]
+            v = v / np.maximum(v.sum(axis=1, keepdims=True), 1e-12)   # 구버전(개수 저장) 호환
+            feat.append(f)
+            code.append(c)
+            left.append(np.where(internal, t.children_left + offset, TREE_LEAF))
+            right.append(np.where(internal, t.children_right + offset, TREE_LEAF))
+            value.append(v[:, pos])
+            roots.append(offset)
+            offset += t.node_count
+
+        n_bins = max((th.size + 1 for th in thresholds), default=1)
+        if n_bins > np.iinfo(np.uint16).max + 1:
+            raise ValueError(f"특성당 구간 수 {n_bins} > 65536: uint16 코드로 표현할 수 없습니다.")
+        code_t = np.uint8 if n_bins <= np.iinfo(np.uint8).max else np.uint16
+        nodes = (
+            np.concatenate(feat).astype(np.int32),
+            np.concatenate(code).astype(code_t),
+            np.concatenate(left).astype(np.int32),
+            np.concatenate(right).astype(np.int32),
+            np.concatenate(value).astype(np.float64),
+        )
+        return cls(preprocess, names, thresholds, nodes, np.asarray(roots, dtype=np.int32),
+                   forest.classes_, max(t.max_depth for t in trees))
+
+    # ---------- 구간화 ----------
+    def _num_transformer(self):
+        for name, trans, cols in getattr(self.preprocess, "transformers_", []):
+            if name == "num":
+                return trans, list(cols)
+        return None, []
+
+    def _raw_edges(self) -> Dict[str, np.ndarray]:
+        """수치형 임계값을 원본 단위로 (StandardScaler 역변환)"""
+        trans, cols = self._num_transformer()
+        out = {}
+        for j, col in enumerate(cols):
+            f = self.feature_names.index(f"num__{col}") if f"num__{col}" in self.feature_names else None
+            if f is None:
+                continue
+            thr = self.thresholds[f]
+            if hasattr(trans, "scale_") and trans.scale_ is not None:
+                thr = thr * trans.scale_[j] + (trans.mean_[j] if trans.mean_ is not None else 0.0)
+            out[col] = thr
+        return out
+
+    def encode(self, X: pd.DataFrame) -> np.ndarray:
+        """
+        원본 입력 → 정수 코드
+        - 전처리 결과를 트리와 같은 float32로 맞춘 뒤 특성별 searchsorted (트리 비교와 정확히 일치)
+        """
+        Xt = self.preprocess.transform(X)
+        return self.encode_transformed(Xt.toarray() if hasattr(Xt, "toarray") else Xt)
+
+    def encode_transformed(self, Xt: np.ndarray) -> np.ndarray:
+        """전처리 결과(모델 입력 배열, 예: InputSchema.encode) → 정수 코드"""
+        Xt = np.asarray(Xt, dtype=np.float32)
+        codes = np.empty(Xt.shape, dtype=self.code_dtype)
+        for f, thr in enumerate(self.thresholds):
+            codes[:, f] = np.searchsorted(thr, Xt[:, f].astype(np.float64), side="left")
+        return codes
+
+    # ---------- 추론 ----------
+    def predict_proba(self, X, codes: Optional[np.ndarray] = None, chunk_size: int = 1024) -> np.ndarray:
+        """(n × 2) 확률 — X 대신 encode() 결과를 codes 로 넘기면 구간화 생략"""
+        C = self.encode(X) if codes is None else codes
+        p1 = np.empty(C.shape[0])
+        for s in range(0, C.shape[0], chunk_size):       # 행 묶음 단위로 캐시 안에서 순회
+            Cc = np.ascontiguousarray(C[s:s + chunk_size], dtype=np.int32)
+            n = Cc.shape[0]
+            flat = Cc.ravel()
+            base = (np.arange(n, dtype=np.int64) * Cc.shape[1])[:, None]
+            idx = np.broadcast_to(self.tree_roots, (n, self.tree_roots.size)).copy()
+            for _ in range(self.max_depth):
+                v = self._packed[idx]
+                go_left = flat[base + (v >> 16)] <= (v & 0xFFFF)
+                idx = self._child[idx * 2 + go_left]
+            p1[s:s + n] = self.value[idx].mean(axis=1)
+        return np.column_stack([1.0 - p1, p1])
+
+    def predict(self, X, codes: Optional[np.ndarray] = None) -> np.ndarray:
+        return (self.predict_proba(X, codes)[:, 1] >= 0.5).astype(int)
+
+    def nbytes(self) -> int:
+        arrays = [self.feature, self.thr_code, self.left, self.right, self.value, *self.thresholds]
+        return int(sum(a.nbytes for a in arrays))
+
+
+def quantize_models(models: dict) -> dict:
+    """금형별 파이프라인 dict → 금형별 QuantizedForest (지원하지 않는 모델은 제외)"""
+    out = {}
+    for code, pipe in models.items():
+        try:
+            out[code] = QuantizedForest.from_pipeline(pipe)
+        except (TypeError, KeyError, AttributeError) as e:
+            print(f"[quantize] skip mold {code}: {e}")
+    return out
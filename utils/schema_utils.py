@@ -1,29 +1,142 @@
-# utils/schema_utils.py
+# utils/schema_utils.py — CSV → 입력 위젯 스키마 (page_input 슬라이더/선택 상자 사양)
+#
+# CSV 를 청크 단위로 한 번만 읽으며 열별 요약을 누적 → 전체를 메모리에 올리지 않음 (수 GB 이력도 가능)
+#   - 고유값 수: exact_cap 개까지 정확(해시 집합), 넘으면 HyperLogLog 추정
+#   - 상위 빈도 값: 누적 빈도 상위 topk_cap 개 유지 (고유값이 topk_cap 이하이면 빈도까지 정확)
+#   - 분위수(p1·중앙값·p99): KLL 스케치
+#   - 정수 여부: 청크별 np.allclose(v, round(v)) 누적
 import pandas as pd
 import numpy as np
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+from utils.sketch_utils import HyperLogLog, KllSketch, TopK, hash_values
+
+FORCE_CAT = {"mold_code"}
+LOW_CARD_K = 5
+
+
+class ColumnProfiler:
+    """열 1개의 청크 누적 요약"""
+
+    def __init__(self, name: str, exact_cap: int = 10000, topk_cap: int = 1000, kll_k: int = 1000):
+        self.name = name
+        self.exact_cap = exact_cap
+        self.count = 0
+        self.missing = 0
+        self.numeric = True          # 모든 청크가 수치형 dtype 이었는지 (= 전체 로드 시 수치형)
+        self.any_float = False       # 한 청크라도 실수형이면 전체 로드 시 float (정수 열 + 결측)
+        self.is_integer = True
+        self.hashes = np.empty(0, dtype=np.uint64)   # 정확 집계 구간의 고유값 해시
+        self.hll: Optional[HyperLogLog] = None
+        self.topk: Optional[TopK] = TopK(topk_cap)
+        self.kll: Optional[KllSketch] = KllSketch(kll_k)
+
+    def update(self, s: pd.Series) -> "ColumnProfiler":
+        na = s.isna().to_numpy()
+        self.count += int(len(s) - na.sum())
+        self.missing += int(na.sum())
+
+        if self.numeric and not pd.api.types.is_numeric_dtype(s):
+            self.numeric, self.kll = False, None
+        if self.numeric:
+            self.any_float |= pd.api.types.is_float_dtype(s)
+            v = s.to_numpy(dtype=np.float64, na_value=np.nan)[~na]
+            if v.size:
+                self.kll.update(v)
+                if self.is_integer and not np.allclose(v, v.round()):
+                    self.is_integer = False
+
+        # 고유값 수 (결측 제외) — 수치 열은 float64 로 해시해 정수/실수 청크가 섞여도 같은 값은 같은 해시
+        h = np.unique(hash_values(v) if self.numeric else hash_values(s.to_numpy()[~na]))
+        if self.hll is None:
+            self.hashes = np.union1d(self.hashes, h)
+            if self.hashes.size > self.exact_cap:
+                self.hll = HyperLogLog().update_hashes(self.hashes)
+                self.hashes = np.empty(0, dtype=np.uint64)
+        else:
+            self.hll.update_hashes(h)
+
+        # 상위 빈도 값 — 고유값이 많은 수치 열은 슬라이더로 가므로 집계 중단
+        if self.topk is not None:
+            if self.numeric and self.hll is not None:
+                self.topk = None
+            else:
+                counts = s.value_counts(dropna=False)
+                cap = self.topk.capacity
+                if len(counts) > cap:   # 청크 자체가 용량 초과 → 빈도 상위 cap 개만 원래 빈도로 (빈도는 하한)
+                    counts = counts.iloc[:cap]
+                    self.topk.exact = False
+                self.topk.update_counts(counts)
+        return self
+
+    @property
+    def nunique(self) -> int:
+        return int(self.hashes.size) if self.hll is None else int(round(self.hll.estimate()))
+
+    def _label(self, v) -> str:
+        """전체 로드 후 astype(str) 과 같은 표기"""
+        if v is None or (isinstance(v, float) and np.isnan(v)):
+            return "NaN"
+        if self.numeric and self.any_float:
+            return str(float(v))
+        return str(v)
+
+    def result(self, top: int = 30) -> Dict[str, Any]:
+        out = {
+            "name": self.name,
+            "numeric": self.numeric,
+            "count": self.count,
+            "missing": self.missing,
+            "nunique": self.nunique,
+            "nunique_exact": self.hll is None,
+        }
+        if self.topk is not None:
+            out["top"] = [(self._label(v), c) for v, c in self.topk.top(top)]
+            out["top_exact"] = self.topk.exact
+        if self.numeric and self.kll is not None and self.kll.n:
+            q01, q50, q99 = self.kll.quantile([0.01, 0.5, 0.99])
+            out.update(q01=float(q01), q50=float(q50), q99=float(q99), is_integer=self.is_integer)
+        return out
+
+
+def profile_csv(csv_path: str | Path,
+                chunksize: int = 200_000,
+                exclude=("passorfail",),
+                top: int = 30,
+                **profiler_kwargs) -> Dict[str, Dict[str, Any]]:
+    """CSV 1회 청크 스캔 → {열: 요약} (ColumnProfiler.result 형식)"""
+    profilers: Dict[str, ColumnProfiler] = {}
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize, usecols=lambda c: c not in exclude):
+        for col in chunk.columns:
+            if col not in profilers:
+                profilers[col] = ColumnProfiler(col, **profiler_kwargs)
+            profilers[col].update(chunk[col])
+    return {col: p.result(top) for col, p in profilers.items()}
+
 
 def build_schema_from_csv(csv_path: str | Path,
                           max_cat_choices: int = 30,
-                          mold_topk: int = 5) -> Dict[str, Any]:
-    df = pd.read_csv(csv_path)
-    if "passorfail" in df.columns:
-        df = df.drop(columns=["passorfail"])
+                          mold_topk: int = 5,
+                          chunksize: int = 200_000,
+                          exact_cap: int = 10000) -> Dict[str, Any]:
+    """
+    CSV → {"num_specs": [...], "cat_specs": [...]}
+    - 범주형(mold_code·문자열·고유값 LOW_CARD_K 이하 수치) → 빈도순 선택지
+    - 수치형 → p1~p99 범위 슬라이더, 기본값 중앙값, 정수 열이면 step 1
+    """
+    profiles = profile_csv(csv_path, chunksize=chunksize, top=max(max_cat_choices, mold_topk),
+                           exact_cap=exact_cap)
 
     schema = {"num_specs": [], "cat_specs": []}
-    FORCE_CAT = {"mold_code"}
-    LOW_CARD_K = 5
-
-    for col in df.columns:
-        s = df[col]
+    for col, prof in profiles.items():
         is_force_cat = col in FORCE_CAT
-        nunq = s.nunique(dropna=True)
-        is_low_card_num = (pd.api.types.is_numeric_dtype(s) and nunq <= LOW_CARD_K)
+        is_low_card_num = prof["numeric"] and prof["nunique"] <= LOW_CARD_K
 
-        if is_force_cat or (not pd.api.types.is_numeric_dtype(s)) or is_low_card_num:
-            vals = (s.astype(str).fillna("NaN").replace({"nan":"NaN"})
-                      .value_counts(dropna=False).index.tolist())
+        if is_force_cat or (not prof["numeric"]) or is_low_card_num:
+            vals = [v for v, _ in prof.get("top", [])]
+            if not vals:
+                continue
             choices = vals[:max_cat_choices]
             if col == "mold_code":
                 choices = vals[:mold_topk] + ["Other"]
@@ -33,12 +146,11 @@ def build_schema_from_csv(csv_path: str | Path,
                 "default": str(choices[0]),
             })
         else:
-            s_num = pd.to_numeric(s, errors="coerce")
-            if s_num.dropna().empty: continue
-            p1, p99 = float(s_num.quantile(0.01)), float(s_num.quantile(0.99))
+            if "q50" not in prof: continue
+            p1, p99 = prof["q01"], prof["q99"]
             lo, hi = (p1, p99) if p1 < p99 else (p99, p1)
-            mid = float(s_num.median())
-            step = 1.0 if np.allclose(s_num.dropna(), s_num.dropna().round()) else 0.1
+            mid = prof["q50"]
+            step = 1.0 if prof["is_integer"] else 0.1
             schema["num_specs"].append({
                 "name": col, "min": lo, "max": hi, "step": step,
                 "default": float(np.clip(mid, lo, hi)),
@@ -0,0 +1,250 @@
+# utils/sketch_utils.py — 대용량 분포 시각화·스키마 추론용 근사 스케치 (분위수 KLL + 고정 구간 히스토그램 + HLL + 상위 k)
+import math
+from typing import Dict, Hashable, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+
+class KllSketch:
+    """
+    KLL 분위수 스케치 (근사 오차 ~ 1.7/k 수준)
+    - 레벨 h의 원소는 가중치 2^h, 레벨이 용량을 넘으면 정렬 후 절반만 상위 레벨로 승격
+    - update()는 배치 단위 NumPy 연산, merge()로 청크/프로세스별 스케치 결합 가능
+    """
+
+    def __init__(self, k: int = 200, seed: int = 0):
+        self.k = k
+        self.levels: list[np.ndarray] = [np.empty(0)]
+        self.n = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._rs = np.random.RandomState(seed)
+
+    def _capacity(self, h: int) -> int:
+        depth = len(self.levels) - 1 - h
+        return max(2, int(math.ceil(self.k * (2.0 / 3.0) ** depth)))
+
+    def _compress(self):
+        while True:
+            over = [h for h, lvl in enumerate(self.levels) if lvl.size > self._capacity(h)]
+            if not over:
+                return
+            h = over[0]
+            if h + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            lvl = np.sort(self.levels[h])
+            keep = lvl[-1:] if lvl.size % 2 else lvl[:0]   # 홀수면 1개는 현재 레벨에 남김
+            pair = lvl[:-1] if lvl.size % 2 else lvl
+            promoted = pair[self._rs.randint(2)::2]
+            self.levels[h] = keep
+            self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+
+    def update(self, values) -> "KllSketch":
+        v = np.asarray(values, dtype=np.float64).ravel()
+        v = v[~np.isnan(v)]
+        if v.size == 0:
+            return self
+        self.n += v.size
+        self.min = min(self.min, float(v.min()))
+        self.max = max(self.max, float(v.max()))
+        self.levels[0] = np.concatenate([self.levels[0], v])
+        self._compress()
+        return self
+
+    def merge(self, other: "KllSketch") -> "KllSketch":
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, lvl in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], lvl])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def quantile(self, q):
+        """q(스칼라/배열, 0~1)에 해당하는 근사 분위수"""
+        qs = np.atleast_1d(np.asarray(q, dtype=np.float64))
+        if self.n == 0:
+            out = np.full(qs.shape, np.nan)
+        else:
+            items = np.concatenate(self.levels)
+            weights = np.concatenate([np.full(l.size, 2.0 ** h) for h, l in enumerate(self.levels)])
+            order = np.argsort(items, kind="stable")
+            items, cum = items[order], np.cumsum(weights[order])
+            pos = np.searchsorted(cum, qs * cum[-1], side="left").clip(0, items.size - 1)
+            out = items[pos]
+            out = np.where(qs <= 0, self.min, np.where(qs >= 1, self.max, out))
+        return float(out[0]) if np.ndim(q) == 0 else out
+
+
+def hash_values(values) -> np.ndarray:
+    """값 배열 → uint64 해시 (결측 포함, 같은 값은 청크가 달라도 같은 해시)"""
+    arr = np.asarray(values)
+    if arr.dtype.kind not in "fiub":
+        arr = arr.astype(object)
+    return pd.util.hash_array(arr, categorize=True)
+
+
+def _bit_length(x: np.ndarray) -> np.ndarray:
+    """uint64 배열의 비트 길이 (0 → 0), 시프트 이분 탐색 6단계"""
+    x = x.astype(np.uint64, copy=True)
+    n = np.zeros(x.shape, dtype=np.int64)
+    for s in (32, 16, 8, 4, 2, 1):
+        hi = x >> np.uint64(s)
+        m = hi != 0
+        n[m] += s
+        x[m] = hi[m]
+    return n + (x != 0)
+
+
+class HyperLogLog:
+    """
+    HyperLogLog 고유값 수 추정 (상대 오차 ~ 1.04/sqrt(2^p), p=12 → 약 1.6%)
+    - update_hashes()는 hash_values() 결과를 배치로 반영, merge()로 결합
+    """
+
+    def __init__(self, p: int = 12):
+        self.p = p
+        self.m = 1 << p
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def update_hashes(self, hashes) -> "HyperLogLog":
+        h = np.asarray(hashes, dtype=np.uint64)
+        if h.size == 0:
+            return self
+        idx = (h >> np.uint64(64 - self.p)).astype(np.intp)
+        rest = h & np.uint64((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - _bit_length(rest) + 1
+        np.maximum.at(self.registers, idx, rank.astype(np.uint8))
+        return self
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self) -> float:
+        m = float(self.m)
+        alpha = 0.7213 / (1.0 + 1.079 / m)
+        est = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = int((self.registers == 0).sum())
+        if est <= 2.5 * m and zeros:
+            est = m * math.log(m / zeros)   # 작은 값 구간: linear counting
+        return float(est)
+
+
+class TopK:
+    """
+    빈도 상위 값 (용량 capacity) — 고유값이 capacity 이하이면 빈도까지 정확
+    - update_counts()는 청크별 value_counts 결과를 반영, 용량을 넘으면 누적 빈도 상위만 남김
+    """
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity
+        self.counts: Dict[Hashable, int] = {}
+        self.exact = True
+
+    def update_counts(self, counts: pd.Series) -> "TopK":
+        for key, c in counts.items():
+            self.counts[key] = self.counts.get(key, 0) + int(c)
+        if len(self.counts) > self.capacity:
+            # 누적 빈도 상위 capacity 개만 원래 빈도로 유지 (빈도 차감 없음 → 모든 값이 고유한 열도 비지 않음)
+            # 안정 정렬이라 동률은 먼저 본 값 우선 = 전체 로드 value_counts 순서와 같음
+            items = sorted(self.counts.items(), key=lambda kv: -kv[1])
+            self.counts = dict(items[:self.capacity])
+            self.exact = False
+        return self
+
+    def top(self, k: Optional[int] = None) -> list[tuple[Hashable, int]]:
+        """(값, 빈도) 빈도 내림차순 (exact=False 면 빈도는 하한)"""
+        items = sorted(self.counts.items(), key=lambda kv: -kv[1])
+        return items if k is None else items[:k]
+
+
+class FixedHistogram:
+    """고정 구간 히스토그램 (범위 밖 값은 under/over 로 별도 집계)"""
+
+    def __init__(self, lo: float, hi: float, bins: int = 50):
+        if not hi > lo:
+            hi = lo + 1.0
+        self.edges = np.linspace(lo, hi, bins + 1)
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.under = 0
+        self.over = 0
+
+    def update(self, values) -> "FixedHistogram":
+        v = np.asarray(values, dtype=np.float64).ravel()
+        v = v[~np.isnan(v)]
+        lo, hi = self.edges[0], self.edges[-1]
+        self.under += int((v < lo).sum())
+        self.over += int((v > hi).sum())
+        inside = v[(v >= lo) & (v <= hi)]
+        idx = np.searchsorted(self.edges, inside, side="right") - 1
+        idx = idx.clip(0, self.counts.size - 1)   # hi 값은 마지막 구간에 포함
+        self.counts += np.bincount(idx, minlength=self.counts.size)
+        return self
+
+
+class GroupedDistSketch:
+    """
+    그룹(합/불, 금형코드 등)별 KLL + 히스토그램을 청크 단위로 누적
+    - 히스토그램 구간은 모든 그룹이 공유 (lo/hi 지정, 없으면 첫 청크 범위)
+    - 첫 청크 범위로 잡히면 이후 범위 밖 값은 under/over 로만 집계되므로 전체 범위를 알면 lo/hi 를 넘길 것
+    """
+
+    def __init__(self, bins: int = 50, k: int = 200, lo: Optional[float] = None, hi: Optional[float] = None):
+        self.bins = bins
+        self.k = k
+        self.lo, self.hi = lo, hi
+        self.quantiles: Dict[Hashable, KllSketch] = {}
+        self.hists: Dict[Hashable, FixedHistogram] = {}
+
+    def update(self, values, groups) -> "GroupedDistSketch":
+        v = pd.to_numeric(pd.Series(np.asarray(values)), errors="coerce").to_numpy(dtype=np.float64)
+        g = np.asarray(groups)
+        if self.lo is None or self.hi is None:
+            finite = v[~np.isnan(v)]
+            if finite.size == 0:
+                return self
+            self.lo = float(finite.min()) if self.lo is None else self.lo
+            self.hi = float(finite.max()) if self.hi is None else self.hi
+        codes, uniques = pd.factorize(pd.Series(g), use_na_sentinel=False)
+        for ci, key in enumerate(uniques):
+            part = v[codes == ci]
+            if key not in self.quantiles:
+                self.quantiles[key] = KllSketch(self.k, seed=len(self.quantiles))
+                self.hists[key] = FixedHistogram(self.lo, self.hi, self.bins)
+            self.quantiles[key].update(part)
+            self.hists[key].update(part)
+        return self
+
+    def box_stats(self, keys: Optional[Iterable[Hashable]] = None, whis: float = 1.5) -> list[dict]:
+        """matplotlib Axes.bxp 입력 형식 (이상치 점은 생략)"""
+        out = []
+        for key in (keys if keys is not None else self.quantiles.keys()):
+            sk = self.quantiles.get(key)
+            if sk is None or sk.n == 0:
+                continue
+            q1, med, q3 = sk.quantile([0.25, 0.5, 0.75])
+            iqr = q3 - q1
+            out.append({
+                "label": key, "med": med, "q1": q1, "q3": q3,
+                "whislo": max(sk.min, q1 - whis * iqr),
+                "whishi": min(sk.max, q3 + whis * iqr),
+                "fliers": [],
+            })
+        return out
+
+
+def stratified_sample(df: pd.DataFrame, keep_mask, max_rows: int = 20000, seed: int = 0) -> pd.DataFrame:
+    """keep_mask 행(예: 불량 샷)은 전부 유지하고 나머지를 max_rows 까지 무작위 추출"""
+    keep_mask = np.asarray(keep_mask, dtype=bool)
+    if len(df) <= max_rows:
+        return df
+    rest = np.flatnonzero(~keep_mask)
+    n_rest = max(0, max_rows - int(keep_mask.sum()))
+    rs = np.random.RandomState(seed)
+    picked = rs.choice(rest, size=min(n_rest, rest.size), replace=False) if n_rest > 0 else rest[:0]
+    rows = np.sort(np.concatenate([np.flatnonzero(keep_mask), picked]))
+    return df.iloc[rows]
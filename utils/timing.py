@@ -0,0 +1,141 @@
+# utils/timing.py — 핫패스 구간(span) 계측: 컨텍스트 매니저/데코레이터 + 프로세스 내 링버퍼·히스토그램
+#
+#   with span("predict.shap"):          # 구간 이름은 "<영역>.<단계>"
+#       explainer(X)
+#
+#   @timed("viz.failrate_cutoff")
+#   def plot_...(...): ...
+#
+# - 최근 RING_SIZE 개 기록은 링버퍼(분위수 계산용), 구간별 누적 히스토그램은 재시작 전까지 유지
+# - 중첩된 span 은 바깥 구간 이름을 parent 로 기록 (한 번의 클릭 안에서 어느 단계가 느린지 구분)
+# - DIECAST_TIMING=0 이면 기록하지 않음
+import functools
+import os
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+import numpy as np
+
+ENABLED = os.environ.get("DIECAST_TIMING", "1") != "0"
+RING_SIZE = int(os.environ.get("DIECAST_TIMING_RING", "4096"))
+# 히스토그램 상한(ms) — 마지막 구간은 그 이상 전부
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+_CURRENT: ContextVar[str | None] = ContextVar("diecast_span", default=None)
+
+
+class TimingRegistry:
+    """구간별 소요 시간 저장소 (스레드 안전)"""
+
+    def __init__(self, ring_size: int = RING_SIZE, buckets_ms=BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self._ring = deque(maxlen=ring_size)
+        self._stages: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def record(self, name: str, ms: float, ok: bool = True, parent: str | None = None):
+        b = int(np.searchsorted(self.buckets_ms, ms, side="left"))
+        with self._lock:
+            self._ring.append((time.time(), name, ms, ok, parent))
+            st = self._stages.get(name)
+            if st is None:
+                st = self._stages[name] = {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0,
+                                           "hist": [0] * (len(self.buckets_ms) + 1)}
+            st["count"] += 1
+            st["errors"] += 0 if ok else 1
+            st["total_ms"] += ms
+            st["max_ms"] = max(st["max_ms"], ms)
+            st["hist"][b] += 1
+
+    def recent(self, n: int = 50, name: str | None = None) -> list[dict]:
+        with self._lock:
+            rows = list(self._ring)
+        if name is not None:
+            rows = [r for r in rows if r[1] == name]
+        return [{"ts": round(ts, 3), "name": nm, "ms": round(ms, 3), "ok": ok, "parent": parent}
+                for ts, nm, ms, ok, parent in rows[-n:][::-1]]
+
+    def summary(self) -> dict:
+        """구간별 누적 통계 + 링버퍼 기준 p50/p95/p99"""
+        with self._lock:
+            rows = list(self._ring)
+            stages = {k: dict(v, hist=list(v["hist"])) for k, v in self._stages.items()}
+        by_name: dict[str, list] = {}
+        for _, name, ms, _, _ in rows:
+            by_name.setdefault(name, []).append(ms)
+        out = {}
+        for name, st in sorted(stages.items()):
+            recent = np.asarray(by_name.get(name, []))
+            out[name] = {
+                "count": st["count"],
+                "errors": st["errors"],
+                "mean_ms": round(st["total_ms"] / max(st["count"], 1), 3),
+                "max_ms": round(st["max_ms"], 3),
+                **{f"p{q}_ms": (round(float(np.percentile(recent, q)), 3) if recent.size else None)
+                   for q in (50, 95, 99)},
+                "hist": st["hist"],
+            }
+        return out
+
+    def snapshot(self, recent: int = 100) -> dict:
+        """JSON 직렬화 가능한 전체 상태 (진단 엔드포인트용)"""
+        return {
+            "enabled": ENABLED,
+            "started_at": round(self.started_at, 3),
+            "now": round(time.time(), 3),
+            "ring_size": self._ring.maxlen,
+            "buckets_ms": list(self.buckets_ms),
+            "stages": self.summary(),
+            "recent": self.recent(recent),
+        }
+
+    def reset(self):
+        with self._lock:
+            self._ring.clear()
+            self._stages.clear()
+            self.started_at = time.time()
+
+
+REGISTRY = TimingRegistry()
+
+
+class span:
+    """
+    구간 계측 — 컨텍스트 매니저와 데코레이터 둘 다 지원
+    - 예외가 나도 기록 (ok=False), 예외는 그대로 전파
+    """
+
+    def __init__(self, name: str, registry: TimingRegistry | None = None):
+        self.name = name
+        self.registry = registry or REGISTRY
+
+    def __enter__(self):
+        if ENABLED:
+            self._parent = _CURRENT.get()
+            self._token = _CURRENT.set(self.name)
+            self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if ENABLED:
+            ms = (time.perf_counter() - self._t0) * 1000.0
+            _CURRENT.reset(self._token)
+            self.registry.record(self.name, ms, ok=exc_type is None, parent=self._parent)
+        return False
+
+    def __call__(self, fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(self.name, self.registry):
+                return fn(*args, **kwargs)
+        return wrapper
+
+
+def timed(name: str | None = None, registry: TimingRegistry | None = None):
+    """함수 데코레이터 — 이름 생략 시 <모듈>.<함수명>"""
+    def deco(fn):
+        return span(name or f"{fn.__module__}.{fn.__qualname__}", registry)(fn)
+    return deco
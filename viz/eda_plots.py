@@ -13,6 +13,10 @@ import plotly.io as pio
 from functools import lru_cache
 import hashlib
 
+from utils.corr_utils import CorrStats, GroupedCorrStats
+from utils.sketch_utils import GroupedDistSketch, stratified_sample
+from utils.timing import timed
+
 # ===== 사용자 설정 =====
 CAT_VARS = {"mold_code", "EMS_operation_time", "working", "passorfail", "tryshot_signal", "heating_furnace"}
 EXCLUDE_VARS = {"weekday", "month", "name", "id", "line", "mold_name", "time", "date", "emergency_stop", "day"}
@@ -34,6 +38,11 @@ HEATMAP_ORDER = [
     "Coolant_temperature",
 ]
 
+# 대용량 데이터: 이 행 수 이상이면 분포는 스케치, 산점도는 층화 샘플로 그림
+SKETCH_MIN_ROWS = 200_000
+SKETCH_CHUNK_ROWS = 100_000
+SCATTER_MAX_ROWS = 20_000
+
 # ===== 한글 라벨 로드 =====
 def _load_var_labels():
     p = Path(__file__).resolve().parents[1] / "data" / "var_labels.csv"
@@ -82,11 +91,14 @@ _PF_MAP = {
     0: "합", 0.0: "합", "0": "합", "0.0": "합", "PASS": "합", "pass": "합", "Pass": "합",
     1: "불", 1.0: "불", "1": "불", "1.0": "불", "FAIL": "불", "fail": "불", "Fail": "불",
 }
+def _pf_labels(s: pd.Series) -> pd.Series:
+    return s.map(lambda v: _PF_MAP.get(v, _PF_MAP.get(str(v), str(v))))
+
 def _ensure_pf_hue(df: pd.DataFrame):
     if (df is None) or ("passorfail" not in df.columns):
         return df, None
     df2 = df.copy()
-    df2["_pf_"] = df2["passorfail"].map(lambda v: _PF_MAP.get(v, _PF_MAP.get(str(v), str(v))))
+    df2["_pf_"] = _pf_labels(df2["passorfail"])
     return df2, "_pf_"
 
 def _legend_as_quality(ax):
@@ -94,10 +106,87 @@ def _legend_as_quality(ax):
     if leg:
         leg.set_title("품질 결과")
 
+# ===== 대용량 분포 스케치 (청크 단위 증분 구축, 데이터셋·변수별 캐시) =====
+def _is_large(df: pd.DataFrame) -> bool:
+    return df is not None and len(df) >= SKETCH_MIN_ROWS
+
+def _build_sketch(df: pd.DataFrame, var: str, by: str | None) -> GroupedDistSketch:
+    # 히스토그램 구간은 전체 열의 유한값 범위로 고정 (첫 청크 범위로 잡으면 이후 청크의 범위 밖 값이 빠짐)
+    v = pd.to_numeric(df[var], errors="coerce").to_numpy(dtype=np.float64)
+    v = v[np.isfinite(v)]
+    lo, hi = (float(v.min()), float(v.max())) if v.size else (None, None)
+    sk = GroupedDistSketch(bins=50, lo=lo, hi=hi)
+    for start in range(0, len(df), SKETCH_CHUNK_ROWS):
+        part = df.iloc[start:start + SKETCH_CHUNK_ROWS]
+        if by is None:
+            groups = np.full(len(part), "전체", dtype=object)
+        elif by == "passorfail":
+            groups = _pf_labels(part[by]).to_numpy()
+        else:
+            groups = part[by].astype(str).to_numpy()
+        sk.update(part[var].to_numpy(), groups)
+    return sk
+
+@lru_cache(maxsize=64)
+def _cached_sketch(which: str, var: str, by: str | None) -> GroupedDistSketch:
+    return _build_sketch(DF_MAIN if which == "main" else DF_FIXED, var, by)
+
+def _sketch_for(df: pd.DataFrame, var: str, by: str | None) -> GroupedDistSketch:
+    if df is DF_MAIN:
+        return _cached_sketch("main", var, by)
+    if df is DF_FIXED:
+        return _cached_sketch("fixed", var, by)
+    return _build_sketch(df, var, by)
+
+def _group_order(sk: GroupedDistSketch, by: str | None) -> list:
+    if by == "passorfail":
+        pref = [g for g in ("합", "불") if g in sk.quantiles]
+        return pref + sorted([g for g in sk.quantiles if g not in pref], key=str)
+    return sorted(sk.quantiles.keys(), key=str)
+
+def _plot_single_sketch(df: pd.DataFrame, var: str):
+    """누적 막대 히스토그램 (합/불 구간 카운트를 스케치에서 바로 그림)"""
+    by = "passorfail" if "passorfail" in df.columns else None
+    sk = _sketch_for(df, var, by)
+    fig, ax = plt.subplots(figsize=(6,4))
+    bottom = None
+    for i, g in enumerate(_group_order(sk, by)):
+        h = sk.hists[g]
+        widths = np.diff(h.edges)
+        ax.bar(h.edges[:-1], h.counts, width=widths, align="edge", bottom=bottom,
+               color=f"C{i}", alpha=0.75, edgecolor="white", linewidth=0.3, label=str(g))
+        bottom = h.counts if bottom is None else bottom + h.counts
+    ax.set_ylabel("빈도")
+    ax.set_title(f"{k(var)} 분포" + (" (품질 결과)" if by else "") + " · 근사")
+    ax.set_xlabel(k(var))
+    if by:
+        ax.legend(title="품질 결과")
+    fig.tight_layout()
+    return fig
+
+def _plot_box_sketch(df: pd.DataFrame, num_col: str, cat_col: str):
+    """범주별 박스플롯 (사분위·수염은 KLL 근사, 이상치 점 생략)"""
+    sk = _sketch_for(df, num_col, cat_col)
+    stats = sk.box_stats(_group_order(sk, cat_col))
+    for st in stats:
+        st["label"] = k(str(st["label"]))
+    fig, ax = plt.subplots(figsize=(7,5))
+    if stats:
+        ax.bxp(stats, showfliers=False, patch_artist=True,
+               boxprops=dict(facecolor="#9ecae1"), medianprops=dict(color="#08519c"))
+    xlabel = "품질 결과" if cat_col == "passorfail" else k(cat_col)
+    ax.set_title(f"{xlabel}별 {k(num_col)} 분포 · 근사")
+    ax.set_xlabel(xlabel); ax.set_ylabel(k(num_col))
+    ax.set_xticklabels([t.get_text() for t in ax.get_xticklabels()], rotation=15, ha="right")
+    fig.tight_layout()
+    return fig
+
 # ===== 변수 분포 / 산점도 / 박스플롯 =====
 def _plot_single(df: pd.DataFrame, var: str):
     if not _has(df, var):
         return _fig_msg("데이터 없음")
+    if _is_large(df) and _is_num(df, var):
+        return _plot_single_sketch(df, var)
     local, hue = _ensure_pf_hue(df)
     fig, ax = plt.subplots(figsize=(6,4))
     if _is_num(local, var):
@@ -111,7 +200,7 @@ def _plot_single(df: pd.DataFrame, var: str):
     ax.set_title(f"{k(var)} 분포" + (" (품질 결과)" if hue else ""))
     ax.set_xlabel(k(var))
     _legend_as_quality(ax)
-    plt.tight_layout()
+    fig.tight_layout()
     return fig
 
 def _plot_scatter(df: pd.DataFrame, xcol: str, ycol: str):
@@ -119,13 +208,17 @@ def _plot_scatter(df: pd.DataFrame, xcol: str, ycol: str):
         return _fig_msg("데이터 없음")
     if not (_is_num(df, xcol) and _is_num(df, ycol)):
         return _fig_msg("산점도는 수치형 2개 필요")
+    if _is_large(df):
+        # 불량 샷은 전부 유지하고 양품만 샘플링
+        fail = (_pf_labels(df["passorfail"]) == "불") if "passorfail" in df.columns else np.zeros(len(df), bool)
+        df = stratified_sample(df, fail, max_rows=SCATTER_MAX_ROWS)
     local, hue = _ensure_pf_hue(df)
     fig, ax = plt.subplots(figsize=(6,4))
     sns.scatterplot(data=local, x=xcol, y=ycol, hue=hue, s=20, alpha=0.7, ax=ax)
     ax.set_title(f"{k(xcol)} vs {k(ycol)}" + (" (품질 결과)" if hue else ""))
     ax.set_xlabel(k(xcol)); ax.set_ylabel(k(ycol))
     _legend_as_quality(ax)
-    plt.tight_layout()
+    fig.tight_layout()
     return fig
 
 def _plot_box_by_cat(df: pd.DataFrame, num_col: str, cat_col: str):
@@ -133,6 +226,8 @@ def _plot_box_by_cat(df: pd.DataFrame, num_col: str, cat_col: str):
         return _fig_msg("데이터 없음")
     if not (_is_num(df, num_col) and not _is_num(df, cat_col)):
         return _fig_msg("박스플롯은 수치×범주 필요")
+    if _is_large(df):
+        return _plot_box_sketch(df, num_col, cat_col)
     local = df.copy()
     x = cat_col; order = None
     if cat_col == "passorfail":
@@ -144,7 +239,7 @@ def _plot_box_by_cat(df: pd.DataFrame, num_col: str, cat_col: str):
     ax.set_title(f"{xlabel}별 {k(num_col)} 분포")
     ax.set_xlabel(xlabel); ax.set_ylabel(k(num_col))
     ax.set_xticklabels([k(t.get_text()) for t in ax.get_xticklabels()], rotation=15, ha="right")
-    plt.tight_layout()
+    fig.tight_layout()
     return fig
 
 def _plot_varpair_or_dist_df(df: pd.DataFrame, var1: str, var2: str):
@@ -159,9 +254,11 @@ def _plot_varpair_or_dist_df(df: pd.DataFrame, var1: str, var2: str):
         return _plot_box_by_cat(df, num_col=var2, cat_col=var1)
     return _fig_msg("범주×범주 조합은 미지원")
 
+@timed("viz.eda.varpair_main")
 def plot_varpair_or_dist_main(var1, var2):
     return _plot_varpair_or_dist_df(DF_MAIN, var1, var2)
 
+@timed("viz.eda.varpair_fixed")
 def plot_varpair_or_dist_fixed(var1, var2):
     if DF_FIXED is None:
         return _fig_msg("전처리 데이터 없음")
@@ -179,6 +276,15 @@ def get_fixed_numeric_cols():
     return [c for c in DF_FIXED.columns
             if (c not in HEATMAP_EXCLUDE) and pd.api.types.is_numeric_dtype(DF_FIXED[c])]
 
+@lru_cache(maxsize=1)
+def get_fixed_corr_stats() -> CorrStats | None:
+    """fixeddata 전체 수치형 변수의 상관 충분통계량 (최초 1회 계산 후 캐시, 신규 샷은 .update()로 증분 반영)"""
+    cols = get_fixed_numeric_cols()
+    if not cols:
+        return None
+    return CorrStats(cols).update(DF_FIXED)
+
+@timed("viz.eda.corr_heatmap")
 def plot_corr_heatmap_fixed_subset(selected_cols):
     if DF_FIXED is None:
         return _fig_msg("전처리 데이터(fixeddata)를 찾을 수 없습니다.")
@@ -192,7 +298,7 @@ def plot_corr_heatmap_fixed_subset(selected_cols):
     if len(valid) < 2:
         return _fig_msg("상관관계는 최소 2개 이상의 수치형 변수가 필요합니다.")
     cols = _apply_heatmap_order(valid)
-    corr = DF_FIXED[cols].corr(numeric_only=True).rename(index=k, columns=k)
+    corr = get_fixed_corr_stats().corr(cols).rename(index=k, columns=k)
     n = len(cols)
     fig, ax = plt.subplots(figsize=(max(6, 1 + 0.5*n), max(5, 0.45*n + 3)))
     annot = n <= 18
@@ -200,7 +306,7 @@ def plot_corr_heatmap_fixed_subset(selected_cols):
     ax.set_title("상관관계 Heatmap")
     ax.set_xticklabels(ax.get_xticklabels(), rotation=45, ha="right")
     ax.set_yticklabels(ax.get_yticklabels(), rotation=0)
-    plt.tight_layout()
+    fig.tight_layout()
     return fig
 
 # ===== (여기부터) 금형코드 색상 고정 매핑 =====
@@ -272,6 +378,7 @@ def get_mold_code_levels():
     vals = pd.unique(df["mold_code"].astype(str).fillna("")).tolist()
     return sorted([v for v in vals if v])
 
+@timed("viz.eda.timeseries")
 def plot_timeseries_fixed3_plotly_html(yvar: str, codes, start_date=None, end_date=None) -> str:
     """
     단일 y변수 / mold_code별 '실선만' 표시
@@ -392,3 +499,34 @@ def plot_timeseries_fixed3_plotly_html(yvar: str, codes, start_date=None, end_da
         template="plotly_white",
     )
     return pio.to_html(fig, include_plotlyjs="cdn", full_html=False)
+
+
+# ===== 금형별 × 롤링 윈도우 상관 변화 감지 (fixeddata3) =====
+def _fixed3_header() -> list[str]:
+    p = _fixed3_path()
+    if p is None:
+        return []
+    try:
+        if p.suffix.lower() == ".parquet":
+            import pyarrow.parquet as pq
+            return list(pq.ParquetFile(str(p)).schema_arrow.names)
+        return list(pd.read_csv(p, nrows=0).columns)
+    except Exception as e:
+        print("[fixed3_header] read error:", e)
+        return []
+
+@lru_cache(maxsize=4)
+@timed("viz.eda.corr_drift")
+def get_corr_drift_fixed3(threshold: float = 0.3, window: int = 7, freq: str = "D") -> pd.DataFrame:
+    """
+    mold_code별 전체 기간 상관 대비 window(일) 롤링 상관이 threshold 이상 바뀐 변수쌍
+    - 금형×일 단위 교차곱을 한 번에 누적한 뒤 누적합 차분으로 롤링 계산
+    """
+    cols = [c for c in HEATMAP_ORDER if c in set(_fixed3_header())]
+    if len(cols) < 2:
+        return pd.DataFrame()
+    df = _load_fixed3_light(tuple(cols))
+    if df is None or df.empty:
+        return pd.DataFrame()
+    stats = GroupedCorrStats(cols, group_col="mold_code", time_col="_t_", freq=freq).update(df)
+    return stats.drift_pairs(threshold=threshold, window=window)
@@ -3,10 +3,13 @@ import matplotlib.pyplot as plt
 import pandas as pd
 from typing import List, Optional, Tuple, Dict, Any
 
+from utils.timing import span, timed
+
 # ====================================================================
 # Cut-off 분석 및 시각화 함수
 # ====================================================================
 
+@timed("viz.failrate_cutoff")
 def plot_failrate_cutoff_dual_fast(df: pd.DataFrame, var: str, ma_window: int = 5, vars_to_hide: Optional[List[str]] = None) -> plt.Figure:
     """
     공정 변수(var)에 대한 하한/상한 분석을 수행하고, Raw 데이터 기반 Cut-off(1차)와 
@@ -68,8 +71,9 @@ def plot_failrate_cutoff_dual_fast(df: pd.DataFrame, var: str, ma_window: int =
                 failrates.append(rate)
         return failrates
 
-    failrates_lower = calculate_failrates(thr_lower, 'lower')
-    failrates_upper = calculate_failrates(thr_upper, 'upper')
+    with span("viz.failrate_cutoff.compute"):
+        failrates_lower = calculate_failrates(thr_lower, 'lower')
+        failrates_upper = calculate_failrates(thr_upper, 'upper')
 
     # ------------------ Cut-off 탐지 로직 (분리) ------------------
     
@@ -167,5 +171,5 @@ def plot_failrate_cutoff_dual_fast(df: pd.DataFrame, var: str, ma_window: int =
     plot_failrate(axes[1], thr_upper, failrates_upper, cutoff_raw_upper, cutoff_ma_upper,
                   '상한 분석: 임계값 이상 불량률 (X ≥ 임계값)', hide)
 
-    plt.tight_layout()
+    fig.tight_layout()
     return fig
\ No newline at end of file
@@ -4,7 +4,9 @@ import seaborn as sns
 import pandas as pd
 
 from shared import name_map_kor
+from utils.timing import timed
 
+@timed("viz.preprocess.data_types")
 def plot_data_types(train_df):
     """데이터 타입별 변수 개수 시각화"""
     fig, ax = plt.subplots(figsize=(8, 5))
@@ -19,9 +21,10 @@ def plot_data_types(train_df):
     ax.set_title('데이터 타입별 변수 분포')
     ax.grid(axis='y', alpha=0.3)
     
-    plt.tight_layout()
+    fig.tight_layout()
     return fig
 
+@timed("viz.preprocess.missing_overview")
 def plot_missing_overview(train_df):
     """결측치 상위 10개 변수만 시각화 (한글 컬럼명, 내림차순 위에서 아래로)"""
     fig, ax = plt.subplots(figsize=(8, 5))
@@ -48,10 +51,11 @@ def plot_missing_overview(train_df):
         ax.set_xlim(0, 1)
         ax.set_ylim(0, 1)
     
-    plt.tight_layout()
+    fig.tight_layout()
     return fig
 
 
+@timed("viz.preprocess.target_distribution")
 def plot_target_distribution(train_df, target_col='passorfail'):
     """타겟 변수 분포 시각화 (0=Pass, 1=Fail 기준)"""
 
@@ -87,5 +91,5 @@ def plot_target_distribution(train_df, target_col='passorfail'):
         ax.text(0.5, 0.5, f'{target_col} 컬럼을 찾을 수 없습니다',
                 ha='center', va='center', fontsize=14)
 
-    plt.tight_layout()
+    fig.tight_layout()
     return fig
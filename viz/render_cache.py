@@ -0,0 +1,154 @@
+# viz/render_cache.py — 정적 matplotlib 그림 렌더 캐시 (세션 간 공유)
+import hashlib
+import inspect
+import io
+import os
+import sys
+import threading
+import weakref
+from pathlib import Path
+
+import matplotlib.pyplot as plt
+import pandas as pd
+
+from modules.service_offload import PYPLOT_LOCK
+from utils.timing import span
+
+# 디스크 캐시 위치 (앱 재시작 후에도 재사용)
+CACHE_DIR = Path(__file__).resolve().parents[1] / "cache" / "figures"
+
+_LOCK = threading.Lock()   # 캐시 색인·파일 생성 (그림 그리기 자체는 PYPLOT_LOCK 으로 작업 스레드와 직렬화)
+_FINGERPRINTS: dict[int, tuple[weakref.ref, str]] = {}
+_PATHS: dict[str, Path] = {}  # key → 렌더 완료된 파일 (디스크 stat 생략용)
+_MODULE_DIGESTS: dict[str, str] = {}
+# 그림 모양에 영향을 주는 공용 코드(폰트 설정·외부 도우미 등)가 바뀌면 올려서 기존 캐시 무효화
+CACHE_VERSION = 1
+
+
+# ===== 데이터 지문 =====
+def frame_fingerprint(df: pd.DataFrame | None) -> str:
+    """DataFrame 내용 해시 (같은 객체는 1회만 계산)"""
+    if df is None:
+        return "none"
+    hit = _FINGERPRINTS.get(id(df))
+    if hit is not None and hit[0]() is df:
+        return hit[1]
+    h = hashlib.sha1()
+    h.update(repr(list(df.columns)).encode("utf-8"))
+    h.update(repr([str(t) for t in df.dtypes]).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    fp = h.hexdigest()
+    _FINGERPRINTS[id(df)] = (weakref.ref(df), fp)
+    return fp
+
+def register_fingerprint(df: pd.DataFrame, fingerprint: str):
+    """파일 버전 등 이미 알고 있는 지문을 등록 (내용 해시 계산 생략)"""
+    _FINGERPRINTS[id(df)] = (weakref.ref(df), f"v:{fingerprint}")
+
+def _norm_arg(v):
+    if isinstance(v, pd.DataFrame):
+        return ("df", frame_fingerprint(v))
+    if isinstance(v, (list, tuple, set)):
+        items = [_norm_arg(x) for x in v]
+        return tuple(sorted(items, key=repr)) if isinstance(v, set) else tuple(items)
+    if isinstance(v, dict):
+        return tuple(sorted((str(k), _norm_arg(x)) for k, x in v.items()))
+    return v
+
+def _code_digest(h, code):
+    """바이트코드 + 상수(제목·색·라벨 등) + 참조 이름, 중첩 함수·람다까지"""
+    h.update(code.co_code)
+    h.update(repr(code.co_names).encode("utf-8"))
+    for c in code.co_consts:
+        if inspect.iscode(c):
+            _code_digest(h, c)
+        else:
+            h.update(repr(c).encode("utf-8"))
+
+def _module_digest(module_name: str) -> str:
+    """플롯 함수가 정의된 모듈 파일 내용 해시 (같은 모듈의 도우미 함수·상수 변경도 반영, 프로세스당 1회)"""
+    hit = _MODULE_DIGESTS.get(module_name)
+    if hit is None:
+        path = getattr(sys.modules.get(module_name), "__file__", None)
+        try:
+            hit = hashlib.sha1(Path(path).read_bytes()).hexdigest()[:12] if path else ""
+        except OSError:
+            hit = ""
+        _MODULE_DIGESTS[module_name] = hit
+    return hit
+
+def _func_id(fn) -> str:
+    """
+    플롯 함수 식별자 — 함수 본문·상수·모듈 소스가 바뀌면 키가 바뀌어 디스크 캐시의 옛 그림을 쓰지 않음
+    (다른 모듈의 도우미만 바뀐 경우는 CACHE_VERSION 을 올리거나 clear_render_cache(disk=True))
+    """
+    raw = inspect.unwrap(fn)   # 계측 데코레이터 안쪽 원본 함수 기준
+    h = hashlib.sha1()
+    code = getattr(raw, "__code__", None)
+    if code is not None:
+        _code_digest(h, code)
+    return f"{fn.__module__}.{fn.__qualname__}:{h.hexdigest()[:12]}:{_module_digest(raw.__module__)}"
+
+def cache_key(fn, args, kwargs, data=None, figsize=None, dpi=100, fmt="png") -> str:
+    """(플롯 함수, 인자, 데이터 지문, 그림 크기) → 캐시 키"""
+    parts = (
+        CACHE_VERSION,
+        _func_id(fn),
+        _norm_arg(tuple(args)),
+        _norm_arg(dict(kwargs)),
+        data if isinstance(data, str) else frame_fingerprint(data),
+        tuple(figsize) if figsize else None,
+        dpi, fmt,
+        str(plt.rcParams.get("font.family")),
+    )
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+
+
+# ===== 렌더 =====
+def figure_bytes(fig, dpi: int = 100, fmt: str = "png") -> bytes:
+    buf = io.BytesIO()
+    fig.savefig(buf, format=fmt, dpi=dpi, bbox_inches="tight")
+    plt.close(fig)
+    return buf.getvalue()
+
+def render_cached(fn, *args, data=None, figsize=None, dpi: int = 100, fmt: str = "png", **kwargs) -> Path:
+    """
+    fn(*args, **kwargs)가 반환한 Figure를 이미지 파일로 캐시하고 경로 반환
+    - data: 함수가 전역 데이터를 읽는 경우 해당 DataFrame(또는 버전 문자열)을 넘겨 키에 반영
+    - 같은 키는 모든 세션·프로세스가 디스크 파일을 공유 → matplotlib 렌더는 최초 1회만
+    """
+    key = cache_key(fn, args, kwargs, data=data, figsize=figsize, dpi=dpi, fmt=fmt)
+    path = _PATHS.get(key)
+    if path is not None:
+        return path
+    path = CACHE_DIR / f"{key}.{fmt}"
+    with _LOCK:
+        if not path.exists():
+            with PYPLOT_LOCK:
+                with span("viz.render.draw"):
+                    fig = fn(*args, **kwargs)
+                if figsize:
+                    fig.set_size_inches(*figsize)
+                with span("viz.render.encode"):
+                    payload = figure_bytes(fig, dpi=dpi, fmt=fmt)
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_bytes(payload)
+            os.replace(tmp, path)
+        _PATHS[key] = path
+    return path
+
+def cached_img(fn, *args, data=None, figsize=None, dpi: int = 100, fmt: str = "png",
+               alt: str = "", **kwargs) -> dict:
+    """@render.image 용 ImgData (캐시 파일을 그대로 전송)"""
+    path = render_cached(fn, *args, data=data, figsize=figsize, dpi=dpi, fmt=fmt, **kwargs)
+    return {"src": str(path), "width": "100%", "alt": alt, "style": "height:auto;"}
+
+def clear_render_cache(disk: bool = False):
+    """메모리 색인 초기화 (disk=True면 파일까지 삭제)"""
+    with _LOCK:
+        _PATHS.clear()
+        if disk and CACHE_DIR.exists():
+            for p in CACHE_DIR.iterdir():
+                if p.is_file():
+                    p.unlink()
@@ -2,48 +2,64 @@
 import shap
 import matplotlib.pyplot as plt
 from sklearn.inspection import permutation_importance
-from shiny import render, reactive
+from shiny import render, reactive, ui
 
+from modules.service_offload import computing_ui, figure_png, png_ui, restart, run_offloaded, task_ui
+from utils.timing import span
 
-def register_shap_plots(output, shap_values_state, X_input_state, y_test_state, models, explainers, input):
+
+def register_shap_plots(output, shap_values_state, X_input_state, y_test_state, models, explainers, input,
+                        mode_state=None):
     """
     SHAP Force Plot / Summary Plot / Permutation Importance 등록
+    - mode_state: 예측 경로 (대리 모델 스크리닝으로 끝난 샷은 오류 대신 안내 문구)
     """
 
     # -----------------------
-    # 1. Force Plot (개별 샘플)
+    # 1. Force Plot (개별 샘플) — 그림 생성·PNG 인코딩은 작업 풀에서
     # -----------------------
-    @output
-    @render.plot
-    def shap_force_plot():
-        if input.btn_predict() == 0:
-            fig, ax = plt.subplots(figsize=(10, 2))
-            ax.text(0.5, 0.5, '예측을 실행하면 SHAP Force Plot이 표시됩니다',
-                    ha='center', va='center', fontsize=12, color='#6c757d',
-                    bbox=dict(boxstyle='round', facecolor='#f8f9fa', edgecolor='#dee2e6'))
-            ax.axis('off')
-            plt.tight_layout()
+    def _message(text, color="#6c757d"):
+        return ui.div(text, class_="p-3 text-center",
+                      style=f"color:{color};background-color:#f8f9fa;border:1px solid #dee2e6;border-radius:8px;")
+
+    def _force_plot_figure(base_value, vals, X_labels):
+        with span("viz.shap_force"):
+            # show=False 면 shap 이 새로 만든 Figure 를 반환 → 전역 현재 그림(gcf) 에 의존하지 않음
+            fig = shap.plots.force(base_value, vals, X_labels, figsize=(14, 3), matplotlib=True, show=False)
+            fig.axes[0].set_title("SHAP Force Plot (개별 샘플 분석)", fontsize=13, fontweight='bold', pad=15)
+            fig.tight_layout(pad=1.5)
             return fig
 
+    @reactive.extended_task
+    async def force_plot_task(base_value, vals, X_labels):
+        return await run_offloaded(figure_png, _force_plot_figure, base_value, vals, X_labels)
+
+    force_plot_notice = reactive.Value(None)
+
+    @reactive.effect
+    def _invoke_force_plot():
+        # 예측 결과(상태값)가 바뀔 때만 실행 — 버튼·금형 입력은 의존성에서 제외
+        with reactive.isolate():
+            clicked = input.btn_predict()
+            mold_code = input.mold_code()
+        if clicked == 0:
+            return
         shap_values = shap_values_state.get()
         X = X_input_state.get()
 
         if shap_values is None or X is None:
-            fig, ax = plt.subplots(figsize=(10, 2))
-            ax.text(0.5, 0.5, "SHAP 값을 계산할 수 없습니다",
-                    ha="center", va="center", fontsize=12, color='#dc3545')
-            ax.axis("off")
-            plt.tight_layout()
-            return fig
+            force_plot_task.cancel()
+            if mode_state is not None and mode_state.get() == "screened":
+                force_plot_notice.set(("1차 스크리닝에서 양품으로 판정되어 SHAP 분석을 생략했습니다", "#6c757d"))
+            else:
+                force_plot_notice.set("SHAP 값을 계산할 수 없습니다")
+            return
 
-        explainer = explainers.get(input.mold_code())
+        explainer = explainers.get(mold_code)
         if explainer is None:
-            fig, ax = plt.subplots(figsize=(10, 2))
-            ax.text(0.5, 0.5, f"금형 코드 '{input.mold_code()}'에 대한 Explainer가 없습니다",
-                    ha="center", va="center", fontsize=12, color='#dc3545')
-            ax.axis("off")
-            plt.tight_layout()
-            return fig
+            force_plot_task.cancel()
+            force_plot_notice.set(f"금형 코드 '{mold_code}'에 대한 Explainer가 없습니다")
+            return
 
         try:
             base_value = explainer.expected_value
@@ -67,19 +83,26 @@ def register_shap_plots(output, shap_values_state, X_input_state, y_test_state,
             X_labels.index = [
                 f"{col}\n" for col, val in zip(X_labels.index, X_labels.values)
             ]
-            plt.figure(figsize=(14, 3))
-            shap.plots.force(base_value, vals, X_labels, matplotlib=True, show=False)
-            plt.title("SHAP Force Plot (개별 샘플 분석)", fontsize=13, fontweight='bold', pad=15)
-            plt.tight_layout(pad=1.5)
-            return plt.gcf()
-        
         except Exception as e:
-            fig, ax = plt.subplots(figsize=(10, 2))
-            ax.text(0.5, 0.5, f"SHAP Plot 생성 오류:\n{str(e)[:100]}",
-                    ha="center", va="center", fontsize=10, color='#dc3545')
-            ax.axis("off")
-            plt.tight_layout()
-            return fig
+            force_plot_task.cancel()
+            force_plot_notice.set(f"SHAP Plot 생성 오류: {str(e)[:100]}")
+            return
+
+        force_plot_notice.set(None)
+        restart(force_plot_task, base_value, vals, X_labels)
+
+    @output
+    @render.ui
+    def shap_force_plot():
+        if input.btn_predict() == 0:
+            return _message("예측을 실행하면 SHAP Force Plot이 표시됩니다")
+        notice = force_plot_notice.get()
+        if isinstance(notice, tuple):   # (문구, 색) — 오류가 아닌 안내
+            return _message(*notice)
+        if notice is not None:
+            return _message(notice, color="#dc3545")
+        return task_ui(force_plot_task, lambda png: png_ui(png, alt="SHAP Force Plot"),
+                       placeholder=computing_ui("SHAP Force Plot 계산 중…"))
 
     # # -----------------------
     # # 2. Summary Plot (전체 샘플)
@@ -0,0 +1,82 @@
+# viz/single_flight.py — 동일한 동시 계산 합치기 (세션 간 공유)
+#
+# 여러 세션이 같은 (함수, 인자, 데이터 버전)을 동시에 요청하면 첫 요청만 계산하고
+# 나머지는 그 계산이 끝나기를 기다려 같은 결과를 받는다. 완료 후에는 기록을 지움(결과 캐시 아님).
+#   png = coalesced(figure_png, plot_failrate_cutoff_dual_fast, df2, var, data=df2)
+#
+# - 키: render_cache.cache_key 와 같은 정규화 (DataFrame 인자는 내용 지문, data= 로 전역 데이터 버전 반영)
+# - 결과는 모든 대기자가 같은 객체를 공유 → PNG bytes / HTML 문자열처럼 불변 값에만 사용
+#   (matplotlib Figure 는 호출자가 닫거나 수정하므로 figure_png 로 감싼 뒤 합칠 것)
+# - 계산이 예외로 끝나면 대기자 모두에게 같은 예외 전달
+import threading
+
+from utils.timing import span
+from viz.render_cache import cache_key
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[str, _Call] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    def do(self, key: str, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                call.waiters += 1
+                self.shared += 1
+
+        if not leader:
+            with span("viz.single_flight.wait"):
+                call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"in_flight": len(self._calls), "leaders": self.leaders, "shared": self.shared}
+
+
+SINGLE_FLIGHT = SingleFlight()
+
+
+def coalesced(fn, *args, data=None, key_args=None, **kwargs):
+    """
+    fn(*args, **kwargs) — 같은 키의 계산이 진행 중이면 그 결과를 기다려 공유
+    - data: 함수가 전역 데이터를 읽는 경우 해당 DataFrame(또는 버전 문자열)
+    - key_args: 키 계산에만 쓸 인자 (기본은 args) — 순서와 무관한 선택은 set 으로 넘기면 정렬되어 키가 같아짐
+    """
+    key = cache_key(fn, args if key_args is None else key_args, kwargs, data=data)
+    return SINGLE_FLIGHT.do(key, fn, *args, **kwargs)